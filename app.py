@@ -1,319 +1,73 @@
-from flask import Flask, render_template_string, request, send_file, jsonify
+from flask import Flask, Response, render_template_string, request, send_file, jsonify
 import os
-import re
-import math
+import logging
+import tempfile
 from pathlib import Path
 import io
+from urllib.parse import quote
 
-app = Flask(__name__)
+from converters import CONVERTERS, UnsupportedConversion, get_converter, output_extension, stream_conversion
+from cache import ResultCache, convert_cached
+from converters.incremental import UnitCache
+from converters.instrument import METRICS
+from jobs import JobQueue, QueueFull
+from store import OutputStore
+from batch import iter_convert_archive
+from pages import CachedPage, REVALIDATE, asset_url, cache_control, load_assets
+
+# 静态文件由下面的 /static 路由从内存返回（带内容摘要的地址可长期缓存），不使用Flask默认的静态路由
+app = Flask(__name__, static_folder=None)
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024
+# 后台任务：工作进程数（0表示按CPU核心数）与最大排队任务数
+app.config['JOB_MAX_WORKERS'] = int(os.environ.get('ROBOTQU_JOB_WORKERS', 0))
+app.config['JOB_MAX_QUEUE'] = int(os.environ.get('ROBOTQU_JOB_QUEUE', 64))
+# 每个后台任务的CPU时间/墙钟时间预算（秒，0表示不限制），超出时任务以超时结束，不占住工作进程
+app.config['JOB_CPU_SECONDS'] = float(os.environ.get('ROBOTQU_JOB_CPU_SECONDS', 60))
+app.config['JOB_WALL_SECONDS'] = float(os.environ.get('ROBOTQU_JOB_WALL_SECONDS', 120))
 
-# ==================== 机器人转换器 ====================
+# 结果缓存：内存LRU条目数/总字符数上限，ROBOTQU_CACHE_DISK=1 时启用 temp/cache 磁盘层
+app.config['RESULT_CACHE_ENTRIES'] = int(os.environ.get('ROBOTQU_CACHE_ENTRIES', 256))
+app.config['RESULT_CACHE_BYTES'] = int(os.environ.get('ROBOTQU_CACHE_BYTES', 64 * 1024 * 1024))
+app.config['RESULT_CACHE_DISK'] = os.environ.get('ROBOTQU_CACHE_DISK', '0') == '1'
+# 磁盘层总字节数上限、未使用条目的保留秒数（0表示不按时间删除）
+app.config['RESULT_CACHE_DISK_BYTES'] = int(os.environ.get('ROBOTQU_CACHE_DISK_BYTES', 1024 * 1024 * 1024))
+app.config['RESULT_CACHE_DISK_TTL'] = int(os.environ.get('ROBOTQU_CACHE_DISK_TTL', 7 * 24 * 3600))
 
-class ABBtoFanuc:
-    def __init__(self):
-        self.points = {}
-        
-    def parse_mod(self, content):
-        instructions = []
-        pattern = r'robtarget\s+(\w+)\s*:=\s*\[\[([-\d.eE]+)\s*,\s*([-\d.eE]+)\s*,\s*([-\d.eE]+)\s*\]\s*,\s*\[([-\d.eE]+)\s*,\s*([-\d.eE]+)\s*,\s*([-\d.eE]+)\s*,\s*([-\d.eE]+)\s*\]'
-        
-        for m in re.finditer(pattern, content, re.IGNORECASE):
-            name, x, y, z, q1, q2, q3, q4 = m.group(1), float(m.group(2)), float(m.group(3)), float(m.group(4)), float(m.group(5)), float(m.group(6)), float(m.group(7)), float(m.group(8))
-            w, p, r = self.quaternion_to_euler(q1, q2, q3, q4)
-            self.points[name.lower()] = {'x': x, 'y': y, 'z': z, 'w': w, 'p': p, 'r': r}
-            self.points[name] = {'x': x, 'y': y, 'z': z, 'w': w, 'p': p, 'r': r}
-        
-        content_processed = re.sub(r',\s*\n\s*', ', ', content)
-        lines = content_processed.split('\n')
-        
-        for line in lines:
-            line = line.strip()
-            if not line or line.startswith('!'):
-                continue
-            
-            if re.match(r'MoveJ\s+', line, re.IGNORECASE):
-                m = re.search(r'MoveJ\s+(\w+),\s*(\w+)', line, re.IGNORECASE)
-                if m:
-                    point, speed = m.groups()
-                    instructions.append({
-                        'move_type': 'J',
-                        'point': point,
-                        'speed': self.convert_speed(speed, False)
-                    })
-            elif re.match(r'MoveL\s+', line, re.IGNORECASE):
-                m = re.search(r'MoveL\s+(\w+),\s*(\w+)', line, re.IGNORECASE)
-                if m:
-                    point, speed = m.groups()
-                    instructions.append({
-                        'move_type': 'L',
-                        'point': point,
-                        'speed': self.convert_speed(speed, True)
-                    })
-        return instructions
-    
-    def quaternion_to_euler(self, q1, q2, q3, q4):
-        r11 = 1 - 2*(q2**2 + q3**2)
-        r21 = 2*(q1*q2 + q3*q4)
-        r31 = 2*(q1*q3 - q2*q4)
-        r32 = 2*(q2*q3 + q1*q4)
-        r33 = 1 - 2*(q1**2 + q2**2)
-        w = math.atan2(r21, r11)
-        p = math.atan2(-r31, math.sqrt(r32**2 + r33**2))
-        r = math.atan2(r32, r33)
-        return math.degrees(w), math.degrees(p), math.degrees(r)
-    
-    def convert_speed(self, speed, is_linear):
-        m = re.search(r'\d+', str(speed))
-        val = int(m.group()) if m else 1000
-        if is_linear:
-            return f"{val}mm/sec"
-        return f"{min(val//10, 100)}%"
-
-    def generate_ls(self, instructions, prog_name="CONV"):
-        lines = []
-        lines.append(f"/PROG {prog_name}")
-        lines.append("/ATTR")
-        lines.append('COMMENT = "Converted from ABB";')
-        lines.append("/MN")
-        
-        for i, inst in enumerate(instructions, 1):
-            if inst['move_type'] == 'J':
-                lines.append(f"  {i}:J  P[{i}] {inst['speed']} FINE ;")
-            else:
-                lines.append(f"  {i}:L  P[{i}] {inst['speed']} FINE ;")
-        
-        lines.append("/POS")
-        last_p = {'x':0,'y':0,'z':0,'w':0,'p':0,'r':0}
-        
-        for i, inst in enumerate(instructions, 1):
-            pt = inst['point']
-            p = self.points.get(pt, self.points.get(pt.lower(), last_p))
-            if pt in self.points or pt.lower() in self.points:
-                last_p = p
-            
-            lines.append(f"P[{i}]{{")
-            lines.append("   GP1:")
-            lines.append("    UF : 0, UT : 1,")
-            lines.append(f"    X = {p['x']:.3f} mm, Y = {p['y']:.3f} mm, Z = {p['z']:.3f} mm,")
-            lines.append(f"    W = {p['w']:.3f} deg, P = {p['p']:.3f} deg, R = {p['r']:.3f} deg")
-            lines.append("};")
-        
-        lines.append("/END")
-        return '\n'.join(lines)
+result_cache = ResultCache(
+    max_entries=app.config['RESULT_CACHE_ENTRIES'],
+    max_bytes=app.config['RESULT_CACHE_BYTES'],
+    disk_dir=os.path.join('temp', 'cache') if app.config['RESULT_CACHE_DISK'] else None,
+    disk_max_bytes=app.config['RESULT_CACHE_DISK_BYTES'],
+    disk_ttl=app.config['RESULT_CACHE_DISK_TTL'],
+)
+result_cache.start_sweeper()
 
+# 增量转换：例行程序/程序段级结果缓存的最多条目数
+app.config['UNIT_CACHE_ENTRIES'] = int(os.environ.get('ROBOTQU_UNIT_CACHE_ENTRIES', 4096))
 
-# ==================== PLC转换器（新增：欧姆龙→汇川） ====================
+unit_cache = UnitCache(max_entries=app.config['UNIT_CACHE_ENTRIES'])
 
-class OmronToInovance:
-    """欧姆龙PLC (CP/CJ/NX系列) 转 汇川PLC (H3U/H5U/AC800系列)"""
-    
-    def __init__(self):
-        self.variable_decls = []
-        
-    def convert(self, content):
-        """主转换入口"""
-        print("🔍 解析欧姆龙ST程序...")
-        
-        # 尝试提取变量声明区
-        var_pattern = r'VAR\s+(.*?)\s+END_VAR'
-        program_pattern = r'END_VAR\s+(.*?)\s+END_PROGRAM'
-        
-        var_match = re.search(var_pattern, content, re.DOTALL | re.IGNORECASE)
-        prog_match = re.search(program_pattern, content, re.DOTALL | re.IGNORECASE)
-        
-        if var_match:
-            self.parse_variables(var_match.group(1))
-        
-        if prog_match:
-            program_body = prog_match.group(1)
-        else:
-            # 如果没有标准结构，尝试分离PROGRAM...END_PROGRAM
-            prog_simple = re.search(r'PROGRAM\s+\w+\s+(.*?)\s+END_PROGRAM', content, re.DOTALL | re.IGNORECASE)
-            if prog_simple:
-                program_body = prog_simple.group(1)
-                # 检查是否有VAR区
-                var_in_prog = re.search(r'VAR\s+(.*?)END_VAR\s+(.*)', program_body, re.DOTALL | re.IGNORECASE)
-                if var_in_prog:
-                    self.parse_variables(var_in_prog.group(1))
-                    program_body = var_in_prog.group(2)
-            else:
-                program_body = content  # 原始内容
-        
-        # 转换程序体
-        converted_body = self.convert_body(program_body)
-        
-        return self.generate_inovance_code(converted_body)
-    
-    def parse_variables(self, var_content):
-        """解析变量声明区"""
-        print("  解析变量声明...")
-        var_lines = var_content.strip().split('\n')
-        
-        for line in var_lines:
-            line = line.strip()
-            if not line or line.startswith('//') or line.startswith('(*'):
-                continue
-            
-            # 匹配：变量名 : 类型 @ 地址
-            at_pattern = r'(\w+)\s*:\s*(\w+)\s*AT\s*([^;]+);?'
-            normal_pattern = r'(\w+)\s*:\s*([\w\(\)]+);?'
-            
-            match = re.match(at_pattern, line, re.IGNORECASE)
-            if match:
-                name, var_type, address = match.groups()
-                new_addr = self.convert_address(address.strip())
-                self.variable_decls.append({
-                    'name': name,
-                    'type': self.convert_type(var_type),
-                    'address': new_addr,
-                    'comment': f'原欧姆龙: {address}'
-                })
-                print(f"    {name}: {var_type} @ {address} -> {new_addr}")
-            else:
-                match = re.match(normal_pattern, line, re.IGNORECASE)
-                if match:
-                    name, var_type = match.groups()
-                    self.variable_decls.append({
-                        'name': name,
-                        'type': self.convert_type(var_type),
-                        'address': None,
-                        'comment': ''
-                    })
-    
-    def convert_body(self, body):
-        """转换程序主体"""
-        print("  转换程序逻辑...")
-        result = body
-        
-        # 地址转换（从复杂到简单）
-        # CIO位寻址 CIO0.00 -> %QX0.0
-        result = re.sub(r'CIO(\d+)\.(\d+)', lambda m: f'%QX{m.group(1)}.{m.group(2)}', result)
-        # CIO字寻址 CIO100 -> %QW100
-        result = re.sub(r'CIO(\d+)([^.\d])', lambda m: f'%QW{m.group(1)}{m.group(2)}', result)
-        
-        # W区域 W0.00 -> %MX0.0, W0 -> %MW0
-        result = re.sub(r'W(\d+)\.(\d+)', lambda m: f'%MX{m.group(1)}.{m.group(2)}', result)
-        result = re.sub(r'W(\d+)([^.\d])', lambda m: f'%MW{m.group(1)}{m.group(2)}', result)
-        
-        # D区域 D0 -> %MD0
-        result = re.sub(r'D(\d+)([^.\d])', lambda m: f'%MD{m.group(1)}{m.group(2)}', result)
-        
-        # H区域（保持继电器）映射到高位
-        result = re.sub(r'H(\d+)\.(\d+)', 
-                       lambda m: f'%MX{900+int(m.group(1))}.{m.group(2)}', result)
-        
-        # T/C定时器计数器
-        result = re.sub(r'\bTIM(\d+)\b', r'%MT\1', result)
-        result = re.sub(r'\bCNT(\d+)\b', r'%MC\1', result)
-        result = re.sub(r'\bT(\d+)\b', r'%MT\1', result)
-        result = re.sub(r'\bC(\d+)\b', r'%MC\1', result)
-        
-        # 指令转换
-        result = re.sub(r'MOV\(([^,]+),\s*([^)]+)\)', r'\2 := \1;', result, flags=re.IGNORECASE)
-        result = re.sub(r'SET\(([^)]+)\)', r'\1 := TRUE;', result, flags=re.IGNORECASE)
-        result = re.sub(r'RSET\(([^)]+)\)', r'\1 := FALSE;', result, flags=re.IGNORECASE)
-        
-        # 语法标准化
-        result = re.sub(r'IF\s+(.+?)\s+THEN', r'IF \1 THEN', result, flags=re.IGNORECASE)
-        result = re.sub(r'END_IF', r'END_IF;', result, flags=re.IGNORECASE)
-        result = re.sub(r'END_WHILE', r'END_WHILE;', result, flags=re.IGNORECASE)
-        result = re.sub(r'END_FOR', r'END_FOR;', result, flags=re.IGNORECASE)
-        
-        return result
-    
-    def convert_address(self, addr):
-        """转换单个地址"""
-        addr = addr.strip().upper()
-        
-        if addr.startswith('%'):
-            addr = addr[1:]  # 去掉前面的%
-        
-        if addr.startswith('CIO'):
-            match = re.match(r'CIO(\d+)\.(\d+)', addr)
-            if match:
-                return f'%QX{match.group(1)}.{match.group(2)}'
-            match = re.match(r'CIO(\d+)', addr)
-            if match:
-                return f'%QW{match.group(1)}'
-        
-        if addr.startswith('D'):
-            num = re.search(r'\d+', addr)
-            if num:
-                return f'%MD{num.group()}'
-        
-        if addr.startswith('W'):
-            match = re.match(r'W(\d+)\.(\d+)', addr)
-            if match:
-                return f'%MX{match.group(1)}.{match.group(2)}'
-            match = re.match(r'W(\d+)', addr)
-            if match:
-                return f'%MW{match.group(1)}'
-        
-        return f'%{addr}' if not addr.startswith('%') else addr
-    
-    def convert_type(self, var_type):
-        """转换数据类型"""
-        type_map = {
-            'BOOL': 'BOOL',
-            'INT': 'INT',
-            'DINT': 'DINT',
-            'UINT': 'UINT',
-            'UDINT': 'UDINT',
-            'REAL': 'REAL',
-            'LREAL': 'LREAL',
-            'STRING': 'STRING(255)',
-            'BYTE': 'BYTE',
-            'WORD': 'WORD',
-            'DWORD': 'DWORD',
-            'TIME': 'TIME',
-        }
-        upper_type = var_type.upper().split('(')[0]  # 处理STRING(20)这种情况
-        return type_map.get(upper_type, var_type)
-    
-    def generate_inovance_code(self, body):
-        """生成汇川ST代码"""
-        print("🔧 生成汇川ST程序...")
-        
-        lines = []
-        lines.append("PROGRAM PLC_PRG")
-        lines.append("VAR")
-        
-        if self.variable_decls:
-            for var in self.variable_decls:
-                if var['address']:
-                    lines.append(f"    {var['name']} AT {var['address']} : {var['type']}; (* {var['comment']} *)")
-                else:
-                    lines.append(f"    {var['name']} : {var['type']};")
-        else:
-            lines.append("    (* 请在此处声明变量 *)")
-        
-        lines.append("END_VAR")
-        lines.append("")
-        lines.append("(* ========================================== *)")
-        lines.append("(* 由 Robot_Qu 工业程序转换器生成 *)")
-        lines.append("(* 欧姆龙 (Omron) -> 汇川 (Inovance) *)")
-        lines.append("(* 生成时间: " + str(__import__('datetime').datetime.now()) + " *)")
-        lines.append("(* ========================================== *)")
-        lines.append("")
-        lines.append(body.strip())
-        lines.append("")
-        lines.append("END_PROGRAM")
-        
-        return '\n'.join(lines)
-
-
-# ==================== 转换器注册 ====================
-
-CONVERTERS = {
-    'robot': {
-        ('ABB', 'FANUC'): ABBtoFanuc,
-    },
-    'plc': {
-        ('Omron', 'Inovance'): OmronToInovance,  # 新增
-        ('Siemens', 'Mitsubishi'): None,  # 预留
-    }
-}
+# 转换结果存储：保留秒数、总大小上限、内存直出阈值（0表示全部落盘，仅单进程部署可开启）
+app.config['OUTPUT_TTL'] = int(os.environ.get('ROBOTQU_OUTPUT_TTL', 3600))
+app.config['OUTPUT_MAX_BYTES'] = int(os.environ.get('ROBOTQU_OUTPUT_MAX_BYTES', 512 * 1024 * 1024))
+app.config['OUTPUT_MEMORY_THRESHOLD'] = int(os.environ.get('ROBOTQU_OUTPUT_MEMORY_THRESHOLD', 0))
+
+output_store = OutputStore(
+    root=os.path.join('temp', 'outputs'),
+    ttl=app.config['OUTPUT_TTL'],
+    max_bytes=app.config['OUTPUT_MAX_BYTES'],
+    memory_threshold=app.config['OUTPUT_MEMORY_THRESHOLD'],
+)
+output_store.start_sweeper()
+
+job_queue = JobQueue(
+    max_workers=app.config['JOB_MAX_WORKERS'] or None,
+    max_queue=app.config['JOB_MAX_QUEUE'],
+    cache=result_cache,
+    store=output_store,
+    cpu_budget=app.config['JOB_CPU_SECONDS'],
+    wall_budget=app.config['JOB_WALL_SECONDS'],
+)
 
 # ==================== HTML前端 ====================
 
@@ -324,6 +78,7 @@ HTML_TEMPLATE = """
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>Robot_Qu 工业程序转换器 | Robot & PLC Converter</title>
+    <link rel="icon" type="image/png" href="{{ logo_png }}">
     <style>
         * { margin: 0; padding: 0; box-sizing: border-box; }
         
@@ -371,7 +126,8 @@ HTML_TEMPLATE = """
             box-shadow: 0 4px 15px rgba(0,0,0,0.2);
         }
         
-        .logo-container svg {
+        .logo-container img {
+            display: block;
             height: 40px;
             width: 80px;
         }
@@ -680,11 +436,7 @@ HTML_TEMPLATE = """
         <header>
             <div class="header-left">
                 <div class="logo-container">
-                    <svg viewBox="0 0 200 80">
-                        <text x="10" y="55" font-family="Arial" font-size="45" font-weight="bold" fill="#ff1493">RQ</text>
-                        <text x="75" y="30" font-family="Arial" font-size="11" fill="#333">robotqu.com</text>
-                        <path d="M 160 40 L 175 25 L 175 35 L 185 35 L 185 45 L 175 45 L 175 55 Z" fill="#333"/>
-                    </svg>
+                    <img src="{{ logo_svg }}" alt="Robot_Qu">
                 </div>
                 <div class="header-title">
                     <h1>🤖 工业程序转换器</h1>
@@ -915,11 +667,87 @@ HTML_TEMPLATE = """
 </html>
 """
 
+# 首页和静态文件在启动时读取、渲染并压缩一次（见 pages.py），ASGI入口共用
+static_assets = load_assets(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static'))
+
+with app.app_context():
+    index_page = CachedPage(render_template_string(
+        HTML_TEMPLATE,
+        logo_svg=asset_url(static_assets, 'logo.svg'),
+        logo_png=asset_url(static_assets, 'logo.png'),
+    ))
+
 # ==================== 后端路由 ====================
 
+def _page_response(page, cache):
+    # 按 Accept-Encoding 返回预压缩版本，If-None-Match 命中时返回 304
+    encoding, body, etag = page.select(request.headers.get('Accept-Encoding'))
+    if page.not_modified(request.headers.get('If-None-Match')):
+        response = Response(status=304)
+    else:
+        response = Response(body, content_type=page.content_type)
+        if encoding != 'identity':
+            response.headers['Content-Encoding'] = encoding
+    response.headers['ETag'] = etag
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Cache-Control'] = cache
+    return response
+
 @app.route('/')
 def index():
-    return render_template_string(HTML_TEMPLATE)
+    return _page_response(index_page, REVALIDATE)
+
+@app.route('/static/<path:filename>')
+def static_file(filename):
+    page = static_assets.get(filename)
+    if page is None:
+        return '文件不存在', 404
+    return _page_response(page, cache_control(page, request.args.get('v')))
+
+def _output_filename(filename, source, target, output_ext):
+    safe_filename = "".join(c for c in filename if c.isalnum() or c in ('.', '-', '_')).rstrip()
+    return f"{safe_filename.rsplit('.', 1)[0]}_{source}to{target}.{output_ext}"
+
+def _attachment_header(filename):
+    # RFC 5987编码，中文文件名也能作为响应头发送
+    return f"attachment; filename*=UTF-8''{quote(filename)}"
+
+def _flag(name):
+    # 表单或查询参数中的开关，如 timings=1
+    return (request.values.get(name) or '').lower() in ('1', 'true', 'yes')
+
+def _wants_timings():
+    # timings=1 时在响应中附带分阶段耗时
+    return _flag('timings')
+
+def convert_upload(data, filename, conv_type, source, target, incremental=False, timings=False):
+    """转换上传的文件并保存结果，返回响应字典（Flask与ASGI入口共用）
+
+    不支持的转换方向抛出 UnsupportedConversion。
+    """
+    # 查找转换器并执行转换（相同文件重复上传时直接命中缓存；incremental=1 时只重新转换改动过的单元）
+    stats, units = {}, {}
+    result, output_ext, cached = convert_cached(result_cache, conv_type, source, target, data,
+                                                stats=stats,
+                                                unit_cache=unit_cache if incremental else None,
+                                                units=units)
+    
+    # 保存文件（每次转换使用唯一键，同名文件互不覆盖）
+    output_filename = _output_filename(filename, source, target, output_ext)
+    key = output_store.put(output_filename, result)
+    
+    response = {
+        'success': True,
+        'message': f'转换成功 ({len(result)} 字符)',
+        'download_url': f'/download/{key}',
+        'filename': output_filename,
+        'cached': cached
+    }
+    if incremental:
+        response['units'] = units  # 命中缓存时为空
+    if timings:
+        response['timings'] = stats  # 命中缓存时为空
+    return response
 
 @app.route('/convert', methods=['POST'])
 def convert():
@@ -935,75 +763,210 @@ def convert():
         return jsonify({'success': False, 'message': '文件名为空'})
     
     try:
-        content = file.read().decode('utf-8', errors='ignore')
-        
-        # 查找转换器
-        type_converters = CONVERTERS.get(conv_type, {})
-        converter_class = type_converters.get((source, target))
-        
-        if converter_class is None:
-            available = [f"{k[0]}->{k[1]}" for k in type_converters.keys() if type_converters[k]]
-            return jsonify({
-                'success': False, 
-                'message': f'暂不支持 {source} -> {target}。可用转换: {", ".join(available)}'
-            })
-        
-        # 执行转换
-        if conv_type == 'robot':
-            converter = converter_class()
-            instructions = converter.parse_mod(content)
-            result = converter.generate_ls(instructions)
-            output_ext = "ls"
-            
-        elif conv_type == 'plc':
-            converter = converter_class()
-            result = converter.convert(content)
-            output_ext = "txt"  # PLC输出为ST文本
-            
-        else:
-            return jsonify({'success': False, 'message': '未知的转换类型'})
-        
-        # 保存文件
-        safe_filename = "".join(c for c in file.filename if c.isalnum() or c in ('.', '-', '_')).rstrip()
-        output_filename = f"{safe_filename.rsplit('.', 1)[0]}_{source}to{target}.{output_ext}"
-        output_path = os.path.join('temp', output_filename)
-        os.makedirs('temp', exist_ok=True)
-        
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(result)
-        
-        return jsonify({
-            'success': True,
-            'message': f'转换成功 ({len(result)} 字符)',
-            'download_url': f'/download/{output_filename}',
-            'filename': output_filename
-        })
+        try:
+            response = convert_upload(file.read(), file.filename, conv_type, source, target,
+                                      incremental=_flag('incremental'), timings=_wants_timings())
+        except UnsupportedConversion as e:
+            return jsonify({'success': False, 'message': str(e)})
+        return jsonify(response)
         
     except Exception as e:
-        import traceback
-        print(traceback.format_exc())  # 服务器端打印详细错误
+        app.logger.exception('转换出错')  # 服务器端记录详细错误
         return jsonify({
             'success': False,
             'message': f'转换出错: {str(e)}'
         })
 
-@app.route('/download/<filename>')
-def download(filename):
+@app.route('/convert/stream', methods=['POST'])
+def convert_stream():
+    """流式转换：请求体为原始文件内容，参数放在查询字符串中，结果以分块响应直接返回
+
+    上传内容按需增量解码，结果不落盘，也不在内存中拼成完整字符串。
+    例: curl --data-binary @a.mod "/convert/stream?type=robot&source=ABB&target=FANUC&filename=a.mod"
+    """
+    source = request.args.get('source')
+    target = request.args.get('target')
+    conv_type = request.args.get('type', 'robot')
+    filename = request.args.get('filename', 'upload')
+    
+    text_stream = io.TextIOWrapper(io.BufferedReader(request.stream), encoding='utf-8', errors='ignore')
+    try:
+        chunks, output_ext = stream_conversion(conv_type, source, target, text_stream)
+    except UnsupportedConversion as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    
+    def generate():
+        try:
+            for chunk in chunks:
+                yield chunk.encode('utf-8')
+        except Exception:
+            app.logger.exception('流式转换出错')  # 响应已开始发送，只能中断并在服务器端记录
+            raise
+    
+    return Response(
+        generate(),
+        mimetype='text/plain',
+        headers={'Content-Disposition': _attachment_header(_output_filename(filename, source, target, output_ext))}
+    )
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    """提交后台转换任务，立即返回任务ID"""
+    if 'file' not in request.files:
+        return jsonify({'success': False, 'message': '没有上传文件'}), 400
+    
+    file = request.files['file']
+    source = request.form.get('source')
+    target = request.form.get('target')
+    conv_type = request.form.get('type', 'robot')
+    
+    if file.filename == '':
+        return jsonify({'success': False, 'message': '文件名为空'}), 400
+    
+    try:
+        get_converter(conv_type, source, target)
+    except UnsupportedConversion as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    
+    output_filename = _output_filename(file.filename, source, target, output_extension(conv_type, source, target))
+    key, output_path = output_store.reserve(output_filename)
+    
+    try:
+        job_id = job_queue.submit(conv_type, source, target, file.read(),
+                                  output_path, output_filename, key=key)
+    except QueueFull as e:
+        return jsonify({'success': False, 'message': str(e)}), 429
+    
+    return jsonify({
+        'success': True,
+        'job_id': job_id,
+        'status': 'queued',
+        'status_url': f'/jobs/{job_id}'
+    }), 202
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    """查询后台任务状态，完成后返回下载地址"""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'success': False, 'message': '任务不存在'}), 404
+    
+    response = {'success': job['status'] not in ('error', 'timeout', 'cancelled'),
+                'job_id': job_id, 'status': job['status']}
+    if job['status'] == 'done':
+        response.update({
+            'message': f'转换成功 ({job["chars"]} 字符)',
+            'download_url': f'/download/{job["key"]}',
+            'filename': job['filename']
+        })
+    elif job['status'] == 'error':
+        response['message'] = f'转换出错: {job["error"]}'
+    elif job['status'] in ('timeout', 'cancelled'):
+        # stage 为中断时所在的转换阶段（如 split、body、parse）
+        response.update({'message': job['error'], 'stage': job['stage']})
+    if _wants_timings() and job['stats'] is not None:
+        response['timings'] = job['stats']
+    return jsonify(response)
+
+@app.route('/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    """取消后台任务：未开始的立即取消，执行中的由工作进程尽快中断"""
+    status = job_queue.cancel(job_id)
+    if status is None:
+        return jsonify({'success': False, 'message': '任务不存在'}), 404
+    if status not in ('cancelled', 'cancelling'):
+        return jsonify({'success': False, 'job_id': job_id, 'status': status,
+                        'message': '任务已结束，无法取消'}), 409
+    return jsonify({'success': True, 'job_id': job_id, 'status': status}), 202 if status == 'cancelling' else 200
+
+@app.route('/batch', methods=['POST'])
+def convert_batch():
+    """批量转换：上传zip/tar压缩包，流式返回结果zip（含manifest.json）"""
+    if 'file' not in request.files:
+        return jsonify({'success': False, 'message': '没有上传文件'}), 400
+    
+    file = request.files['file']
+    if file.filename == '':
+        return jsonify({'success': False, 'message': '文件名为空'}), 400
+    
+    stem = "".join(c for c in file.filename if c.isalnum() or c in ('.', '-', '_')).split('.', 1)[0] or 'batch'
+    # 请求结束时Werkzeug会关闭上传流，先转存到自有的临时文件（分块复制，不占内存）
+    upload = tempfile.TemporaryFile()
+    file.save(upload)
+    upload.seek(0)
+    
+    # 成员提交到后台任务的共用进程池，与 /jobs 共享并发数、排队上限和时间预算
+    chunks = iter_convert_archive(upload, queue=job_queue)
+    try:
+        first = next(chunks)  # 提前读取首块，压缩包格式错误时仍可返回JSON
+    except ValueError as e:
+        upload.close()
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except QueueFull as e:
+        upload.close()
+        return jsonify({'success': False, 'message': str(e)}), 429
+    
+    def generate():
+        try:
+            yield first
+            yield from chunks
+        finally:
+            upload.close()
+    
+    return Response(
+        generate(),
+        mimetype='application/zip',
+        headers={'Content-Disposition': _attachment_header(f'{stem}_converted.zip')}
+    )
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus格式的转换阶段耗时、计数以及缓存/任务队列状态"""
+    lines = [METRICS.render_prometheus().rstrip('\n')]
+    cache = result_cache.stats()
+    for name in ('hits', 'misses', 'evictions', 'disk_hits', 'disk_writes'):
+        lines.append(f'# TYPE robotqu_cache_{name}_total counter')
+        lines.append(f'robotqu_cache_{name}_total {cache[name]}')
+    lines.append('# TYPE robotqu_cache_entries gauge')
+    lines.append(f'robotqu_cache_entries {cache["entries"]}')
+    jobs = job_queue.stats()
+    lines.append('# TYPE robotqu_jobs_pending gauge')
+    lines.append(f'robotqu_jobs_pending {jobs["pending"]}')
+    lines.append('# TYPE robotqu_jobs_max_queue gauge')
+    lines.append(f'robotqu_jobs_max_queue {jobs["max_queue"]}')
+    return Response('\n'.join(lines) + '\n', mimetype='text/plain; version=0.0.4')
+
+@app.route('/cache/stats')
+def cache_stats():
+    """结果缓存命中/未命中/淘汰计数"""
+    stats = result_cache.stats()
+    stats['units'] = unit_cache.stats()
+    return jsonify(stats)
+
+@app.route('/download/<key>')
+def download(key):
     try:
-        file_path = os.path.join('temp', filename)
-        if os.path.exists(file_path):
-            return send_file(file_path, as_attachment=True)
-        else:
-            return "文件不存在", 404
+        entry = output_store.get(key)
+        if entry is None:
+            return "文件不存在或已过期", 404
+        if entry['data'] is not None:
+            return send_file(io.BytesIO(entry['data']), as_attachment=True, download_name=entry['filename'])
+        return send_file(entry['path'], as_attachment=True, download_name=entry['filename'])
     except Exception as e:
         return str(e), 500
 
 if __name__ == '__main__':
+    # 转换器日志默认INFO级别；设置 ROBOTQU_LOG_LEVEL=DEBUG 可查看逐个变量的地址映射
+    logging.basicConfig(level=os.environ.get('ROBOTQU_LOG_LEVEL', 'INFO'), format='%(message)s')
     print("="*70)
     print("🚀 Robot_Qu 工业程序转换器")
     print("支持：")
-    print("  - 机器人: ABB → FANUC")
-    print("  - PLC: 欧姆龙(Omron) → 汇川(Inovance)")
+    # 已实现的转换方向按注册表列出（预留的方向不显示）
+    labels = {'robot': '机器人', 'plc': 'PLC'}
+    for conv_type, pairs in CONVERTERS.items():
+        for (source, target), spec in pairs.items():
+            if spec:
+                print(f"  - {labels.get(conv_type, conv_type)}: {source} → {target}")
     print("="*70)
     print("访问: http://localhost:5000")
     print("按 Ctrl+C 停止")
@@ -0,0 +1,237 @@
+"""ASGI入口：异步接收上传，转换在有界线程池中执行
+
+    uvicorn asgi:application --host 0.0.0.0 --port 5000
+
+提供与Flask应用相同的 /、/convert 和 /download/<key>，共用结果缓存、增量缓存和结果存储；
+其余接口（/jobs、/batch、/convert/stream、/metrics 等）仍由Flask应用（app.py）提供。
+
+- 上传在事件循环中异步接收，网速慢的车间客户端不占用转换线程
+- 同时进行的转换数受信号量限制，已满时直接返回 429 和 Retry-After，不排队
+- 首页和静态文件与Flask应用共用启动时渲染、压缩好的版本，按 Accept-Encoding 直接返回，If-None-Match 命中时返回 304
+"""
+import asyncio
+import io
+import json
+import logging
+import mimetypes
+import os
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+
+from werkzeug.formparser import MultiPartParser
+from werkzeug.http import parse_options_header
+
+import app as flask_app
+from cache import CACHE_OPTIONS
+from converters import UnsupportedConversion, warm
+from pages import REVALIDATE, cache_control
+
+logger = logging.getLogger(__name__)
+
+# 同时进行的转换数上限（0表示按CPU核心数），已满时 429 响应中建议的重试秒数
+MAX_CONCURRENCY = int(os.environ.get('ROBOTQU_ASGI_CONCURRENCY', 0)) or os.cpu_count() or 1
+RETRY_AFTER = int(os.environ.get('ROBOTQU_ASGI_RETRY_AFTER', 5))
+
+_CHUNK = 64 * 1024  # 下载时每次读取的字节数
+
+
+class _Disconnected(Exception):
+    """客户端在请求体传完之前断开"""
+
+
+class Application:
+    """ASGI应用"""
+
+    def __init__(self, max_concurrency=MAX_CONCURRENCY, retry_after=RETRY_AFTER,
+                 max_content_length=flask_app.app.config['MAX_CONTENT_LENGTH']):
+        self.max_concurrency = max_concurrency
+        self.retry_after = retry_after
+        self.max_content_length = max_content_length
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='convert')
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self.index = flask_app.index_page
+        self.assets = flask_app.static_assets
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+
+        path, method = scope['path'], scope['method']
+        try:
+            if path == '/' and method in ('GET', 'HEAD'):
+                await self._serve_page(scope, send, self.index, REVALIDATE)
+            elif path.startswith('/static/') and method in ('GET', 'HEAD'):
+                await self._static(scope, path[len('/static/'):], send)
+            elif path == '/convert' and method == 'POST':
+                await self._convert(scope, receive, send)
+            elif path.startswith('/download/') and method in ('GET', 'HEAD'):
+                await self._download(scope, path[len('/download/'):], send)
+            else:
+                await _respond(send, 404, b'Not Found', 'text/plain; charset=utf-8')
+        except _Disconnected:
+            pass
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                # 预热转换引擎，首个请求不承担导入和编译的开销
+                await asyncio.get_running_loop().run_in_executor(self._executor, lambda: warm(**CACHE_OPTIONS))
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self._executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _static(self, scope, name, send):
+        page = self.assets.get(name)
+        if page is None:
+            await _respond(send, 404, '文件不存在'.encode('utf-8'), 'text/plain; charset=utf-8')
+            return
+        query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+        await self._serve_page(scope, send, page, cache_control(page, query.get('v', [None])[-1]))
+
+    async def _serve_page(self, scope, send, page, cache):
+        headers = _headers(scope)
+        common = [(b'vary', b'Accept-Encoding'), (b'cache-control', cache.encode())]
+        if page.not_modified(headers.get('if-none-match')):
+            _, _, etag = page.select(headers.get('accept-encoding'))
+            await _respond(send, 304, b'', None, [(b'etag', etag.encode()), *common])
+            return
+        encoding, body, etag = page.select(headers.get('accept-encoding'))
+        extra = [(b'etag', etag.encode()), *common]
+        if encoding != 'identity':
+            extra.append((b'content-encoding', encoding.encode()))
+        await _respond(send, 200, body, page.content_type, extra, head=scope['method'] == 'HEAD')
+
+    async def _convert(self, scope, receive, send):
+        # 转换线程已满时在接收上传之前就拒绝，不浪费带宽
+        if self._slots.locked():
+            await self._busy(send)
+            return
+        headers = _headers(scope)
+        length = headers.get('content-length')
+        if length and length.isdigit() and int(length) > self.max_content_length:
+            await _respond_json(send, {'success': False, 'message': '文件过大'}, 413)
+            return
+        body = await _read_body(receive, self.max_content_length)
+        if body is None:
+            await _respond_json(send, {'success': False, 'message': '文件过大'}, 413)
+            return
+
+        if self._slots.locked():
+            await self._busy(send)
+            return
+        async with self._slots:
+            loop = asyncio.get_running_loop()
+            response = await loop.run_in_executor(
+                self._executor, _convert_request, headers.get('content-type', ''), body, scope.get('query_string', b''))
+        await _respond_json(send, response)
+
+    async def _busy(self, send):
+        await _respond_json(send, {'success': False, 'message': '服务器繁忙，请稍后重试'}, 429,
+                            [(b'retry-after', str(self.retry_after).encode())])
+
+    async def _download(self, scope, key, send):
+        loop = asyncio.get_running_loop()
+        entry = await loop.run_in_executor(None, flask_app.output_store.get, key)  # 文件读写不占用转换线程
+        if entry is None:
+            await _respond(send, 404, '文件不存在或已过期'.encode('utf-8'), 'text/plain; charset=utf-8')
+            return
+
+        content_type = mimetypes.guess_type(entry['filename'])[0] or 'application/octet-stream'
+        extra = [(b'content-disposition', flask_app._attachment_header(entry['filename']).encode('latin-1'))]
+        head = scope['method'] == 'HEAD'
+        if entry['data'] is not None:
+            await _respond(send, 200, entry['data'], content_type, extra, head=head)
+            return
+
+        try:
+            f = await loop.run_in_executor(None, open, entry['path'], 'rb')
+        except OSError:
+            await _respond(send, 404, '文件不存在或已过期'.encode('utf-8'), 'text/plain; charset=utf-8')
+            return
+        try:
+            size = os.fstat(f.fileno()).st_size
+            await send({'type': 'http.response.start', 'status': 200,
+                        'headers': [(b'content-type', content_type.encode()),
+                                    (b'content-length', str(size).encode()), *extra]})
+            if head:
+                await send({'type': 'http.response.body', 'body': b''})
+                return
+            while True:
+                chunk = await loop.run_in_executor(None, f.read, _CHUNK)
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': bool(chunk)})
+                if not chunk:
+                    break
+        finally:
+            f.close()
+
+
+def _convert_request(content_type, body, query_string):
+    """在转换线程中解析 multipart 表单并转换，返回响应字典（与Flask /convert 相同）"""
+    mimetype, options = parse_options_header(content_type)
+    boundary = options.get('boundary', '').encode('latin-1')
+    if mimetype != 'multipart/form-data' or not boundary:
+        return {'success': False, 'message': '没有上传文件'}
+
+    form, files = MultiPartParser().parse(io.BytesIO(body), boundary, len(body))
+    query = {name: values[-1] for name, values in parse_qs(query_string.decode('latin-1')).items()}
+
+    def flag(name):
+        return (form.get(name) or query.get(name) or '').lower() in ('1', 'true', 'yes')
+
+    file = files.get('file')
+    if file is None:
+        return {'success': False, 'message': '没有上传文件'}
+    if file.filename == '':
+        return {'success': False, 'message': '文件名为空'}
+
+    try:
+        return flask_app.convert_upload(file.read(), file.filename, form.get('type', 'robot'),
+                                        form.get('source'), form.get('target'),
+                                        incremental=flag('incremental'), timings=flag('timings'))
+    except UnsupportedConversion as e:
+        return {'success': False, 'message': str(e)}
+    except Exception as e:
+        logger.exception('转换出错')  # 服务器端记录详细错误
+        return {'success': False, 'message': f'转换出错: {str(e)}'}
+
+
+def _headers(scope):
+    return {name.decode('latin-1').lower(): value.decode('latin-1') for name, value in scope['headers']}
+
+
+async def _read_body(receive, limit):
+    """异步接收完整请求体，超过 limit 字节时返回None"""
+    chunks, size = [], 0
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            raise _Disconnected()
+        chunk = message.get('body', b'')
+        size += len(chunk)
+        if size > limit:
+            return None
+        chunks.append(chunk)
+        if not message.get('more_body'):
+            return b''.join(chunks)
+
+
+async def _respond(send, status, body, content_type, headers=(), head=False):
+    response_headers = [(b'content-length', str(len(body)).encode())]
+    if content_type:
+        response_headers.append((b'content-type', content_type.encode()))
+    response_headers.extend(headers)
+    await send({'type': 'http.response.start', 'status': status, 'headers': response_headers})
+    await send({'type': 'http.response.body', 'body': b'' if head else body})
+
+
+async def _respond_json(send, data, status=200, headers=()):
+    await _respond(send, status, json.dumps(data).encode('utf-8'), 'application/json', headers)
+
+
+application = Application()
@@ -0,0 +1,283 @@
+"""批量（压缩包）转换
+
+读取 zip / tar 压缩包，按扩展名把每个成员交给进程池转换，结果边转换边写入
+一个输出zip（含 manifest.json），整个压缩包不会一次性读入内存。
+
+命令行用法：
+    python batch.py cell.zip -o cell_converted.zip -j 4
+"""
+import argparse
+import contextlib
+import json
+import os
+import posixpath
+import sys
+import tarfile
+import zipfile
+import zlib
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from converters import EXTENSION_ROUTES, get_converter, run_conversion
+from converters.instrument import METRICS
+from jobs import QueueFull
+
+MANIFEST_NAME = 'manifest.json'
+MAX_MEMBER_BYTES = 64 * 1024 * 1024  # 单个成员解压后的大小上限
+MAX_COMPRESSION_RATIO = 200  # zip成员压缩比上限，程序文本一般在 20:1 以内
+_RATIO_MIN_BYTES = 1024 * 1024  # 小于此大小的成员不检查压缩比
+
+
+class _ChunkSink:
+    """只写缓冲区：zipfile 写入后由生成器取走数据，配合流式响应使用"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def iter_archive_members(fileobj, max_member_bytes=MAX_MEMBER_BYTES, max_ratio=MAX_COMPRESSION_RATIO):
+    """逐个产出压缩包中的 (成员名, 字节内容, 错误信息)，fileobj 为zip时需可seek
+
+    成员解压后超过 max_member_bytes 字节、或zip成员压缩比超过 max_ratio 时不解压，
+    内容为None并给出错误信息；解压时最多读取 max_member_bytes + 1 字节，不信任压缩包中记录的大小。
+    压缩包本身无法读取时抛出 ValueError。
+    """
+    seekable = hasattr(fileobj, 'seekable') and fileobj.seekable()
+    if seekable and zipfile.is_zipfile(fileobj):
+        fileobj.seek(0)
+        try:
+            zf = zipfile.ZipFile(fileobj)
+        except (zipfile.BadZipFile, OSError) as e:
+            raise ValueError(f'压缩包已损坏: {e}')
+        with zf:
+            for info in zf.infolist():
+                if info.is_dir():
+                    continue
+                error = _oversized(info.file_size, info.compress_size, max_member_bytes, max_ratio)
+                if error is None:
+                    try:
+                        with zf.open(info) as f:
+                            data = f.read(max_member_bytes + 1)
+                    except (zipfile.BadZipFile, zlib.error, EOFError, RuntimeError, NotImplementedError) as e:
+                        # 成员损坏、加密或使用不支持的压缩方式
+                        yield info.filename, None, f'无法解压: {e}'
+                        continue
+                    if len(data) > max_member_bytes:
+                        data, error = None, _too_large(max_member_bytes)
+                yield info.filename, data if error is None else None, error
+        return
+
+    if seekable:
+        fileobj.seek(0)
+    try:
+        tf = tarfile.open(fileobj=fileobj, mode='r|*')
+    except tarfile.TarError:
+        raise ValueError('无法识别的压缩包格式，仅支持 zip / tar / tar.gz / tar.bz2 / tar.xz')
+    try:
+        with tf:
+            for member in tf:
+                if not member.isfile():
+                    continue
+                if member.size > max_member_bytes:
+                    yield member.name, None, _too_large(max_member_bytes)  # 流式读取时跳过，不解压其内容
+                    continue
+                yield member.name, tf.extractfile(member).read(max_member_bytes + 1), None
+    except (tarfile.TarError, EOFError, OSError, zlib.error) as e:
+        raise ValueError(f'压缩包已损坏: {e}')
+
+
+def _oversized(size, compressed, max_member_bytes, max_ratio):
+    if size > max_member_bytes:
+        return _too_large(max_member_bytes)
+    if size > _RATIO_MIN_BYTES and size > compressed * max_ratio:
+        return f'压缩比异常（{size // max(compressed, 1)}:1），不予解压'
+    return None
+
+
+def _too_large(max_member_bytes):
+    return f'文件解压后超过 {max_member_bytes // (1024 * 1024)} MB，不予解压'
+
+
+def _safe_member_name(name):
+    """去掉绝对路径和 .. ，防止解压输出时越界"""
+    parts = [p for p in posixpath.normpath(name.replace('\\', '/')).split('/') if p not in ('', '.', '..')]
+    return '/'.join(parts)
+
+
+def _convert_member(conv_type, source, target, data):
+    """在工作进程中转换单个成员，错误以消息返回，避免跨进程传递异常对象"""
+    stats = {}
+    try:
+        content = data.decode('utf-8', errors='ignore')
+        result, output_ext = run_conversion(conv_type, source, target, content, stats=stats)
+        return True, result, output_ext, stats
+    except Exception as e:
+        return False, f'转换出错: {e}', None, stats
+
+
+def _unique_name(name, used):
+    """同名输出（不同目录下大小写不同、路径规范化后相同等）依次加 _2、_3 … 后缀"""
+    stem, ext = posixpath.splitext(name)
+    candidate, n = name, 1
+    while candidate.lower() in used:
+        n += 1
+        candidate = f'{stem}_{n}{ext}'
+    used.add(candidate.lower())
+    return candidate
+
+
+def iter_convert_archive(fileobj, max_workers=None, queue=None):
+    """转换压缩包，逐块产出结果zip的字节
+
+    queue 为 jobs.JobQueue 时成员提交到共用的任务进程池，受队列的并发数、排队上限和时间预算约束；
+    否则（命令行）使用本次调用自己的进程池。首块产出之前压缩包无法读取时抛出 ValueError，
+    队列已满时抛出 QueueFull；之后出现的错误记入 manifest。
+    """
+    sink = _ChunkSink()
+    manifest = []
+    used_names = {MANIFEST_NAME}
+    if queue is None:
+        workers = max_workers or os.cpu_count() or 1
+        pool = ProcessPoolExecutor(max_workers=workers)
+        submit = pool.submit
+    else:
+        workers = queue.max_workers or os.cpu_count() or 1
+        pool = None
+        submit = queue.run
+    max_inflight = workers * 2  # 限制在途成员数，内存占用与压缩包大小无关
+    started = False  # 是否已产出数据（之后的错误无法再以错误响应返回）
+
+    with contextlib.ExitStack() as stack:
+        if pool is not None:
+            stack.enter_context(pool)
+        zout = stack.enter_context(zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED))
+        inflight = {}
+
+        def collect(futures):
+            for future in futures:
+                name, route = inflight.pop(future)
+                ok, payload, output_ext, stats = future.result()
+                METRICS.record(get_converter(*route).__name__, stats, ok)
+                entry = {'source': name, 'type': route[0], 'from': route[1], 'to': route[2]}
+                if ok:
+                    stem = posixpath.splitext(_safe_member_name(name))[0]
+                    output_name = _unique_name(f'{stem}_{route[1]}to{route[2]}.{output_ext}', used_names)
+                    zout.writestr(output_name, payload)
+                    entry.update({'status': 'ok', 'output': output_name, 'chars': len(payload)})
+                else:
+                    entry.update({'status': 'error', 'message': payload})
+                manifest.append(entry)
+
+        def drain():
+            nonlocal started
+            data = sink.drain()
+            started = started or bool(data)
+            return data
+
+        members = iter_archive_members(fileobj)
+        while True:
+            try:
+                name, data, error = next(members)
+            except StopIteration:
+                break
+            except ValueError as e:
+                if not started:
+                    raise
+                manifest.append({'source': None, 'status': 'error', 'message': str(e)})
+                break
+            route = EXTENSION_ROUTES.get(posixpath.splitext(name)[1].lower())
+            if route is None:
+                manifest.append({'source': name, 'status': 'skipped', 'message': '不支持的文件类型'})
+                continue
+            if error is not None:
+                manifest.append({'source': name, 'status': 'error', 'message': error})
+                continue
+            while True:
+                try:
+                    future = submit(_convert_member, *route, data)
+                    break
+                except QueueFull as e:
+                    # 共用队列已满：等本压缩包的在途成员完成后重试，没有在途成员时放弃
+                    if not inflight:
+                        if not started:
+                            raise
+                        manifest.append({'source': name, 'status': 'error', 'message': str(e)})
+                        future = None
+                        break
+                    done, _ = wait(inflight, return_when=FIRST_COMPLETED)
+                    collect(done)
+                    yield drain()
+            del data
+            if future is None:
+                continue
+            inflight[future] = (name, route)
+            if len(inflight) >= max_inflight:
+                done, _ = wait(inflight, return_when=FIRST_COMPLETED)
+                collect(done)
+                yield drain()
+
+        while inflight:
+            done, _ = wait(inflight, return_when=FIRST_COMPLETED)
+            collect(done)
+            yield drain()
+
+        summary = {
+            'total': len(manifest),
+            'ok': sum(1 for e in manifest if e['status'] == 'ok'),
+            'error': sum(1 for e in manifest if e['status'] == 'error'),
+            'skipped': sum(1 for e in manifest if e['status'] == 'skipped'),
+        }
+        zout.writestr(MANIFEST_NAME, json.dumps({'summary': summary, 'files': manifest},
+                                                ensure_ascii=False, indent=2))
+    yield sink.drain()
+
+
+def _strip_archive_suffix(path):
+    for suffix in ('.tar.gz', '.tar.bz2', '.tar.xz', '.tgz', '.zip', '.tar'):
+        if path.lower().endswith(suffix):
+            return path[:-len(suffix)]
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Robot_Qu 批量转换：转换 zip/tar 压缩包中的全部程序文件')
+    parser.add_argument('archive', help='输入压缩包（zip / tar / tar.gz ...），- 表示从标准输入读取tar流')
+    parser.add_argument('-o', '--output', help='输出zip路径，默认 <输入名>_converted.zip')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='工作进程数，默认CPU核心数')
+    args = parser.parse_args(argv)
+
+    if args.archive == '-':
+        src = sys.stdin.buffer
+        output = args.output or 'converted.zip'
+    else:
+        src = open(args.archive, 'rb')
+        output = args.output or f'{_strip_archive_suffix(args.archive)}_converted.zip'
+
+    try:
+        with open(output, 'wb') as out:
+            for chunk in iter_convert_archive(src, max_workers=args.jobs):
+                out.write(chunk)
+    except ValueError as e:
+        print(f'❌ {e}', file=sys.stderr)
+        return 1
+    finally:
+        if src is not sys.stdin.buffer:
+            src.close()
+
+    print(f'✅ 输出: {output}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
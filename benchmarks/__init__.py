@@ -0,0 +1 @@
+"""转换器性能基准测试（python -m benchmarks.run）"""
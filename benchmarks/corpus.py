@@ -0,0 +1,188 @@
+"""基准测试用的合成程序生成器
+
+生成结构上接近现场程序的 ABB RAPID 模块、FANUC LS 程序和欧姆龙 ST 程序，规模可参数化。
+相同参数和随机种子总是生成相同的文本，便于不同版本之间对比。
+"""
+import math
+import random
+
+
+def _unit_quaternion(rng):
+    q = [rng.gauss(0, 1) for _ in range(4)]
+    n = math.sqrt(sum(v * v for v in q)) or 1.0
+    return [v / n for v in q]
+
+
+def generate_rapid(robtargets=1000, moves=2000, procs=10, seed=0):
+    """生成RAPID模块
+
+    robtargets: robtarget 声明数量
+    moves:      MoveJ/MoveL 指令数量，平均分布到 procs 个例行程序中
+    约1/8的运动指令跨行书写（逗号续行），并夹杂注释行和未声明的点。
+    """
+    rng = random.Random(seed)
+    lines = ['MODULE BenchModule']
+    for i in range(robtargets):
+        q = _unit_quaternion(rng)
+        lines.append(
+            f'    CONST robtarget p{i}:=[[{rng.uniform(-1500, 1500):.2f},{rng.uniform(-1500, 1500):.2f},'
+            f'{rng.uniform(0, 2000):.2f}],[{q[0]:.6f},{q[1]:.6f},{q[2]:.6f},{q[3]:.6f}],'
+            f'[0,0,0,0],[9E9,9E9,9E9,9E9,9E9,9E9]];')
+    lines.append('    PERS tooldata tGun:=[TRUE,[[0,0,250],[1,0,0,0]],[2,[0,0,100],[1,0,0,0],0,0,0]];')
+
+    procs = max(1, procs)
+    per_proc = math.ceil(moves / procs) if moves else 0
+    written = 0
+    for p in range(procs):
+        lines.append('')
+        lines.append(f'    PROC Path{p}()')
+        for _ in range(min(per_proc, moves - written)):
+            move = 'MoveJ' if rng.random() < 0.4 else 'MoveL'
+            # 约2%引用未声明的点，覆盖"沿用上一点"的分支
+            point = f'p{rng.randrange(robtargets)}' if robtargets and rng.random() > 0.02 else f'pUndef{written}'
+            speed = rng.choice(('v100', 'v200', 'v500', 'v1000', 'v2000', 'vmax'))
+            zone = rng.choice(('fine', 'z1', 'z10', 'z50'))
+            if written % 8 == 0:
+                lines.append(f'        {move} {point},')
+                lines.append(f'            {speed}, {zone}, tGun;')
+            else:
+                lines.append(f'        {move} {point}, {speed}, {zone}, tGun;')
+            if written % 25 == 0:
+                lines.append('        ! 工位 %d 焊接段' % written)
+            written += 1
+        lines.append('    ENDPROC')
+    lines.append('ENDMODULE')
+    return '\n'.join(lines) + '\n'
+
+
+def generate_fanuc_ls(positions=1000, seed=0):
+    """生成FANUC LS程序
+
+    positions: 点位数（每个运动指令一个点，圆弧两个）
+    以直线、关节运动为主，夹杂圆弧、关节坐标点、带注释的点、坐标系切换和I/O指令，
+    点位记录带 CONFIG 和附加轴 E1。
+    """
+    rng = random.Random(seed)
+    mn, pos = [], []
+    n = k = 0
+    joints = set()
+    while k < positions:
+        n += 1
+        if n % 500 == 1:
+            mn.append(f'{n:4d}:  UFRAME_NUM={rng.randrange(3)} ;')
+            n += 1
+        r = rng.random()
+        if r < 0.05 and k + 2 <= positions:
+            mn.append(f'{n:4d}:C P[{k + 1}]    ')
+            mn.append(f'    :  P[{k + 2}] {rng.choice((100, 250, 500))}mm/sec CNT{rng.choice((0, 10, 50))}    ;')
+            k += 2
+        elif r < 0.45:
+            k += 1
+            if rng.random() < 0.1:
+                joints.add(k)
+            mn.append(f'{n:4d}:J P[{k}] {rng.choice((20, 50, 100))}% {rng.choice(("FINE", "CNT100"))}    ;')
+        elif r < 0.95:
+            k += 1
+            note = f':"APPR {k}"' if rng.random() < 0.05 else ''
+            mn.append(f'{n:4d}:L P[{k}{note}] {rng.choice((200, 1000, 2000))}mm/sec '
+                      f'{rng.choice(("FINE", "CNT30", "CNT100"))} {rng.choice(("", "ACC80"))}   ;')
+        else:
+            mn.append(f'{n:4d}:  DO[{rng.randrange(1, 32)}]={rng.choice(("ON", "OFF"))} ;')
+        if n % 50 == 0:
+            mn.append(f'{n + 1:4d}:  ! 工位 {n} ;')
+            n += 1
+
+    for i in range(1, k + 1):
+        uf = rng.randrange(3)
+        if i in joints:
+            values = ',\n    '.join((
+                ', '.join(f'J{j} = {rng.uniform(-170, 170):8.3f} deg' for j in (1, 2, 3)),
+                ', '.join(f'J{j} = {rng.uniform(-170, 170):8.3f} deg' for j in (4, 5, 6))))
+            pos.append(f'P[{i}]{{\n   GP1:\n    UF : {uf}, UT : 1,\n    {values}\n}};')
+        else:
+            pos.append(
+                f"P[{i}]{{\n   GP1:\n    UF : {uf}, UT : 1,     CONFIG : 'N U T, 0, 0, 0',\n"
+                f"    X = {rng.uniform(-1500, 1500):9.3f}  mm,    Y = {rng.uniform(-1500, 1500):9.3f}  mm,"
+                f"    Z = {rng.uniform(0, 2000):9.3f}  mm,\n"
+                f"    W = {rng.uniform(-180, 180):8.3f} deg,    P = {rng.uniform(-89, 89):8.3f} deg,"
+                f"    R = {rng.uniform(-180, 180):8.3f} deg,\n"
+                f"    E1 = {rng.uniform(0, 3000):9.3f}  mm\n}};")
+
+    header = ['/PROG  BENCH', '/ATTR', 'OWNER\t\t= MNEDITOR;', 'COMMENT\t\t= "";', f'LINE_COUNT\t= {n};',
+              'DEFAULT_GROUP\t= 1,*,*,*,*;', '/MN']
+    return '\n'.join(header + mn + ['/POS'] + pos + ['/END']) + '\n'
+
+
+_OMRON_AREAS = ('CIO', 'W', 'D', 'H')
+_OMRON_TYPES = ('BOOL', 'INT', 'DINT', 'REAL', 'WORD')
+
+
+def _omron_address(rng, area, bit):
+    if bit and area in ('CIO', 'W', 'H'):
+        return f'{area}{rng.randrange(512)}.{rng.randrange(16):02d}'
+    return f'{area}{rng.randrange(4096)}'
+
+
+def generate_omron_st(lines=2000, variables=200, depth=6, seed=0):
+    """生成欧姆龙ST程序
+
+    lines:     程序体语句行数（近似）
+    variables: VAR 区声明数量，约一半带 AT 地址
+    depth:     IF 嵌套深度
+    程序体密集使用 CIO/W/D/H/TIM/CNT 地址和 MOV/SET/RSET 指令，并夹杂注释和字符串。
+    """
+    rng = random.Random(seed)
+    out = ['PROGRAM BenchProgram', 'VAR']
+    for i in range(variables):
+        var_type = rng.choice(_OMRON_TYPES)
+        if i % 2 == 0:
+            area = rng.choice(_OMRON_AREAS[:3])
+            out.append(f'    v{i} : {var_type} AT {_omron_address(rng, area, var_type == "BOOL")};')
+        else:
+            out.append(f'    v{i} : {var_type};')
+    out.append('    msg : STRING(40);')
+    out.append('END_VAR')
+
+    def statement(indent):
+        pad = '    ' * indent
+        kind = rng.randrange(8)
+        a = _omron_address(rng, rng.choice(_OMRON_AREAS), rng.random() < 0.5)
+        b = _omron_address(rng, 'D', False)
+        if kind == 0:
+            return f'{pad}MOV({b}, {_omron_address(rng, "W", False)});'
+        if kind == 1:
+            return f'{pad}SET({_omron_address(rng, "CIO", True)});'
+        if kind == 2:
+            return f'{pad}RSET({_omron_address(rng, "W", True)});'
+        if kind == 3:
+            return f'{pad}v{rng.randrange(variables or 1)} := {b} + TIM{rng.randrange(256)} + CNT{rng.randrange(256)};'
+        if kind == 4:
+            return f'{pad}(* 检查 {a} 状态 *)'
+        if kind == 5:
+            return f"{pad}msg := 'STEP {rng.randrange(100)}';"
+        return f'{pad}v{rng.randrange(variables or 1)} := {a};'
+
+    written = 0
+    while written < lines:
+        level = 0
+        for level in range(depth):
+            cond = _omron_address(rng, rng.choice(('CIO', 'W', 'H')), True)
+            out.append('    ' * (level + 1) + f'IF {cond}  AND NOT v{rng.randrange(variables or 1)}   THEN')
+            written += 1
+        for _ in range(rng.randrange(3, 8)):
+            out.append(statement(depth + 1))
+            written += 1
+        if rng.random() < 0.3:
+            out.append('    ' * (depth + 1) + 'FOR i := 0 TO 9 DO')
+            out.append(statement(depth + 2))
+            out.append('    ' * (depth + 1) + 'END_FOR')
+            written += 3
+        for level in reversed(range(depth)):
+            if level == depth - 1 and rng.random() < 0.5:
+                out.append('    ' * (level + 1) + 'ELSE')
+                out.append(statement(level + 2))
+                written += 2
+            out.append('    ' * (level + 1) + 'END_IF;')
+            written += 1
+    out.append('END_PROGRAM')
+    return '\n'.join(out) + '\n'
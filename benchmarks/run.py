@@ -0,0 +1,225 @@
+"""转换器基准测试
+
+    python -m benchmarks.run                          # 默认规模
+    python -m benchmarks.run --sizes 1000,10000,50000 -r 5 -o results.json
+    python -m benchmarks.run --compare results.json   # 与之前的结果对比
+
+每个用例分阶段计时（解析/生成分开），取多次运行的最小值与中位数；
+另做一次 tracemalloc 运行记录各阶段的峰值内存增量。结果可写成JSON供对比。
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+from benchmarks.corpus import generate_fanuc_ls, generate_omron_st, generate_rapid
+from converters import ABBtoFanuc, OmronToInovance, abb_fanuc
+from converters.fanuc_abb import FanucToABB
+
+
+class _CountingSink:
+    """只统计字符数的输出，避免把写文件的开销算进转换时间"""
+
+    def __init__(self):
+        self.chars = 0
+
+    def write(self, text):
+        self.chars += len(text)
+
+
+def _rapid_case(text):
+    def make_state():
+        return {'converter': ABBtoFanuc(), 'text': text}
+
+    def parse(state):
+        state['instructions'] = state['converter'].parse_mod(state['text'])
+
+    def generate(state):
+        state['output'] = state['converter'].generate_ls(state['instructions'])
+
+    return make_state, [('parse', parse), ('generate', generate)]
+
+
+def _rapid_stream_case(text):
+    # 输入在计时和内存测量之外准备好，每轮回到开头重读，峰值内存只反映转换本身
+    source = io.StringIO(text)
+
+    def make_state():
+        source.seek(0)
+        return {'converter': ABBtoFanuc(), 'source': source}
+
+    def stream(state):
+        state['converter'].convert_stream(state['source'], _CountingSink())
+
+    return make_state, [('stream', stream)]
+
+
+def _fanuc_case(text):
+    source = io.StringIO(text)
+
+    def make_state():
+        source.seek(0)
+        return {'converter': FanucToABB(deterministic=True), 'source': source}
+
+    def stream(state):
+        state['converter'].convert_stream(state['source'], _CountingSink())
+
+    return make_state, [('stream', stream)]
+
+
+def _omron_case(text):
+    def make_state():
+        return {'converter': OmronToInovance(deterministic=True), 'text': text}
+
+    def split(state):
+        state['var_texts'], state['body'] = state['converter'].split_sections(state['text'])
+
+    def variables(state):
+        for var_text in state['var_texts']:
+            state['converter'].parse_variables(var_text)
+
+    def body(state):
+        state['converted'] = state['converter'].convert_body(state['body'])
+
+    def generate(state):
+        state['output'] = state['converter'].generate_inovance_code(state['converted'])
+
+    return make_state, [('split', split), ('variables', variables), ('body', body), ('generate', generate)]
+
+
+def run_phases(make_state, phases, repeat):
+    """返回 {阶段: {'times': [...], 'peak_bytes': n}}"""
+    results = {name: {'times': []} for name, _ in phases}
+    for _ in range(repeat):
+        state = make_state()
+        for name, fn in phases:
+            t0 = time.perf_counter()
+            fn(state)
+            results[name]['times'].append(time.perf_counter() - t0)
+
+    # 单独一轮测内存，tracemalloc 本身会拖慢执行，不参与计时
+    tracemalloc.start()
+    try:
+        state = make_state()
+        for name, fn in phases:
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+            fn(state)
+            results[name]['peak_bytes'] = tracemalloc.get_traced_memory()[1] - base
+    finally:
+        tracemalloc.stop()
+    return results
+
+
+CASES = {
+    'rapid': (lambda size, args: generate_rapid(robtargets=size // 2, moves=size, procs=max(1, size // 200)),
+              _rapid_case),
+    'rapid_stream': (lambda size, args: generate_rapid(robtargets=size // 2, moves=size, procs=max(1, size // 200)),
+                     _rapid_stream_case),
+    'fanuc': (lambda size, args: generate_fanuc_ls(positions=size), _fanuc_case),
+    'omron': (lambda size, args: generate_omron_st(lines=size, variables=max(10, size // 10), depth=args.depth),
+              _omron_case),
+}
+
+
+def run(args):
+    results = []
+    devnull = open(os.devnull, 'w')
+    try:
+        for case in args.cases:
+            make_text, make_case = CASES[case]
+            for size in args.sizes:
+                text = make_text(size, args)
+                input_bytes = len(text.encode('utf-8'))
+                make_state, phases = make_case(text)
+                with contextlib.redirect_stdout(devnull):  # 转换器自带的进度打印不计入输出
+                    phase_results = run_phases(make_state, phases, args.repeat)
+                for phase, r in phase_results.items():
+                    times = r['times']
+                    median = statistics.median(times)
+                    results.append({
+                        'case': case,
+                        'size': size,
+                        'input_bytes': input_bytes,
+                        'phase': phase,
+                        'repeat': len(times),
+                        'min_s': min(times),
+                        'median_s': median,
+                        'mean_s': statistics.fmean(times),
+                        'mb_per_s': input_bytes / median / 1e6 if median else None,
+                        'peak_bytes': r['peak_bytes'],
+                    })
+                    print(f"{case:<13} {size:>8} {phase:<10} "
+                          f"min {min(times) * 1000:9.2f} ms  median {median * 1000:9.2f} ms  "
+                          f"peak {r['peak_bytes'] / 1e6:8.2f} MB", flush=True)
+    finally:
+        devnull.close()
+    return results
+
+
+def metadata():
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': abb_fanuc.np.__version__ if abb_fanuc.np is not None else None,
+    }
+
+
+def compare(results, baseline_path):
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f)
+    base = {(r['case'], r['size'], r['phase']): r for r in baseline['results']}
+    print()
+    print(f"对比基准: {baseline_path} ({baseline['meta'].get('timestamp')})")
+    for r in results:
+        old = base.get((r['case'], r['size'], r['phase']))
+        if old is None:
+            continue
+        speedup = old['median_s'] / r['median_s'] if r['median_s'] else float('inf')
+        mem = r['peak_bytes'] / old['peak_bytes'] if old['peak_bytes'] else float('nan')
+        print(f"{r['case']:<13} {r['size']:>8} {r['phase']:<10} "
+              f"速度 x{speedup:6.2f}  内存 x{mem:6.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Robot_Qu 转换器基准测试')
+    parser.add_argument('--cases', default=','.join(CASES),
+                        help=f'逗号分隔的用例，可选: {", ".join(CASES)}')
+    parser.add_argument('--sizes', default='1000,10000',
+                        help='逗号分隔的规模（运动指令数 / ST语句行数）')
+    parser.add_argument('--depth', type=int, default=6, help='ST程序IF嵌套深度')
+    parser.add_argument('-r', '--repeat', type=int, default=3, help='每个用例的计时次数')
+    parser.add_argument('-o', '--output', help='结果JSON输出路径')
+    parser.add_argument('--compare', help='与之前保存的结果JSON对比')
+    args = parser.parse_args(argv)
+
+    args.cases = [c.strip() for c in args.cases.split(',') if c.strip()]
+    unknown = [c for c in args.cases if c not in CASES]
+    if unknown:
+        parser.error(f'未知用例: {", ".join(unknown)}')
+    args.sizes = [int(s) for s in args.sizes.split(',') if s.strip()]
+
+    results = run(args)
+    report = {'meta': metadata(), 'args': {'sizes': args.sizes, 'depth': args.depth, 'repeat': args.repeat},
+              'results': results}
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f'结果已写入 {args.output}')
+    if args.compare:
+        compare(results, args.compare)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,242 @@
+"""转换结果缓存
+
+按 (文件字节, 转换器类, 转换器版本, 选项) 的SHA-256做内容寻址：
+内存层为有容量上限的LRU，可选磁盘层位于 temp/cache/ 下，进程间共享；
+磁盘层由清理线程按TTL和总大小上限淘汰（命中时刷新修改时间，按最近使用淘汰）。
+命中时直接返回结果，跳过解码和解析。本模块不依赖Flask。
+"""
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from converters import get_converter, run_conversion
+from converters.incremental import convert_incremental
+
+logger = logging.getLogger(__name__)
+
+# 缓存路径下的转换总是使用确定性输出（不含生成时间），否则相同输入无法复用
+CACHE_OPTIONS = {'deterministic': True}
+
+
+def cache_key(data, converter_class, options=None):
+    """计算缓存键"""
+    h = hashlib.sha256()
+    meta = {
+        'converter': f'{converter_class.__module__}.{converter_class.__qualname__}',
+        'version': getattr(converter_class, 'version', ''),
+        'options': options or {},
+    }
+    h.update(json.dumps(meta, sort_keys=True).encode('utf-8'))
+    h.update(b'\0')
+    h.update(data)
+    return h.hexdigest()
+
+
+class ResultCache:
+    """两级结果缓存
+
+    max_entries: 内存层最多条目数，0表示不使用内存层
+    max_bytes:   内存层结果文本总字符数上限
+    disk_dir:    磁盘层目录，None表示不使用磁盘层
+    disk_max_bytes: 磁盘层文件总字节数上限，超出时清理从最久未使用的开始淘汰
+    disk_ttl:    磁盘层条目未被使用超过该秒数即删除，0表示不按时间删除
+    sweep_interval: 后台清理间隔秒数
+    """
+
+    def __init__(self, max_entries=256, max_bytes=64 * 1024 * 1024, disk_dir=None,
+                 disk_max_bytes=1024 * 1024 * 1024, disk_ttl=7 * 24 * 3600, sweep_interval=300):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self.disk_ttl = disk_ttl
+        self.sweep_interval = sweep_interval
+        self._sweeper = None
+        self._stop = threading.Event()
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_hits = 0
+        self.disk_writes = 0
+        self.disk_evictions = 0
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, key[:2], key)
+
+    def get(self, key):
+        """返回 (结果文本, 输出扩展名)，未命中返回None"""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+
+        if self.disk_dir:
+            path = self._disk_path(key)
+            try:
+                with open(path, 'r', encoding='utf-8', newline='') as f:
+                    output_ext = f.readline().rstrip('\n')
+                    value = (f.read(), output_ext)
+            except FileNotFoundError:
+                pass
+            else:
+                with contextlib.suppress(OSError):
+                    os.utime(path)  # 记录最近使用时间，清理时按此淘汰
+                with self._lock:
+                    self.hits += 1
+                    self.disk_hits += 1
+                self._remember(key, value)
+                return value
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, value):
+        """写入缓存，value 为 (结果文本, 输出扩展名)"""
+        self._remember(key, value)
+        if self.disk_dir:
+            path = self._disk_path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+                f.write(value[1] + '\n')
+                f.write(value[0])
+            os.replace(tmp_path, path)  # 原子替换，并发写同一键也不会读到半个文件
+            with self._lock:
+                self.disk_writes += 1
+
+    def _remember(self, key, value):
+        size = len(value[0])
+        if self.max_entries <= 0 or size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old[0])
+            self._entries[key] = value
+            self._size += size
+            while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted[0])
+                self.evictions += 1
+
+    def sweep(self):
+        """清理磁盘层：删除过期条目和残留的临时文件，总大小超限时从最久未使用的开始淘汰，返回删除数量"""
+        if not self.disk_dir:
+            return 0
+        now = time.time()
+        removed = 0
+        entries = []  # (修改时间, 字节数, 路径)
+        try:
+            with os.scandir(self.disk_dir) as shards:
+                for shard in shards:
+                    if not shard.is_dir():
+                        continue
+                    with os.scandir(shard.path) as files:
+                        for f in files:
+                            try:
+                                st = f.stat()
+                            except FileNotFoundError:
+                                continue
+                            if f.name.endswith('.tmp'):
+                                # 写入中断留下的临时文件；正在写入的文件修改时间很新，不会误删
+                                if now - st.st_mtime > 3600:
+                                    removed += _remove(f.path)
+                            elif self.disk_ttl and now - st.st_mtime > self.disk_ttl:
+                                removed += _remove(f.path)
+                            else:
+                                entries.append((st.st_mtime, st.st_size, f.path))
+        except FileNotFoundError:
+            pass
+
+        total = sum(e[1] for e in entries)
+        if total > self.disk_max_bytes:
+            entries.sort()
+            for _, size, path in entries:
+                if total <= self.disk_max_bytes:
+                    break
+                removed += _remove(path)
+                total -= size
+        with self._lock:
+            self.disk_evictions += removed
+        return removed
+
+    def _sweep_loop(self):
+        while not self._stop.wait(self.sweep_interval):
+            try:
+                self.sweep()
+            except Exception:  # 清理失败不能让线程退出
+                logger.exception("⚠️ 清理磁盘缓存失败")
+
+    def start_sweeper(self):
+        """启动磁盘层后台清理线程（守护线程，未启用磁盘层或重复调用时无副作用）"""
+        if self.disk_dir and self._sweeper is None:
+            self._sweeper = threading.Thread(target=self._sweep_loop, name='cache-sweeper', daemon=True)
+            self._sweeper.start()
+
+    def stop_sweeper(self):
+        if self._sweeper is not None:
+            self._stop.set()
+            self._sweeper.join()
+            self._sweeper = None
+            self._stop.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'disk_hits': self.disk_hits,
+                'disk_writes': self.disk_writes,
+                'disk_evictions': self.disk_evictions,
+                'entries': len(self._entries),
+                'chars': self._size,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'disk': bool(self.disk_dir),
+            }
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:  # 其他进程已删除
+        return 0
+    return 1
+
+
+def convert_cached(cache, conv_type, source, target, data, stats=None, unit_cache=None, units=None):
+    """带缓存的转换，data 为上传的原始字节，返回 (结果文本, 输出扩展名, 是否命中)
+
+    stats 同 run_conversion，命中缓存时保持为空。
+    传入 unit_cache 且转换器支持拆分单元时，未命中的文件走增量转换，只重新转换内容有变化的例行程序/程序段；
+    units 传入字典时填入增量转换报告（见 convert_incremental）。
+    """
+    converter_class = get_converter(conv_type, source, target)
+    key = cache_key(data, converter_class, CACHE_OPTIONS)
+    value = cache.get(key)
+    if value is not None:
+        return value[0], value[1], True
+
+    content = data.decode('utf-8', errors='ignore')
+    if unit_cache is not None and hasattr(converter_class, 'split_units'):
+        result, output_ext, report = convert_incremental(conv_type, source, target, content, unit_cache,
+                                                         stats=stats, **CACHE_OPTIONS)
+        value = (result, output_ext)
+        if units is not None:
+            units.update(report)
+    else:
+        value = run_conversion(conv_type, source, target, content, stats=stats, **CACHE_OPTIONS)
+    cache.put(key, value)
+    return value[0], value[1], False
@@ -0,0 +1,193 @@
+"""命令行转换（不启动Web服务，不导入Flask）
+
+    python cli.py program.mod                     # 输出 program_ABBtoFANUC.ls（与输入同目录）
+    python cli.py plant/ -o converted/ -j 8       # 递归转换目录，按原目录结构输出到 converted/
+    python cli.py - --ext .st < main.st > out.txt # 标准输入 -> 标准输出
+    python cli.py main.st --profile line3.json    # 按工厂的地址映射配置转换欧姆龙程序
+
+按扩展名选择转换方向（与批量转换相同），也可用 --type/--source/--target 指定。
+输出文件比输入新时跳过（--force 强制重新转换）。
+"""
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from converters import (CONVERTERS, EXTENSION_ROUTES, OUTPUT_EXTENSIONS, UnsupportedConversion,
+                        get_converter, output_extension, run_conversion, run_file_conversion)
+from converters.addressing import ProfileError, load_profile
+
+
+def output_name(path, route):
+    """输出文件名，与 /convert、批量转换的命名一致：<原名>_<源>to<目标>.<扩展名>"""
+    conv_type, source, target = route
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return f'{stem}_{source}to{target}.{output_extension(conv_type, source, target)}'
+
+
+def _output_suffixes():
+    # 本工具生成的文件（如 main_OmrontoInovance.txt）扩展名也可能被识别为输入，遍历时排除
+    suffixes = set()
+    for conv_type, type_converters in CONVERTERS.items():
+        for (source, target), spec in type_converters.items():
+            if spec:
+                suffixes.add(f'_{source}to{target}.{output_extension(conv_type, source, target)}'.lower())
+    return tuple(suffixes)
+
+
+def iter_inputs(paths, route=None, output_dir=None):
+    """产出 (输入路径, 输出路径, 转换方向)；目录递归遍历，只取能识别扩展名的文件"""
+    suffixes = _output_suffixes()
+    skip_dir = os.path.abspath(output_dir) if output_dir else None
+
+    for path in paths:
+        if not os.path.isdir(path):
+            file_route = route or EXTENSION_ROUTES.get(os.path.splitext(path)[1].lower())
+            if file_route is None:
+                raise UnsupportedConversion(f'无法根据扩展名判断转换方向: {path}（请指定 --type/--source/--target）')
+            out_dir = output_dir or os.path.dirname(path)
+            yield path, os.path.join(out_dir, output_name(path, file_route)), file_route
+            continue
+
+        for dirpath, dirnames, filenames in os.walk(path):
+            dirnames[:] = sorted(d for d in dirnames if os.path.abspath(os.path.join(dirpath, d)) != skip_dir)
+            rel = os.path.relpath(dirpath, path)
+            out_dir = os.path.normpath(os.path.join(output_dir, rel)) if output_dir else dirpath
+            for name in sorted(filenames):
+                if name.lower().endswith(suffixes):
+                    continue
+                file_route = EXTENSION_ROUTES.get(os.path.splitext(name)[1].lower())
+                if file_route is None or (route and file_route[0] != route[0]):
+                    continue
+                file_route = route or file_route
+                yield os.path.join(dirpath, name), os.path.join(out_dir, output_name(name, file_route)), file_route
+
+
+def is_up_to_date(in_path, out_path):
+    """输出存在且不早于输入时视为最新"""
+    try:
+        return os.path.getmtime(out_path) >= os.path.getmtime(in_path)
+    except OSError:
+        return False
+
+
+def converter_options(route, profile=None):
+    """转换器构造参数：地址映射配置只用于PLC转换"""
+    options = {'deterministic': True}
+    if profile and route[0] == 'plc':
+        options['profile'] = profile
+    return options
+
+
+def convert_file(in_path, out_path, route, profile=None):
+    """在工作进程中转换单个文件，返回 (是否成功, 消息)；错误以消息返回，避免跨进程传递异常对象"""
+    try:
+        result, _ = run_file_conversion(*route, in_path, **converter_options(route, profile))
+        os.makedirs(os.path.dirname(out_path) or '.', exist_ok=True)
+        tmp_path = f'{out_path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+            f.write(result)
+        os.replace(tmp_path, out_path)  # 中断时不会留下半个输出文件，也不会被误判为最新
+        return True, f'{len(result)} 字符'
+    except Exception as e:
+        return False, f'转换出错: {e}'
+
+
+def convert_stdin(route, profile=None):
+    content = sys.stdin.buffer.read().decode('utf-8', errors='ignore')
+    result, _ = run_conversion(*route, content, **converter_options(route, profile))
+    sys.stdout.write(result)
+    return 0
+
+
+def run(tasks, jobs=None, force=False, quiet=False, profile=None):
+    """执行转换任务，返回 (成功数, 跳过数, 失败数)"""
+    def report(symbol, in_path, message):
+        if not quiet or symbol == '❌':
+            print(f'{symbol} {in_path}: {message}', file=sys.stderr if symbol == '❌' else sys.stdout)
+
+    pending = []
+    skipped = 0
+    for in_path, out_path, route in tasks:
+        if not force and is_up_to_date(in_path, out_path):
+            skipped += 1
+            report('⏭️', in_path, '输出已是最新，跳过')
+        else:
+            pending.append((in_path, out_path, route))
+
+    ok = failed = 0
+    workers = min(jobs or os.cpu_count() or 1, len(pending))
+    if workers <= 1:
+        # 单个文件或 -j 1 时直接在本进程转换，省去启动进程池的开销
+        results = ((task, convert_file(*task, profile)) for task in pending)
+    else:
+        pool = ProcessPoolExecutor(max_workers=workers)
+        futures = {pool.submit(convert_file, *task, profile): task for task in pending}
+        results = ((futures[f], f.result()) for f in as_completed(futures))
+
+    try:
+        for (in_path, out_path, route), (success, message) in results:
+            if success:
+                ok += 1
+                report('✅', in_path, f'-> {out_path} ({message})')
+            else:
+                failed += 1
+                report('❌', in_path, message)
+    finally:
+        if workers > 1:
+            pool.shutdown()
+    return ok, skipped, failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Robot_Qu 命令行转换：转换文件、目录或标准输入')
+    parser.add_argument('paths', nargs='+', help='输入文件或目录（递归），- 表示标准输入（结果写到标准输出）')
+    parser.add_argument('-o', '--output', help='输出目录，目录输入时按原结构镜像；默认写在输入文件旁边')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='工作进程数，默认CPU核心数')
+    parser.add_argument('-f', '--force', action='store_true', help='即使输出比输入新也重新转换')
+    parser.add_argument('-q', '--quiet', action='store_true', help='只输出错误')
+    parser.add_argument('--type', dest='conv_type', choices=sorted(OUTPUT_EXTENSIONS), help='转换类型')
+    parser.add_argument('--source', help='源品牌，如 ABB / Omron')
+    parser.add_argument('--target', help='目标品牌，如 FANUC / Inovance')
+    parser.add_argument('--ext', help='标准输入时按此扩展名选择转换方向，如 .mod')
+    parser.add_argument('--profile', help='欧姆龙→汇川地址映射配置文件（JSON/YAML），默认使用内置映射')
+    args = parser.parse_args(argv)
+
+    route = None
+    if args.conv_type or args.source or args.target:
+        if not (args.conv_type and args.source and args.target):
+            parser.error('--type、--source、--target 需同时指定')
+        route = (args.conv_type, args.source, args.target)
+
+    try:
+        if route:
+            get_converter(*route)  # 尽早报告不支持的方向
+        if args.profile:
+            load_profile(args.profile)  # 尽早报告配置错误
+
+        if args.paths == ['-']:
+            if route is None:
+                route = EXTENSION_ROUTES.get((args.ext or '').lower())
+                if route is None:
+                    parser.error('标准输入需指定 --ext 或 --type/--source/--target')
+            return convert_stdin(route, args.profile)
+        if '-' in args.paths:
+            parser.error('- 不能与其他路径同时使用')
+
+        missing = [p for p in args.paths if not os.path.exists(p)]
+        if missing:
+            parser.error(f'路径不存在: {", ".join(missing)}')
+
+        tasks = list(iter_inputs(args.paths, route, args.output))
+    except (UnsupportedConversion, ProfileError) as e:
+        print(f'❌ {e}', file=sys.stderr)
+        return 2
+
+    ok, skipped, failed = run(tasks, jobs=args.jobs, force=args.force, quiet=args.quiet, profile=args.profile)
+    if not args.quiet:
+        print(f'完成: {ok} 个成功, {skipped} 个跳过, {failed} 个失败')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,230 @@
+"""转换器注册表
+
+不依赖Flask，Web服务、后台任务进程均从这里查找转换器。
+注册表中只记录 "模块:类名"，首次使用时才导入对应模块，
+命令行和工作进程只会加载实际用到的转换器（及其依赖，如NumPy）。
+
+每个转换方向（及选项）在进程内有一个可复用的 Engine：构造时预热（导入转换器、编译地址映射配置等），
+之后每次转换只新建一个转换器实例作为本次调用的上下文（点位表、变量表、计时），
+引擎本身不保存单次转换的状态，可在多个线程间共享。
+"""
+import importlib
+import json
+import threading
+
+from .instrument import METRICS
+
+# ==================== 转换器注册 ====================
+
+CONVERTERS = {
+    'robot': {
+        ('ABB', 'FANUC'): 'abb_fanuc:ABBtoFanuc',
+        ('FANUC', 'ABB'): 'fanuc_abb:FanucToABB',
+    },
+    'plc': {
+        ('Omron', 'Inovance'): 'omron_inovance:OmronToInovance',  # 新增
+        ('Siemens', 'Mitsubishi'): None,  # 预留
+    }
+}
+
+_loaded = {}  # "模块:类名" -> 已导入的转换器类
+
+# 各转换类型的输出文件扩展名
+OUTPUT_EXTENSIONS = {
+    'robot': 'ls',
+    'plc': 'txt',  # PLC输出为ST文本
+}
+
+# 输出扩展名与所属转换类型不同的转换方向
+DIRECTION_EXTENSIONS = {
+    ('robot', 'FANUC', 'ABB'): 'mod',
+}
+
+# 批量转换时按源文件扩展名选择默认转换方向 (类型, 源品牌, 目标品牌)
+EXTENSION_ROUTES = {
+    '.mod': ('robot', 'ABB', 'FANUC'),
+    '.ls': ('robot', 'FANUC', 'ABB'),
+    '.st': ('plc', 'Omron', 'Inovance'),
+    '.txt': ('plc', 'Omron', 'Inovance'),
+    '.csv': ('plc', 'Omron', 'Inovance'),  # 符号表导出
+}
+
+
+class UnsupportedConversion(ValueError):
+    """请求的转换方向未注册"""
+
+
+def get_converter(conv_type, source, target):
+    """查找转换器类，不支持时抛出 UnsupportedConversion（消息可直接返回给前端）"""
+    if conv_type not in OUTPUT_EXTENSIONS:
+        raise UnsupportedConversion('未知的转换类型')
+
+    type_converters = CONVERTERS.get(conv_type, {})
+    spec = type_converters.get((source, target))
+    if spec is None:
+        available = [f"{k[0]}->{k[1]}" for k in type_converters.keys() if type_converters[k]]
+        raise UnsupportedConversion(f'暂不支持 {source} -> {target}。可用转换: {", ".join(available)}')
+    return load_converter(spec)
+
+
+def output_extension(conv_type, source, target):
+    """转换方向的输出文件扩展名（不导入转换器）"""
+    return DIRECTION_EXTENSIONS.get((conv_type, source, target)) or OUTPUT_EXTENSIONS[conv_type]
+
+
+def load_converter(spec):
+    """按 "模块:类名" 导入转换器类（已是类时原样返回）"""
+    if not isinstance(spec, str):
+        return spec
+    converter_class = _loaded.get(spec)
+    if converter_class is None:
+        module_name, class_name = spec.split(':')
+        module = importlib.import_module(f'{__name__}.{module_name}')
+        converter_class = _loaded[spec] = getattr(module, class_name)
+    return converter_class
+
+
+def __getattr__(name):
+    # 兼容 from converters import ABBtoFanuc 的写法，同样按需导入
+    for type_converters in CONVERTERS.values():
+        for spec in type_converters.values():
+            if isinstance(spec, str) and spec.endswith(f':{name}'):
+                return load_converter(spec)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+class Engine:
+    """一个转换方向的可复用转换引擎（线程安全）
+
+    转换器类可提供 prepare(**options) 类方法，返回预热后的构造参数（如编译好的地址映射），
+    所有上下文共用这些只读资源。
+    """
+
+    def __init__(self, conv_type, source, target, **options):
+        self.conv_type = conv_type
+        self.converter_class = get_converter(conv_type, source, target)
+        self.output_ext = output_extension(conv_type, source, target)
+        self.options = options
+        prepare = getattr(self.converter_class, 'prepare', None)
+        self._shared = prepare(**options) if prepare else options
+
+    def context(self):
+        """新建一次转换的上下文（转换器实例）"""
+        return self.converter_class(**self._shared)
+
+    def convert(self, content, stats=None):
+        """转换文本，返回结果文本；stats 同 run_conversion"""
+        converter = self.context()
+        ok = False
+        try:
+            if hasattr(converter, 'parse_mod'):
+                instructions = converter.parse_mod(content)
+                result = converter.generate_ls(instructions)
+            else:
+                result = converter.convert(content)
+            ok = True
+        finally:
+            _record(converter, stats, ok)
+        return result
+
+    def convert_file(self, path, stats=None):
+        """转换文件，转换器提供 convert_file 时由它直接读取文件（如内存映射，只解码需要的区段）"""
+        if not hasattr(self.converter_class, 'convert_file'):
+            with open(path, 'rb') as f:
+                content = f.read().decode('utf-8', errors='ignore')
+            return self.convert(content, stats)
+
+        converter = self.context()
+        ok = False
+        try:
+            result = converter.convert_file(path)
+            ok = True
+        finally:
+            _record(converter, stats, ok)
+        return result
+
+    def stream(self, text_stream, chunk_size=64 * 1024):
+        """流式转换，返回文本块迭代器（见 stream_conversion）"""
+        converter = self.context()
+        if hasattr(converter, 'iter_instructions'):
+            chunks = converter.iter_ls(converter.iter_instructions(text_stream), chunk_size=chunk_size)
+        elif hasattr(converter, 'iter_convert'):
+            chunks = converter.iter_convert(text_stream, chunk_size=chunk_size)
+        else:
+            result = converter.convert(text_stream.read())
+            chunks = (result[i:i + chunk_size] for i in range(0, len(result), chunk_size))
+        return _recorded(converter, chunks)
+
+
+_engines = {}  # (类型, 源, 目标, 选项) -> Engine
+_engines_lock = threading.Lock()
+
+
+def get_engine(conv_type, source, target, **options):
+    """返回进程内共用的 Engine；选项含对象（如共享的 PointTable）时每次新建，不缓存"""
+    try:
+        key = json.dumps([conv_type, source, target, options], sort_keys=True)
+    except TypeError:
+        return Engine(conv_type, source, target, **options)
+    engine = _engines.get(key)
+    if engine is None:
+        with _engines_lock:
+            engine = _engines.get(key)
+            if engine is None:
+                engine = _engines[key] = Engine(conv_type, source, target, **options)
+    return engine
+
+
+def warm(conv_types=None, **options):
+    """预热全部已注册的转换方向（如工作进程启动时），避免首个请求承担导入和编译的开销"""
+    for conv_type, type_converters in CONVERTERS.items():
+        if conv_types and conv_type not in conv_types:
+            continue
+        for (source, target), spec in type_converters.items():
+            if spec:
+                get_engine(conv_type, source, target, **options)
+
+
+def run_conversion(conv_type, source, target, content, stats=None, **options):
+    """执行一次转换，返回 (结果文本, 输出扩展名)；options 透传给转换器构造函数
+
+    stats 传入字典时填入本次转换的分阶段耗时和计数（StageTimings.as_dict()）。
+    """
+    engine = get_engine(conv_type, source, target, **options)
+    return engine.convert(content, stats), engine.output_ext
+
+
+def run_file_conversion(conv_type, source, target, path, stats=None, **options):
+    """转换文件，返回 (结果文本, 输出扩展名)
+
+    转换器提供 convert_file 时由它直接读取文件（如内存映射，只解码需要的区段），
+    否则整体读入后按 run_conversion 转换。
+    """
+    engine = get_engine(conv_type, source, target, **options)
+    return engine.convert_file(path, stats), engine.output_ext
+
+
+def stream_conversion(conv_type, source, target, text_stream, chunk_size=64 * 1024, **options):
+    """流式转换，text_stream 为文本流（逐行可迭代），返回 (文本块迭代器, 输出扩展名)
+
+    机器人程序（ABB→FANUC、FANUC→ABB）边读边转换，内存占用与文件大小无关；
+    PLC转换仍需完整程序文本，只对输出分块。
+    """
+    engine = get_engine(conv_type, source, target, **options)
+    return engine.stream(text_stream, chunk_size), engine.output_ext
+
+
+def _recorded(converter, chunks):
+    ok = False
+    try:
+        yield from chunks
+        ok = True
+    finally:
+        _record(converter, None, ok)
+
+
+def _record(converter, stats, ok):
+    data = converter.timings.as_dict()
+    if stats is not None:
+        stats.update(data)
+    METRICS.record(type(converter).__name__, data, ok)
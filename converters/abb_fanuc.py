@@ -0,0 +1,410 @@
+"""ABB RAPID -> FANUC LS 转换器"""
+import logging
+import math
+import tempfile
+
+from . import patterns, rapid
+from .instrument import StageTimings, no_gc
+from .symbols import PointTable
+
+try:
+    import numpy as np
+except ImportError:  # NumPy为可选依赖，缺失时退回纯Python计算
+    np = None
+
+logger = logging.getLogger(__name__)
+
+_ORIGIN = (0.0, 0.0, 0.0, 0.0, 0.0, 0.0)  # 第一个点未定义时使用的位置
+
+# /POS 中一个点的文本（笛卡尔 / 关节坐标）；按批拼接模板后一次格式化
+_POS_TEMPLATE = (
+    "P[%d]{\n"
+    "   GP1:\n"
+    "    UF : %d, UT : %d,\n"
+    "    X = %.3f mm, Y = %.3f mm, Z = %.3f mm,\n"
+    "    W = %.3f deg, P = %.3f deg, R = %.3f deg\n"
+    "};"
+)
+_JOINT_TEMPLATE = (
+    "P[%d]{\n"
+    "   GP1:\n"
+    "    UF : %d, UT : %d,\n"
+    "    J1 = %.3f deg, J2 = %.3f deg, J3 = %.3f deg,\n"
+    "    J4 = %.3f deg, J5 = %.3f deg, J6 = %.3f deg\n"
+    "};"
+)
+_POS_BATCH = 1024  # 每批格式化的点数
+_LOOKUP_LIMIT = 4096  # 速度、区域数据换算缓存的条目上限
+
+# ==================== 机器人转换器 ====================
+
+class ABBtoFanuc:
+    stream_batch_size = 4096  # 流式模式下每批做四元数转换的点数
+    version = '2.2'  # 输出格式变化时递增，结果缓存以此区分
+    
+    def __init__(self, deterministic=False, points=None, joints=None, lookup=None):
+        # 多个模块共用同一个 PointTable 时可跨模块解析目标点
+        self.points = points if points is not None else PointTable()  # robtarget
+        self.joints = joints if joints is not None else PointTable()  # jointtarget（J1-J6）
+        self.deterministic = deterministic  # LS输出不含时间戳，本身即确定
+        self.timings = StageTimings()
+        self.program = None  # parse_mod 得到的语法树（rapid.Program）
+        # 速度、区域数据的换算结果（按原文）；同一引擎的各次转换共用，见 prepare
+        self._speeds, self._zones = lookup if lookup is not None else ({}, {})
+    
+    @classmethod
+    def prepare(cls, **options):
+        """预热：返回同一引擎各次转换共用的构造参数（见 converters.Engine）"""
+        return dict(options, lookup=({}, {}))
+        
+    def parse_mod(self, content, module=None):
+        """解析为语法树并登记点位，返回运动指令（rapid.Move）列表
+
+        module 为文本开头所属的模块（增量转换时单独解析模块中的一段）。
+        """
+        with self.timings.stage('parse'):
+            self.program = rapid.parse(content, module)
+        
+        # 先收集全部robtarget，再批量做四元数->欧拉角转换
+        with self.timings.stage('robtargets'), no_gc():
+            targets = []
+            for decl in self.program.data():
+                self._collect(decl, targets)
+            self._register_points(targets)
+        self.timings.count('robtargets', len(targets))
+        
+        instructions = list(self.program.moves())
+        self.timings.count('instructions', len(instructions))
+        return instructions
+    
+    def iter_instructions(self, stream):
+        """流式解析：逐行读取.mod并惰性产出运动指令，生成器耗尽后 self.points 才完整"""
+        targets = []
+        robtargets = instructions = 0
+        for kind, node in rapid.iter_nodes(stream):
+            if kind == 'move':
+                instructions += 1
+                yield node
+            elif kind == 'data':
+                self._collect(node, targets)
+                if len(targets) >= self.stream_batch_size:
+                    robtargets += len(targets)
+                    self._register_points(targets)
+                    targets = []
+        self._register_points(targets)
+        self.timings.count('robtargets', robtargets + len(targets))
+        self.timings.count('instructions', instructions)
+    
+    def _collect(self, decl, targets):
+        """robtarget 暂存到 targets 待批量转换，jointtarget 直接登记（数组和非字面量初值不登记）；
+        例行程序内声明的数据登记在该例行程序自己的作用域中，不会覆盖同名的模块数据"""
+        if decl.dims:
+            return
+        # 只转换用到的数值：robtarget 的位置和姿态、jointtarget 的六个轴
+        if decl.datatype == 'robtarget':
+            values = decl.leading(7)
+            if values is not None and len(values) == 7:
+                targets.append((decl, values))
+        elif decl.datatype == 'jointtarget':
+            values = decl.leading(6)
+            if values is not None and len(values) == 6:
+                self.joints.add(decl.name, values, decl.module, decl.local, decl.routine)
+    
+    def _register_points(self, targets):
+        quats = []
+        for decl, values in targets:
+            quats.extend(values[3:7])
+        eulers = self.quaternions_to_euler(quats)
+        add = self.points.add
+        for (decl, values), wpr in zip(targets, eulers):
+            add(decl.name, (*values[:3], *wpr), decl.module, decl.local, decl.routine)
+    
+    def quaternion_to_euler(self, q1, q2, q3, q4):
+        r11 = 1 - 2*(q2**2 + q3**2)
+        r21 = 2*(q1*q2 + q3*q4)
+        r31 = 2*(q1*q3 - q2*q4)
+        r32 = 2*(q2*q3 + q1*q4)
+        r33 = 1 - 2*(q1**2 + q2**2)
+        w = math.atan2(r21, r11)
+        p = math.atan2(-r31, math.sqrt(r32**2 + r33**2))
+        r = math.atan2(r32, r33)
+        return math.degrees(w), math.degrees(p), math.degrees(r)
+    
+    def quaternions_to_euler(self, quats):
+        """批量四元数转欧拉角，quats为按 q1,q2,q3,q4 顺序排列的扁平序列"""
+        if np is None:
+            it = iter(quats)
+            return [self.quaternion_to_euler(*q) for q in zip(it, it, it, it)]
+        
+        q = np.asarray(quats, dtype=np.float64).reshape(-1, 4)
+        q1, q2, q3, q4 = q[:, 0], q[:, 1], q[:, 2], q[:, 3]
+        r11 = 1 - 2*(q2**2 + q3**2)
+        r21 = 2*(q1*q2 + q3*q4)
+        r31 = 2*(q1*q3 - q2*q4)
+        r32 = 2*(q2*q3 + q1*q4)
+        r33 = 1 - 2*(q1**2 + q2**2)
+        wpr = np.empty((len(q), 3), dtype=np.float64)
+        wpr[:, 0] = np.arctan2(r21, r11)
+        wpr[:, 1] = np.arctan2(-r31, np.sqrt(r32**2 + r33**2))
+        wpr[:, 2] = np.arctan2(r32, r33)
+        return [tuple(row) for row in np.degrees(wpr).tolist()]
+    
+    def convert_speed(self, speed, is_linear):
+        m = patterns.DIGITS.search(str(speed))
+        val = int(m.group()) if m else 1000
+        if is_linear:
+            return f"{val}mm/sec"
+        return f"{min(val//10, 100)}%"
+
+    def convert_zone(self, zone):
+        """fine -> FINE，zN -> CNTN（最大100），其他区域数据按FINE处理"""
+        m = patterns.ZONE.match(zone) if zone else None
+        return f"CNT{min(int(m.group(1)), 100)}" if m else "FINE"
+
+    def generate_ls(self, instructions, prog_name="CONV"):
+        with self.timings.stage('generate'):
+            return self._generate_ls(instructions, prog_name)
+    
+    def _generate_ls(self, instructions, prog_name):
+        lines = self._ls_header(prog_name)
+        records = []
+        
+        for mn, points in self._iter_motion(instructions):
+            lines.append(mn)
+            records.extend(points)
+        
+        lines.append("/POS")
+        last = [_ORIGIN, _ORIGIN]
+        lines.extend(_format_positions(
+            (k, uf, ut, joint, self._resolve_point(joint, target, module, routine, last))
+            for k, uf, ut, joint, module, routine, target in records))
+        lines.append("/END")
+        return '\n'.join(lines)
+    
+    def write_ls(self, instructions, sink, prog_name="CONV"):
+        """流式生成LS：/MN按块写入sink，点位记录暂存到临时文件，/MN结束后再追加/POS"""
+        for chunk in self.iter_ls(instructions, prog_name):
+            sink.write(chunk)
+    
+    def iter_ls(self, instructions, prog_name="CONV", chunk_size=64 * 1024):
+        """流式生成LS，按约 chunk_size 字符合并产出文本块（用于分块HTTP响应）"""
+        parts, size = [], 0
+        for part in self._iter_ls_parts(instructions, prog_name):
+            parts.append(part)
+            size += len(part)
+            if size >= chunk_size:
+                yield ''.join(parts)
+                parts, size = [], 0
+        if parts:
+            yield ''.join(parts)
+    
+    def _iter_ls_parts(self, instructions, prog_name):
+        yield '\n'.join(self._ls_header(prog_name))
+        
+        with tempfile.TemporaryFile('w+', encoding='utf-8') as spool:
+            for mn, points in self._iter_motion(instructions):
+                yield '\n' + mn
+                for k, uf, ut, joint, module, routine, target in points:
+                    if isinstance(target, tuple):
+                        target = '=' + ','.join(map(repr, target))
+                    spool.write(f"{k}\t{uf}\t{ut}\t{'J' if joint else 'P'}\t{module or ''}\t{routine or ''}\t{target or ''}\n")
+            
+            yield '\n/POS'
+            spool.seek(0)
+            for chunk in _format_positions(self._iter_spooled(spool)):
+                yield '\n' + chunk
+        
+        yield '\n/END'
+    
+    def _iter_spooled(self, spool):
+        """读回暂存的点位记录，产出 (P编号, UF, UT, 是否关节坐标, 位置)"""
+        last = [_ORIGIN, _ORIGIN]
+        for entry in spool:
+            k, uf, ut, kind, module, routine, target = entry.rstrip('\n').split('\t')
+            if target.startswith('='):
+                target = tuple(map(float, target[1:].split(',')))
+            joint = kind == 'J'
+            yield int(k), int(uf), int(ut), joint, self._resolve_point(
+                joint, target or None, module or None, routine or None, last)
+    
+    def _iter_motion(self, instructions):
+        """逐条产出 (/MN文本, 点位记录列表)；点位记录为 (P编号, UF, UT, 是否关节坐标, 模块, 例行程序, 目标)
+
+        /MN行号和P编号分别连续编号（MoveC占两个点，坐标系切换占一行）。
+        工件坐标 wobj0 为 UF 0、工具 tool0 为 UT 1，其余按首次使用的顺序依次编号。
+        内联目标点在此直接换算为位置，名称留到 /POS 时再按作用域查找。
+        目标点为表达式（Offs(...)、RelTool(...)、数组元素等）的指令无法换算，输出为注释行并记录警告。
+        """
+        frames, tools = {}, {}
+        speeds, zones = self._speeds, self._zones  # 取值很少，换算结果按原文缓存
+        if len(speeds) + len(zones) > _LOOKUP_LIMIT:
+            speeds.clear()
+            zones.clear()
+        uf, ut = 0, 1
+        wobj = tool = None
+        n = k = 0
+        for inst in instructions:
+            if _is_expression(inst.target) or _is_expression(inst.via):
+                n += 1
+                yield self._skipped_move(n, inst), []
+                continue
+            prefix = ''
+            if inst.wobj != wobj or inst.tool != tool:
+                wobj, tool = inst.wobj, inst.tool
+                inst_uf = self._frame_number(frames, wobj, 'wobj0', 0)
+                inst_ut = self._frame_number(tools, tool, 'tool0', 1)
+                if inst_uf != uf:
+                    n += 1
+                    uf = inst_uf
+                    prefix += f"  {n}:  UFRAME_NUM={uf} ;\n"
+                if inst_ut != ut:
+                    n += 1
+                    ut = inst_ut
+                    prefix += f"  {n}:  UTOOL_NUM={ut} ;\n"
+            
+            n += 1
+            k += 1
+            kind = inst.kind
+            motion = 'J' if kind == 'J' or kind == 'AbsJ' else kind
+            zone = zones.get(inst.zone)
+            if zone is None:
+                zone = zones[inst.zone] = self.convert_zone(inst.zone)
+            speed = speeds.get((inst.speed, motion))
+            if speed is None:
+                speed = speeds[inst.speed, motion] = self.convert_speed(inst.speed, motion != 'J')
+            
+            if kind == 'C':
+                mn = f"{prefix}  {n}:C  P[{k}]\n    :  P[{k + 1}] {speed} {zone} ;"
+                points = [(k, uf, ut, False, inst.module, inst.routine, self._inline_point(inst.via, False)),
+                          (k + 1, uf, ut, False, inst.module, inst.routine, self._inline_point(inst.target, False))]
+                k += 1
+            else:
+                mn = f"{prefix}  {n}:{motion}  P[{k}] {speed} {zone} ;"
+                joint = kind == 'AbsJ'
+                points = [(k, uf, ut, joint, inst.module, inst.routine, self._inline_point(inst.target, joint))]
+            yield mn, points
+    
+    def _skipped_move(self, n, inst):
+        """目标点无法换算的指令 -> /MN 注释行"""
+        targets = f"{inst.via}, {inst.target}" if inst.kind == 'C' else inst.target
+        text = ' '.join(f"Move{inst.kind} {targets}".replace(';', ' ').split())
+        logger.warning("⚠️ 第 %d 行 %s 的目标点为表达式，未转换", inst.line, text)
+        self.timings.count('skipped_moves')
+        return f"  {n}:  !{text} ;"
+
+    def _frame_number(self, numbers, name, default, base):
+        if not name or name.lower() == default:
+            return base
+        key = name.lower()
+        number = numbers.get(key)
+        if number is None:
+            number = numbers[key] = base + 1 + len(numbers)
+        return number
+    
+    def _inline_point(self, target, joint):
+        """内联数据 -> 位置元组，名称原样返回；数值不足时视为未定义"""
+        if target is None or isinstance(target, str):
+            return target
+        if joint:
+            return tuple(target[:6]) if len(target) >= 6 else None
+        if len(target) < 7:
+            return None
+        return tuple(target[:3]) + tuple(self.quaternion_to_euler(*target[3:7]))
+    
+    def convert_stream(self, stream, sink, prog_name="CONV"):
+        """流式转换：stream为文本行迭代器（如打开的.mod文件），结果写入sink"""
+        with self.timings.stage('stream'):
+            self.write_ls(self.iter_instructions(stream), sink, prog_name)
+    
+    # ---------- 增量转换（见 converters.incremental） ----------
+    
+    def split_units(self, content):
+        """按例行程序拆分，返回 [(单元名, 文本, 所属模块)]
+        
+        每个PROC/FUNC/TRAP为一个单元，例行程序之间的模块头和数据声明各自成为一个单元；
+        各单元首尾相接即为原文。
+        """
+        units = []
+        module = None
+        name, start, unit_module = 'data', 0, None
+        pos = 0
+        for line in content.splitlines(keepends=True):
+            m = patterns.RAPID_UNIT_LINE.match(line)
+            if m and not m.group('end'):
+                if pos > start and not content[start:pos].rstrip().endswith(','):
+                    units.append((name, content[start:pos], unit_module))
+                    start = pos
+                if m.group('module'):
+                    module = m.group('module')
+                    name = f'{module}:data'
+                else:
+                    name = f'{module}.{m.group("routine")}' if module else m.group('routine')
+                unit_module = module
+            pos += len(line)
+            if m and m.group('end'):
+                units.append((name, content[start:pos], unit_module))
+                start = pos
+                name = f'{module}:data' if module else 'data'
+        if pos > start:
+            units.append((name, content[start:pos], unit_module))
+        return units
+    
+    def convert_unit(self, text, module):
+        """解析单个单元，返回 (点位表, 关节点位表, 运动指令列表)；点位登记在单元自己的表中"""
+        points, joints = self.points, self.joints
+        self.points, self.joints = PointTable(), PointTable()
+        try:
+            instructions = self.parse_mod(text, module)
+            return self.points, self.joints, instructions
+        finally:
+            self.points, self.joints = points, joints
+    
+    def assemble(self, results):
+        """按原文顺序合并各单元的点位和指令，生成完整LS（/MN、/POS编号全局连续，生成不做增量）"""
+        instructions = []
+        for points, joints, unit_instructions in results:
+            self.points.update(points)
+            self.joints.update(joints)
+            instructions.extend(unit_instructions)
+        return self.generate_ls(instructions)
+    
+    def _ls_header(self, prog_name):
+        return [
+            f"/PROG {prog_name}",
+            "/ATTR",
+            'COMMENT = "Converted from ABB";',
+            "/MN",
+        ]
+    
+    def _resolve_point(self, joint, target, module, routine, last):
+        """按作用域查找点位，未定义的点沿用上一个同类（笛卡尔/关节）已知点；last 按类别记录上一个点"""
+        if target is None or isinstance(target, tuple):
+            p = target
+        else:
+            p = (self.joints if joint else self.points).get(target, module, routine)
+        if p is None:
+            return last[joint]
+        last[joint] = p
+        return p
+
+
+def _is_expression(target):
+    """目标点为表达式（不是数据名称，也不是内联数据）"""
+    return isinstance(target, str) and not target.isidentifier()
+
+
+def _format_positions(entries):
+    """/POS 点位文本：entries 为 (P编号, UF, UT, 是否关节坐标, 位置)，每批产出一个文本块（点之间换行分隔）
+
+    每批的模板先拼接成一个格式串，再用一次 % 格式化全部数值，避免逐点、逐行生成小字符串。
+    """
+    templates, values = [], []
+    for k, uf, ut, joint, p in entries:
+        templates.append(_JOINT_TEMPLATE if joint else _POS_TEMPLATE)
+        values += (k, uf, ut)
+        values += p
+        if len(templates) >= _POS_BATCH:
+            yield '\n'.join(templates) % tuple(values)
+            templates, values = [], []
+    if templates:
+        yield '\n'.join(templates) % tuple(values)
@@ -0,0 +1,199 @@
+"""欧姆龙 -> 汇川 地址映射
+
+地址区的映射规则来自配置（内置默认配置，或各工厂自己的 JSON / YAML 文件）：
+
+    {
+      "name": "line3",
+      "areas": {
+        "CIO": {"word": "%QW", "bit": "%QX"},
+        "H":   {"bit": "%MX", "offset": 900},
+        "E":   {"word": "%MD", "offset": 32768, "bank_size": 32768}
+      }
+    }
+
+word / bit 为字地址、位地址的前缀（缺省时该形式不映射），offset 加到通道号上，
+bank_size 用于分库的区（E0_100 为第0库100号字：offset + 库号 * bank_size + 100）。
+配置加载时编译成按区名前缀的字典树，变量声明的 AT 地址和程序体中的地址引用都经它映射，
+每个标识符只查一次（结果按标识符缓存）。编译结果按文件（路径、修改时间、大小）在进程内缓存。
+"""
+import hashlib
+import json
+import os
+
+try:
+    import yaml
+except ImportError:  # PyYAML为可选依赖，只在使用YAML配置时需要
+    yaml = None
+
+# 内置默认配置
+DEFAULT_PROFILE = {
+    'name': 'default',
+    'areas': {
+        'CIO': {'word': '%QW', 'bit': '%QX'},
+        'W': {'word': '%MW', 'bit': '%MX'},
+        'D': {'word': '%MD'},
+        'DM': {'word': '%MD'},  # 旧型号的数据存储区写法
+        'E': {'word': '%MD', 'offset': 32768, 'bank_size': 32768},  # 扩展数据存储区，接在D区之后
+        'EM': {'word': '%MD', 'offset': 32768, 'bank_size': 32768},
+        'H': {'bit': '%MX', 'offset': 900},  # H区（保持继电器）映射到高位
+        'A': {'word': '%MW', 'bit': '%MX', 'offset': 3000},  # 辅助区，接在H区之后
+        'TIM': {'word': '%MT'},
+        'CNT': {'word': '%MC'},
+        'T': {'word': '%MT'},
+        'C': {'word': '%MC'},
+    },
+}
+
+_RULE_KEYS = frozenset(('word', 'bit', 'offset', 'bank_size'))
+_MEMO_LIMIT = 65536  # 单个配置缓存的标识符数上限
+
+_compiled = {}  # (路径, 修改时间, 大小) -> AddressMap
+
+
+class ProfileError(ValueError):
+    """地址映射配置无法读取或格式错误（消息可直接显示给用户）"""
+
+
+class _Rule:
+    __slots__ = ('area', 'word', 'bit', 'offset', 'bank_size')
+
+    def __init__(self, area, word, bit, offset, bank_size):
+        self.area = area
+        self.word = word
+        self.bit = bit
+        self.offset = offset
+        self.bank_size = bank_size
+
+
+class AddressMap:
+    """编译好的地址映射：区名字典树 + 按标识符的结果缓存"""
+
+    def __init__(self, profile):
+        areas = profile.get('areas') if isinstance(profile, dict) else None
+        if not isinstance(areas, dict) or not areas:
+            raise ProfileError('地址映射配置缺少 areas')
+        self.name = profile.get('name') or 'custom'
+        self._root = {}  # 字符 -> 子节点；None 键存放在此结束的区的规则
+        for area, spec in areas.items():
+            if not isinstance(area, str) or not (area.isascii() and area.isalpha()):
+                raise ProfileError(f'地址区名称应为字母: {area!r}')
+            node = self._root
+            for ch in area.upper():
+                node = node.setdefault(ch, {})
+            node[None] = _compile_rule(area.upper(), spec)
+        canonical = json.dumps(areas, sort_keys=True, ensure_ascii=False)
+        self.digest = hashlib.blake2b(canonical.encode('utf-8'), digest_size=8).hexdigest()
+        self._memo = {}
+
+    def translate(self, ident, bit=None):
+        """地址标识符（如 W3、E0_100）和位号 -> 汇川地址，不是地址或该形式不映射时返回None"""
+        if ident[0] not in self._root:
+            return None
+        key = (ident, bit)
+        try:
+            return self._memo[key]
+        except KeyError:
+            pass
+        result = self._translate(ident, bit)
+        if len(self._memo) >= _MEMO_LIMIT:
+            self._memo.clear()
+        self._memo[key] = result
+        return result
+
+    def address(self, text):
+        """变量声明中的 AT 地址（如 CIO100.05、%W3、D100）-> 汇川地址，无法映射时加上%原样返回"""
+        addr = text.strip().upper()
+        if addr.startswith('%'):
+            addr = addr[1:]
+        ident, dot, bit = addr.partition('.')
+        new = self.translate(ident, bit if dot else None) if ident else None
+        return new or f'%{addr}'
+
+    def _translate(self, ident, bit):
+        # 沿字典树走完区名的所有前缀，取余下部分是通道号的最长区名
+        node, rule, number = self._root, None, None
+        for i, ch in enumerate(ident):
+            node = node.get(ch)
+            if node is None:
+                break
+            candidate = node.get(None)
+            if candidate is not None:
+                parsed = _channel(ident[i + 1:], candidate)
+                if parsed is not None:
+                    rule, number = candidate, parsed
+        if rule is None:
+            return None
+
+        if bit is not None and rule.bit:
+            return f'{rule.bit}{number}.{bit}'
+        if rule.word is None:
+            return None
+        return f'{rule.word}{number}.{bit}' if bit is not None else f'{rule.word}{number}'
+
+
+def _channel(rest, rule):
+    """区名之后的部分 -> 通道号文本（无偏移时保留原文，如 W003），不是通道号时返回None"""
+    bank, sep, channel = rest.partition('_')
+    if not sep:
+        bank, channel = None, rest
+    if not (channel.isascii() and channel.isdigit()):
+        return None
+    if bank is not None:
+        if not (rule.bank_size and bank.isascii() and bank.isdigit()):
+            return None
+        return str(rule.offset + int(bank) * rule.bank_size + int(channel))
+    return str(rule.offset + int(channel)) if rule.offset else channel
+
+
+def _compile_rule(area, spec):
+    if not isinstance(spec, dict):
+        raise ProfileError(f'地址区 {area} 的配置应为对象')
+    unknown = set(spec) - _RULE_KEYS
+    if unknown:
+        raise ProfileError(f'地址区 {area} 含未知配置项: {", ".join(sorted(unknown))}')
+    word, bit = spec.get('word'), spec.get('bit')
+    if word is None and bit is None:
+        raise ProfileError(f'地址区 {area} 至少需要 word 或 bit')
+    offset, bank_size = spec.get('offset', 0), spec.get('bank_size', 0)
+    if not isinstance(offset, int) or not isinstance(bank_size, int) or offset < 0 or bank_size < 0:
+        raise ProfileError(f'地址区 {area} 的 offset / bank_size 应为非负整数')
+    return _Rule(area, word, bit, offset, bank_size)
+
+
+def load_profile(profile=None):
+    """返回编译好的 AddressMap；profile 为None（内置默认）、配置文件路径、配置字典或 AddressMap"""
+    if isinstance(profile, AddressMap):
+        return profile
+    if isinstance(profile, dict):
+        return AddressMap(profile)
+    if profile is None:
+        key = None
+    else:
+        path = os.path.abspath(profile)
+        try:
+            st = os.stat(path)
+        except OSError as e:
+            raise ProfileError(f'无法读取地址映射配置: {profile} ({e.strerror})')
+        key = (path, st.st_mtime_ns, st.st_size)
+
+    compiled = _compiled.get(key)
+    if compiled is None:
+        compiled = AddressMap(DEFAULT_PROFILE if key is None else _read_profile(key[0]))
+        _compiled[key] = compiled
+    return compiled
+
+
+def _read_profile(path):
+    with open(path, 'rb') as f:
+        data = f.read().decode('utf-8-sig', errors='replace')
+    if os.path.splitext(path)[1].lower() in ('.yml', '.yaml'):
+        if yaml is None:
+            raise ProfileError('YAML配置需要安装 PyYAML（pip install pyyaml），或改用JSON')
+        try:
+            return yaml.safe_load(data)
+        except yaml.YAMLError as e:
+            raise ProfileError(f'地址映射配置格式错误: {path} ({e})')
+    try:
+        return json.loads(data)
+    except ValueError as e:
+        raise ProfileError(f'地址映射配置格式错误: {path} ({e})')
@@ -0,0 +1,369 @@
+"""FANUC LS -> ABB RAPID 转换器
+
+LS 文件中 /MN（指令）在前、/POS（点位）在后，而 RAPID 模块要求数据声明写在例行程序之前。
+转换时逐行读取：/MN 的运动指令先暂存到临时文件，/POS 的点位按批做欧拉角->四元数转换后
+直接输出 robtarget / jointtarget 声明，最后再读回暂存的指令生成 PROC，内存占用与点位数基本无关。
+"""
+import io
+import itertools
+import math
+import tempfile
+
+from . import patterns
+from .instrument import StageTimings
+
+try:
+    import numpy as np
+except ImportError:  # NumPy为可选依赖，缺失时退回纯Python计算
+    np = None
+
+# 声明文本；按批拼接模板后一次格式化
+_ROBTARGET_TEMPLATE = ("    CONST robtarget %s:=[[%s,%s,%s],[%.8f,%.8f,%.8f,%.8f],[0,0,0,0],"
+                       "[%s,%s,%s,9E+09,9E+09,9E+09]];")
+_JOINTTARGET_TEMPLATE = ("    CONST jointtarget %s:=[[%s,%s,%s,%s,%s,%s],"
+                         "[%s,%s,%s,9E+09,9E+09,9E+09]];")
+_NO_EAX = '9E+09'
+_MOVE_BATCH = 1024  # 每批生成的指令行数
+_POS_LINES = 8192  # /POS 每次读入的行数
+
+# ABB 预定义的速度、区域数据，其余取值需要在模块中声明
+_STANDARD_SPEEDS = frozenset((5, 10, 20, 30, 40, 50, 60, 80, 100, 150, 200, 300, 400, 500, 600, 800,
+                              1000, 1500, 2000, 2500, 3000, 4000, 5000, 6000, 7000))
+_STANDARD_ZONES = frozenset((0, 1, 5, 10, 15, 20, 30, 40, 50, 60, 80, 100, 150, 200))
+
+# 速度单位 -> mm/s 的换算系数；% 为关节速度（与 ABBtoFanuc 相反：100% 对应 v1000）
+_SPEED_UNITS = {'%': 10.0, 'mm/sec': 1.0, 'cm/min': 10 / 60, 'inch/min': 25.4 / 60}
+
+
+class FanucToABB:
+    version = '1.0'  # 输出格式变化时递增，结果缓存以此区分
+
+    def __init__(self, deterministic=False):
+        self.deterministic = deterministic  # RAPID输出不含时间戳，本身即确定
+        self.timings = StageTimings()
+        self.module_name = 'CONV'
+        self._points = {}  # P编号 -> (是否关节坐标, UF, UT)
+        self._speeds, self._zones = set(), set()  # 需要声明的速度、区域数据
+        self._frames, self._tools = set(), set()  # 用到的 UF、UT 编号
+
+    def convert(self, content):
+        """转换LS文本，返回RAPID模块文本"""
+        return ''.join(self.iter_convert(io.StringIO(content)))
+
+    def convert_stream(self, stream, sink):
+        """流式转换：stream为文本行迭代器（如打开的.ls文件），结果写入sink"""
+        for chunk in self.iter_convert(stream):
+            sink.write(chunk)
+
+    def iter_convert(self, stream, chunk_size=64 * 1024):
+        """流式转换，按约 chunk_size 字符合并产出文本块（用于分块HTTP响应）"""
+        parts, size = [], 0
+        for part in self._iter_parts(iter(stream)):
+            parts.append(part)
+            size += len(part)
+            if size >= chunk_size:
+                yield ''.join(parts)
+                parts, size = [], 0
+        if parts:
+            yield ''.join(parts)
+
+    def _iter_parts(self, lines):
+        with tempfile.TemporaryFile('w+', encoding='utf-8') as spool:
+            with self.timings.stage('parse'):
+                instructions = self._read_mn(lines, spool)
+            self.timings.count('instructions', instructions)
+
+            yield f"MODULE {self.module_name}\n    ! Converted from FANUC\n"
+            yield from self._data_declarations()
+
+            for chunk in self._iter_positions(lines):
+                yield chunk
+            self.timings.count('robtargets', len(self._points))
+            yield from self._frame_declarations()
+
+            yield "\n    PROC main()\n        ConfJ\\Off;\n        ConfL\\Off;\n"
+            spool.seek(0)
+            while True:
+                with self.timings.stage('generate'):
+                    body = [self._move_line(entry) for entry in itertools.islice(spool, _MOVE_BATCH)]
+                if not body:
+                    break
+                yield ''.join(body)
+            yield "    ENDPROC\nENDMODULE\n"
+
+    # ---------- /MN ----------
+
+    def _read_mn(self, lines, spool):
+        """读到 /POS 为止：运动指令解析后暂存到 spool，其余指令转为注释；返回运动指令数"""
+        uf = ut = None  # /MN 中显式切换的坐标系
+        in_mn = False
+        statement = []
+        count = 0
+        speeds, zones = {}, {}  # 取值很少，换算结果按原文缓存
+        for line in lines:
+            stripped = line.strip()
+            if stripped.startswith('/'):
+                section = stripped.split()
+                if section[0] == '/PROG':
+                    self.module_name = _identifier(section[1] if len(section) > 1 else '')
+                elif section[0] in ('/POS', '/END'):
+                    break
+                in_mn = section[0] == '/MN'
+                statement = []
+                continue
+            if not stripped or not in_mn:
+                continue
+            if not stripped.endswith(';'):
+                statement.append(stripped)  # 多行指令（圆弧）未结束
+                continue
+            if statement:
+                statement.append(stripped)
+                stripped = ' '.join(statement)
+                statement = []
+
+            move = patterns.LS_MOVE.match(stripped)
+            if move is not None:
+                count += 1
+                speed = speeds.get(move.group('speed'))
+                if speed is None:
+                    speed = speeds[move.group('speed')] = self.convert_speed(move.group('speed'))
+                zone = zones.get(move.group('zone'))
+                if zone is None:
+                    zone = zones[move.group('zone')] = self.convert_zone(move.group('zone'))
+                spool.write('\t'.join((
+                    'M', move.group('motion').upper(),
+                    move.group('reg').upper(), move.group('index'),
+                    (move.group('reg2') or '').upper(), move.group('index2') or '',
+                    speed, zone, '' if uf is None else str(uf), '' if ut is None else str(ut),
+                    _one_line(move.group('options')), _one_line(move.group('text')))) + '\n')
+                continue
+
+            text = stripped[:-1].strip()
+            m = patterns.LS_LINE.match(text)
+            if m is not None:
+                text = text[m.end():]
+            if not text:
+                continue
+            frame = patterns.LS_FRAME.match(text)
+            if frame is not None:
+                if frame.group(1).upper() == 'UFRAME_NUM':
+                    uf = int(frame.group(2))
+                    self._frames.add(uf)
+                else:
+                    ut = int(frame.group(2))
+                    self._tools.add(ut)
+            elif text.startswith('!'):
+                spool.write(f"T\t{_one_line(text)}\n")
+            else:
+                # 其余指令（I/O、等待、跳转等）保留为注释，便于人工补写
+                spool.write(f"T\t! FANUC: {_one_line(text)}\n")
+        return count
+
+    def convert_speed(self, speed):
+        """100% -> v1000，2000mm/sec -> v2000（与 ABBtoFanuc 互逆）；寄存器等无法换算的按 v1000"""
+        m = patterns.LS_SPEED.match(speed)
+        factor = _SPEED_UNITS.get(m.group(2).lower()) if m else None
+        if factor is None:
+            return 'vmax' if speed.lower() == 'max_speed' else 'v1000'
+        value = max(1, round(float(m.group(1)) * factor))
+        if value not in _STANDARD_SPEEDS:
+            self._speeds.add(value)
+        return f'v{value}'
+
+    def convert_zone(self, zone):
+        """FINE -> fine，CNTn -> zn，其他定位类型按 fine 处理"""
+        m = patterns.LS_CNT.match(zone)
+        if m is None:
+            return 'fine'
+        value = int(m.group(1))
+        if value not in _STANDARD_ZONES:
+            self._zones.add(value)
+        return f'z{value}'
+
+    def _data_declarations(self):
+        # 非预定义的速度、区域数据按 ABB 预定义数据的比例声明
+        lines = [f"    CONST speeddata v{v}:=[{v},500,5000,1000];" for v in sorted(self._speeds)]
+        lines += [f"    CONST zonedata z{z}:=[FALSE,{z},{_num(z * 1.5)},{_num(z * 1.5)},"
+                  f"{_num(z * 0.15)},{_num(z * 1.5)},{_num(z * 0.15)}];" for z in sorted(self._zones)]
+        if lines:
+            yield '\n'.join(lines) + '\n'
+
+    # ---------- /POS ----------
+
+    def _iter_positions(self, lines):
+        """读到 /END 为止，按批产出 robtarget / jointtarget 声明文本
+
+        每次读入一批行拼成一段文本，由正则整体切分出点位记录，不逐行处理。
+        """
+        pending = ''  # 上一段末尾不完整的点位记录
+        while True:
+            with self.timings.stage('robtargets'):
+                chunk = ''.join(itertools.islice(lines, _POS_LINES))
+                end = patterns.LS_END.search(chunk)
+                if end is not None:
+                    chunk = chunk[:end.start()]
+                text = pending + chunk
+                if end is not None or not chunk:
+                    last = len(text)
+                else:
+                    last = text.rfind('};')
+                    last = 0 if last < 0 else last + 2  # 整段都没有完整记录时全部留到下一段
+                pending = text[last:]
+
+                batch = []  # 点位记录，见 _position
+                standard = patterns.LS_POS_CARTESIAN.match
+                for m in patterns.LS_POS_BLOCK.finditer(text, 0, last):
+                    c = standard(text, m.start(2), m.end(2))
+                    if c is not None:
+                        # 常见格式一次匹配取出全部数值
+                        uf, ut, x, y, z, w, p, r, e1 = c.groups()
+                        batch.append((int(m.group(1)), False, int(uf), int(ut), x, y, z, w, p, r,
+                                      e1 or _NO_EAX, _NO_EAX, _NO_EAX))
+                    else:
+                        record = _position(int(m.group(1)), text, m.start(2), m.end(2))
+                        if record is not None:
+                            batch.append(record)
+                declarations = self._format_targets(batch) if batch else ''
+            if declarations:
+                yield declarations
+            if end is not None or not chunk:
+                break
+
+    def _format_targets(self, batch):
+        """一批点位 -> 声明文本；笛卡尔点的 W/P/R 一次批量换算为四元数"""
+        wprs = [float(v) for record in batch if not record[1] for v in record[7:10]]
+        quaternions = iter(self.eulers_to_quaternions(wprs))
+
+        templates, values = [], []
+        points = self._points
+        for k, joint, uf, ut, a1, a2, a3, a4, a5, a6, e1, e2, e3 in batch:
+            if joint:
+                templates.append(_JOINTTARGET_TEMPLATE)
+                values += (f'jp{k}', a1, a2, a3, a4, a5, a6, e1, e2, e3)
+            else:
+                templates.append(_ROBTARGET_TEMPLATE)
+                values += (f'p{k}', a1, a2, a3)
+                values += next(quaternions)
+                values += (e1, e2, e3)
+            points[k] = (joint, uf, ut)
+        self._frames.update(record[2] for record in batch if record[2] is not None)
+        self._tools.update(record[3] for record in batch if record[3] is not None)
+        return '\n'.join(templates) % tuple(values) + '\n'
+
+    def euler_to_quaternion(self, w, p, r):
+        """W/P/R（度）-> 四元数，ABBtoFanuc.quaternion_to_euler 的逆运算
+
+        分量顺序与 quaternion_to_euler 一致（q4 为标量部分），两个方向互转时位姿不变；q4 取非负。
+        """
+        hw, hp, hr = math.radians(w) / 2, math.radians(p) / 2, math.radians(r) / 2
+        cw, sw = math.cos(hw), math.sin(hw)
+        cp, sp = math.cos(hp), math.sin(hp)
+        cr, sr = math.cos(hr), math.sin(hr)
+        q = (sr*cp*cw - cr*sp*sw,
+             cr*sp*cw + sr*cp*sw,
+             cr*cp*sw - sr*sp*cw,
+             cr*cp*cw + sr*sp*sw)
+        return tuple(-x for x in q) if q[3] < 0 else q
+
+    def eulers_to_quaternions(self, wprs):
+        """批量欧拉角转四元数，wprs为按 W,P,R 顺序排列的扁平序列"""
+        if np is None:
+            it = iter(wprs)
+            return [self.euler_to_quaternion(*a) for a in zip(it, it, it)]
+
+        half = np.radians(np.asarray(wprs, dtype=np.float64).reshape(-1, 3)) / 2
+        cw, sw = np.cos(half[:, 0]), np.sin(half[:, 0])
+        cp, sp = np.cos(half[:, 1]), np.sin(half[:, 1])
+        cr, sr = np.cos(half[:, 2]), np.sin(half[:, 2])
+        q = np.empty((len(half), 4), dtype=np.float64)
+        q[:, 0] = sr*cp*cw - cr*sp*sw
+        q[:, 1] = cr*sp*cw + sr*cp*sw
+        q[:, 2] = cr*cp*sw - sr*sp*cw
+        q[:, 3] = cr*cp*cw + sr*sp*sw
+        q[q[:, 3] < 0] *= -1
+        return [tuple(row) for row in q.tolist()]
+
+    def _frame_declarations(self):
+        # LS中没有坐标系的数值，声明为占位数据
+        tools = sorted(ut for ut in self._tools if ut > 1)
+        frames = sorted(uf for uf in self._frames if uf > 0)
+        if not tools and not frames:
+            return
+        lines = ["    ! 以下工具/工件坐标系为占位数据，请按控制器中的实际值修改"]
+        lines += [f"    PERS tooldata tool{ut}:=[TRUE,[[0,0,0],[1,0,0,0]],[1,[0,0,1],[1,0,0,0],0,0,0]];"
+                  for ut in tools]
+        lines += [f"    PERS wobjdata wobj{uf}:=[FALSE,TRUE,\"\",[[0,0,0],[1,0,0,0]],[[0,0,0],[1,0,0,0]]];"
+                  for uf in frames]
+        yield '\n'.join(lines) + '\n'
+
+    # ---------- PROC ----------
+
+    def _move_line(self, entry):
+        """暂存的一条记录 -> PROC中的一行"""
+        fields = entry.rstrip('\n').split('\t')
+        if fields[0] == 'T':
+            return f"        {fields[1]}\n"
+        _, motion, reg, index, reg2, index2, speed, zone, uf, ut, options, original = fields
+        comment = f' ! {options}' if options else ''
+
+        target = self._points.get(int(index)) if reg == 'P' else None
+        via = None
+        if motion == 'C':
+            via, target = target, (self._points.get(int(index2)) if reg2 == 'P' else None)
+            if via is None or via[0]:
+                return f"        ! FANUC: {original}\n"
+        if target is None or (target[0] and motion != 'J'):
+            # 位置寄存器、未定义的点、直线/圆弧到关节坐标点需要人工处理
+            return f"        ! FANUC: {original}\n"
+
+        joint, point_uf, point_ut = target
+        tool = _tool(point_ut if point_ut is not None else (int(ut) if ut else 1))
+        uf = point_uf if point_uf is not None else (int(uf) if uf else 0)
+        tool = tool + (f'\\WObj:=wobj{uf}' if uf else '')
+        if joint:
+            return f"        MoveAbsJ jp{index}\\NoEOffs, {speed}, {zone}, {tool};{comment}\n"
+        if motion == 'C':
+            return f"        MoveC p{index}, p{index2}, {speed}, {zone}, {tool};{comment}\n"
+        return f"        Move{motion} p{index}, {speed}, {zone}, {tool};{comment}\n"
+
+
+def _position(k, text, start, end):
+    """通用格式的点位记录 -> (P编号, 是否关节坐标, UF, UT, 6个坐标值, E1-E3)，没有GP1数据时返回None
+
+    坐标值保持原文；笛卡尔点为 X、Y、Z、W、P、R。UF/UT 未记录时为None，按 /MN 中的坐标系切换。
+    """
+    gp1 = text.find('GP1:', start, end)
+    if gp1 < 0:
+        return None
+    stop = text.find('GP', gp1 + 4, end)  # 只取第一组，忽略 GP2 等
+    v = dict(patterns.LS_POS_VALUE.findall(text, gp1, stop if stop >= 0 else end))
+    uf = int(v['UF']) if 'UF' in v else None
+    ut = int(v['UT']) if 'UT' in v else None
+    eax = (v.get('E1', _NO_EAX), v.get('E2', _NO_EAX), v.get('E3', _NO_EAX))
+    if 'X' in v:
+        coords = tuple(v.get(axis, '0') for axis in 'XYZWPR')
+        return (k, False, uf, ut) + coords + eax
+    if 'J1' in v:
+        coords = tuple(v.get(f'J{i}', '0') for i in range(1, 7))
+        return (k, True, uf, ut) + coords + eax
+    return None
+
+
+def _tool(ut):
+    return 'tool0' if ut <= 1 else f'tool{ut}'
+
+
+def _num(value):
+    return f'{value:g}'
+
+
+def _one_line(text):
+    return text.replace('\t', ' ')
+
+
+def _identifier(name):
+    """/PROG 名称 -> 合法的RAPID标识符（最长32个字符）"""
+    ident = ''.join(c if c.isascii() and (c.isalnum() or c == '_') else '_' for c in name)
+    if not ident or not ident[0].isalpha():
+        ident = 'P_' + ident
+    return ident[:32]
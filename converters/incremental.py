@@ -0,0 +1,106 @@
+"""增量转换
+
+转换器把源程序拆成单元（RAPID例行程序 / ST变量区和程序段），每个单元按内容做指纹，
+只有指纹未命中的单元才重新转换，其余直接取上次的结果拼接。
+
+转换器需提供三个方法：
+    split_units(content) -> [(单元名, 文本, 上下文)]，各单元文本首尾相接即为原文
+    convert_unit(文本, 上下文) -> 单元结果
+    assemble([单元结果, ...]) -> 完整输出文本
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+from . import _record, get_engine
+
+
+class UnitCache:
+    """单元结果缓存（进程内LRU，按单元指纹寻址，与文件名无关）"""
+
+    def __init__(self, max_entries=4096):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+            }
+
+
+def unit_key(converter_class, options, context, text):
+    """单元指纹：转换器、版本、选项、上下文（如所属模块）和单元文本"""
+    h = hashlib.blake2b(digest_size=16)
+    meta = [f'{converter_class.__module__}.{converter_class.__qualname__}',
+            getattr(converter_class, 'version', ''), options, context]
+    h.update(json.dumps(meta, sort_keys=True).encode('utf-8'))
+    h.update(b'\0')
+    h.update(text.encode('utf-8'))
+    return h.hexdigest()
+
+
+def convert_incremental(conv_type, source, target, content, cache, stats=None, **options):
+    """增量转换，返回 (结果文本, 输出扩展名, 报告)
+
+    报告: {'units': 单元总数, 'recomputed': [重新转换的单元名], 'reused': 复用的单元数}
+    stats 同 run_conversion。
+    """
+    engine = get_engine(conv_type, source, target, **options)
+    converter_class = engine.converter_class
+    converter = engine.context()
+
+    ok = False
+    try:
+        with converter.timings.stage('units'):
+            units = converter.split_units(content)
+
+        results, recomputed, seen = [], [], {}
+        for name, text, context in units:
+            # 同名单元（如同一模块中的多段数据声明）加序号区分
+            seen[name] = seen.get(name, 0) + 1
+            if seen[name] > 1:
+                name = f'{name}#{seen[name]}'
+            key = unit_key(converter_class, options, context, text)
+            result = cache.get(key)
+            if result is None:
+                result = converter.convert_unit(text, context)
+                cache.put(key, result)
+                recomputed.append(name)
+            results.append(result)
+        converter.timings.count('units_recomputed', len(recomputed))
+        converter.timings.count('units_reused', len(units) - len(recomputed))
+
+        output = converter.assemble(results)
+        ok = True
+    finally:
+        _record(converter, stats, ok)
+
+    report = {'units': len(units), 'recomputed': recomputed, 'reused': len(units) - len(recomputed)}
+    return output, engine.output_ext, report
@@ -0,0 +1,112 @@
+"""转换阶段计时与计数
+
+每个转换器实例持有一个 StageTimings，记录本次转换各阶段的耗时和处理数量；
+转换结束后汇总到进程级的 METRICS，由Web服务以Prometheus文本格式导出。
+"""
+import gc
+import threading
+import time
+from contextlib import contextmanager
+
+
+class StageInterrupt(Exception):
+    """转换被外部中断（如超时、取消）；stage 为中断发生时所在的最内层阶段"""
+
+    stage = None
+
+
+class StageTimings:
+    """单次转换的分阶段耗时（秒）与计数"""
+
+    __slots__ = ('durations', 'counts')
+
+    def __init__(self):
+        self.durations = {}
+        self.counts = {}
+
+    @contextmanager
+    def stage(self, name):
+        t0 = time.perf_counter()
+        try:
+            yield
+        except StageInterrupt as e:
+            if e.stage is None:
+                e.stage = name
+            raise
+        finally:
+            self.durations[name] = self.durations.get(name, 0.0) + time.perf_counter() - t0
+
+    def count(self, name, n=1):
+        self.counts[name] = self.counts.get(name, 0) + n
+
+    def as_dict(self):
+        """供JSON响应和跨进程传递使用"""
+        return {
+            'stages_ms': {k: round(v * 1000, 3) for k, v in self.durations.items()},
+            'counts': dict(self.counts),
+        }
+
+
+@contextmanager
+def no_gc():
+    """暂停循环垃圾回收：语法树没有循环引用，建树和改写大文件时反复回收只是在遍历越来越多的节点"""
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class MetricsRegistry:
+    """进程级累计指标（线程安全）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._conversions = {}    # (转换器, 结果) -> 次数
+        self._stage_seconds = {}  # (转换器, 阶段) -> 累计秒数
+        self._stage_calls = {}    # (转换器, 阶段) -> 次数
+        self._items = {}          # (转换器, 计数项) -> 累计数量
+
+    def record(self, converter_name, stats, ok=True):
+        """汇总一次转换；stats 为 StageTimings.as_dict() 的结果（可来自工作进程）"""
+        with self._lock:
+            key = (converter_name, 'ok' if ok else 'error')
+            self._conversions[key] = self._conversions.get(key, 0) + 1
+            for stage, ms in stats.get('stages_ms', {}).items():
+                key = (converter_name, stage)
+                self._stage_seconds[key] = self._stage_seconds.get(key, 0.0) + ms / 1000
+                self._stage_calls[key] = self._stage_calls.get(key, 0) + 1
+            for item, n in stats.get('counts', {}).items():
+                key = (converter_name, item)
+                self._items[key] = self._items.get(key, 0) + n
+
+    def render_prometheus(self):
+        """Prometheus文本格式"""
+        with self._lock:
+            families = [
+                ('robotqu_conversions_total', 'counter', '转换次数', ('converter', 'result'),
+                 self._conversions),
+                ('robotqu_stage_seconds_total', 'counter', '各转换阶段累计耗时（秒）', ('converter', 'stage'),
+                 self._stage_seconds),
+                ('robotqu_stage_calls_total', 'counter', '各转换阶段执行次数', ('converter', 'stage'),
+                 self._stage_calls),
+                ('robotqu_items_total', 'counter', '转换处理的对象数量（点位、指令、地址改写等）',
+                 ('converter', 'item'), self._items),
+            ]
+            lines = []
+            for name, kind, help_text, labels, values in families:
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} {kind}')
+                for key, value in sorted(values.items()):
+                    label_str = ','.join(f'{l}="{_escape(v)}"' for l, v in zip(labels, key))
+                    lines.append(f'{name}{{{label_str}}} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+METRICS = MetricsRegistry()
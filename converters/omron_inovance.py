@@ -0,0 +1,526 @@
+"""欧姆龙 Omron ST -> 汇川 Inovance ST 转换器"""
+import codecs
+import csv
+import hashlib
+import io
+import logging
+import mmap
+import os
+
+from . import addressing, patterns, st
+from .instrument import StageTimings, no_gc
+
+logger = logging.getLogger(__name__)
+
+# 改写为赋值语句的指令 -> 参数个数
+_LOWERED_CALLS = {'MOV': 2, 'SET': 1, 'RSET': 1}
+
+# 需要规整前后空白的关键字：后面跟表达式 / 前面是表达式
+_SPACE_AFTER = frozenset(('IF', 'ELSIF', 'WHILE', 'CASE', 'FOR', 'TO', 'BY', 'UNTIL'))
+_SPACE_BEFORE = frozenset(('THEN', 'DO', 'OF', 'TO', 'BY'))
+
+# ==================== PLC转换器（新增：欧姆龙→汇川） ====================
+
+# 欧姆龙 -> 汇川 数据类型
+_TYPE_MAP = {
+    'BOOL': 'BOOL',
+    'INT': 'INT',
+    'DINT': 'DINT',
+    'UINT': 'UINT',
+    'UDINT': 'UDINT',
+    'REAL': 'REAL',
+    'LREAL': 'LREAL',
+    'STRING': 'STRING(255)',
+    'BYTE': 'BYTE',
+    'WORD': 'WORD',
+    'DWORD': 'DWORD',
+    'TIME': 'TIME',
+    'CHANNEL': 'WORD',  # CX-Programmer 符号表中的通道型
+}
+
+# CSV符号表的列名（小写、去掉空格和 / _）-> 列
+_SYMBOL_COLUMNS = {
+    'name': 'name', 'symbol': 'name', 'symbolname': 'name', 'variable': 'name', 'variablename': 'name',
+    '名称': 'name', '变量名': 'name', '符号': 'name', '变量': 'name',
+    'datatype': 'type', 'type': 'type', '数据类型': 'type', '类型': 'type',
+    'address': 'address', 'addressvalue': 'address', 'at': 'address', 'atspecification': 'address',
+    '地址': 'address', 'at指定': 'address',
+    'initialvalue': 'init', 'initvalue': 'init', '初始值': 'init',
+    'comment': 'comment', '注释': 'comment', '说明': 'comment',
+}
+# 没有表头时按 CX-Programmer 导出的列顺序
+_SYMBOL_POSITIONAL = {'name': 0, 'type': 1, 'address': 2, 'comment': 3}
+
+# 内存映射文件逐块解码的大小
+_DECODE_CHUNK = 1024 * 1024
+
+
+def locate_sections(buf, pattern=patterns.ST_SECTION):
+    """定位变量声明区和程序体，返回 ([(起, 止), ...], (起, 止))
+
+    buf 为文本，或配合 patterns.ST_SECTION_BYTES 使用的 bytes / mmap。只扫描区段关键字，
+    找到 END_VAR 之后的 END_PROGRAM 即停止，其后附带的内容（如导出的符号表）不再读取。
+    """
+    var = end_var = program = var_span = None  # 各关键字首次出现的结束位置
+    for m in pattern.finditer(buf):
+        kind = m.lastgroup
+        if kind == 'var':
+            if var is None:
+                var = m.end()
+        elif kind == 'end_var':
+            if var is not None and var_span is None:
+                var_span = _strip_span(buf, var, m.start())
+            if end_var is None:
+                end_var = m.end()
+        elif kind == 'program':
+            if program is None:
+                program = m.end()
+        elif end_var is not None:
+            return [var_span] if var_span else [], _strip_span(buf, end_var, m.start())
+        elif program is not None:
+            return [], _strip_span(buf, program, m.start())  # 没有变量声明区的程序
+    # 没有标准结构：整体作为程序体
+    return [var_span] if var_span else [], (0, len(buf))
+
+
+def sniff_symbol_table(head):
+    """判断文本开头是否为CSV符号表，是则返回 (分隔符, {列: 列号}, 是否有表头)，否则返回None"""
+    line = next((line for line in head.splitlines() if line.strip()), '')
+    if ':=' in line or line.lstrip().startswith(('(*', '//')):
+        return None
+    delimiter = max('\t,;', key=line.count)
+    if delimiter not in line:
+        return None
+    fields = next(csv.reader([line], delimiter=delimiter))
+    columns = _header_columns(fields)
+    if columns:
+        return delimiter, columns, True
+    if len(fields) >= 3 and line.lstrip('\ufeff \t').startswith('"'):
+        return delimiter, _SYMBOL_POSITIONAL, False
+    return None
+
+
+def _header_columns(fields):
+    """从表头识别各列，至少要有名称和类型列，否则返回None"""
+    columns = {}
+    for i, field in enumerate(fields):
+        key = ''.join(field.split()).replace('/', '').replace('_', '').lower().lstrip('\ufeff')
+        column = _SYMBOL_COLUMNS.get(key)
+        if column is not None:
+            columns.setdefault(column, i)
+    return columns if 'name' in columns and 'type' in columns else None
+
+
+def _strip_span(buf, start, end):
+    while start < end and buf[start:start + 1].isspace():
+        start += 1
+    while end > start and buf[end - 1:end].isspace():
+        end -= 1
+    return start, end
+
+
+def _decode(buf, start, end):
+    """逐块解码 buf[start:end]（UTF-8，忽略无法解码的字节），不复制整段字节"""
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='ignore')
+    with memoryview(buf) as view:
+        parts = [decoder.decode(view[i:min(i + _DECODE_CHUNK, end)])
+                 for i in range(start, end, _DECODE_CHUNK)]
+    parts.append(decoder.decode(b'', final=True))
+    return ''.join(parts)
+
+
+class OmronToInovance:
+    """欧姆龙PLC (CP/CJ/NX系列) 转 汇川PLC (H3U/H5U/AC800系列)"""
+    version = '1.4'  # 输出格式变化时递增，结果缓存以此区分
+    
+    def __init__(self, deterministic=False, profile=None):
+        self.variable_decls = []
+        self.deterministic = deterministic  # 确定性输出：不写入生成时间，相同输入得到相同结果
+        self.addresses = addressing.load_profile(profile)  # 地址映射配置（见 converters.addressing）
+        self.timings = StageTimings()
+        self._declared = frozenset()  # 已声明的变量名（大写），同名标识符不按地址改写
+        self._rewrites = {}
+        self._unit_declared = frozenset()  # 增量转换时VAR区中的变量名
+    
+    @classmethod
+    def prepare(cls, profile=None, **options):
+        """预热：编译地址映射配置，同一引擎的各次转换共用（见 converters.Engine）"""
+        return dict(options, profile=addressing.load_profile(profile))
+        
+    def convert(self, content):
+        """主转换入口"""
+        logger.info("🔍 解析欧姆龙ST程序...")
+        
+        table = sniff_symbol_table(content[:4096])
+        if table:
+            return self._convert_symbols(io.StringIO(content, newline=''), table)
+        with self.timings.stage('split'):
+            var_texts, program_body = self.split_sections(content)
+        return self._convert(var_texts, program_body)
+    
+    def convert_file(self, path):
+        """转换文件：内存映射读取，只解码变量声明区和程序体，适合包含大段注释和符号表的导出文件"""
+        logger.info("🔍 解析欧姆龙ST程序: %s", path)
+        
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return self.convert('')
+            table = sniff_symbol_table(f.read(4096).decode('utf-8', errors='ignore'))
+            if table:
+                f.seek(0)
+                with io.TextIOWrapper(f, encoding='utf-8-sig', errors='ignore', newline='') as text:
+                    return self._convert_symbols(text, table)
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, self.timings.stage('split'):
+                var_spans, body_span = locate_sections(mm, patterns.ST_SECTION_BYTES)
+                var_texts = [_decode(mm, *span) for span in var_spans]
+                program_body = _decode(mm, *body_span)
+        return self._convert(var_texts, program_body)
+    
+    def _convert_symbols(self, stream, table):
+        with self.timings.stage('variables'):
+            self.import_symbols(stream, *table)
+        with self.timings.stage('generate'):
+            return self.generate_inovance_code('')
+    
+    def _convert(self, var_texts, program_body):
+        with self.timings.stage('variables'):
+            for var_text in var_texts:
+                self.parse_variables(var_text)
+        
+        # 转换程序体
+        converted_body = self.convert_body(program_body)
+        
+        with self.timings.stage('generate'):
+            return self.generate_inovance_code(converted_body)
+    
+    def split_sections(self, content):
+        """拆分变量声明区与程序体，返回 (变量声明文本列表, 程序体)"""
+        var_spans, (start, end) = locate_sections(content)
+        return [content[a:b] for a, b in var_spans], content[start:end]
+    
+    def parse_variables(self, var_content):
+        """解析变量声明区"""
+        logger.info("  解析变量声明...")
+        declared = len(self.variable_decls)
+        
+        for decl in st.parse_declarations(var_content):
+            var_type = self.convert_type(decl.datatype)
+            init = var_content[decl.init.start:decl.init.end] if decl.init else None
+            if decl.address:
+                address = decl.address.strip()
+                new_addr = self.convert_address(address)
+                comment = f'原欧姆龙: {address}'
+            else:
+                new_addr, comment = None, ''
+            for name in decl.names:
+                self.variable_decls.append({
+                    'name': name,
+                    'type': var_type,
+                    'address': new_addr,
+                    'init': init,
+                    'comment': comment
+                })
+                if new_addr:
+                    logger.debug("    %s: %s @ %s -> %s", name, decl.datatype, address, new_addr)
+        
+        self.timings.count('variables', len(self.variable_decls) - declared)
+    
+    def import_symbols(self, stream, delimiter=',', columns=None, header=True):
+        """批量导入CSV符号表（CX-Programmer / Sysmac Studio 导出），stream 为逐行可迭代的文本
+        
+        逐行读取只收集各列，类型和地址按列去重后批量转换，不对每行做正则匹配。
+        columns 为 {列: 列号}，省略时从表头识别。
+        """
+        logger.info("  导入符号表...")
+        rows = csv.reader(stream, delimiter=delimiter)
+        if header:
+            first = next(rows, None)
+            if columns is None and first is not None:
+                columns = _header_columns(first)
+        columns = columns or _SYMBOL_POSITIONAL
+        
+        get = {column: columns.get(column) for column in ('name', 'type', 'address', 'init', 'comment')}
+        width = max(i for i in get.values() if i is not None) + 1
+        names, types, addresses, inits, comments = [], [], [], [], []
+        for row in rows:
+            if len(row) < width:
+                row = row + [''] * (width - len(row))
+            name = row[get['name']].strip()
+            if not name:
+                continue
+            names.append(name)
+            types.append(row[get['type']].strip())
+            addresses.append(row[get['address']].strip() if get['address'] is not None else '')
+            inits.append(row[get['init']].strip() if get['init'] is not None else '')
+            comments.append(row[get['comment']].strip() if get['comment'] is not None else '')
+        
+        # 按列转换：同一类型、同一地址只转换一次
+        type_map = {t: self.convert_type(t) for t in set(types)}
+        address_map = {a: self.convert_address(a) for a in set(addresses) if a}
+        
+        append = self.variable_decls.append
+        for name, var_type, address, init, comment in zip(names, types, addresses, inits, comments):
+            if address:
+                note = f'原欧姆龙: {address} {comment}' if comment else f'原欧姆龙: {address}'
+                append({
+                    'name': name,
+                    'type': type_map[var_type],
+                    'address': address_map[address],
+                    'init': init or None,
+                    'comment': note.replace('*)', '* )'),
+                })
+            else:
+                append({'name': name, 'type': type_map[var_type], 'address': None,
+                        'init': init or None, 'comment': comment.replace('*)', '* )')})
+        
+        self.timings.count('variables', len(names))
+        return len(names)
+    
+    def convert_body(self, body):
+        """转换程序主体：解析为语法树，地址映射和指令改写都作用在树节点上"""
+        logger.info("  转换程序逻辑...")
+        declared = frozenset(var['name'].upper() for var in self.variable_decls)
+        return self._convert_body(body, declared)
+    
+    def _convert_body(self, body, declared):
+        self._rewrites = {}
+        with self.timings.stage('body'), no_gc():
+            program = st.parse(body)
+            # 程序体中夹带的VAR区原样保留，其中的变量同样不按地址改写
+            self._declared = declared.union(
+                name.upper() for block in program.var_blocks for decl in block.decls for name in decl.names)
+            out = st.Rewriter(body)
+            self._rewrite_statements(program.body, out)
+            result = out.render()
+        for kind, n in self._rewrites.items():
+            self.timings.count(f'rewrite_{kind}', n)
+        return result
+    
+    def _count(self, kind):
+        self._rewrites[kind] = self._rewrites.get(kind, 0) + 1
+    
+    def _rewrite_statements(self, statements, out):
+        for stmt in statements:
+            _STATEMENT_REWRITERS[type(stmt)](self, stmt, out)
+    
+    def _rewrite_assign(self, stmt, out):
+        self._rewrite_name(stmt.target, out)
+        self._rewrite_expr(stmt.value, out)
+    
+    def _rewrite_invoke(self, stmt, out):
+        """MOV/SET/RSET 指令转换为赋值语句，其他调用只改写参数"""
+        call = stmt.call
+        func = call.name.upper()
+        if _LOWERED_CALLS.get(func) != len(call.args):
+            self._rewrite_call(call, out)
+            return
+        args = [self._render(arg, out.text) for arg in call.args]
+        if func == 'MOV':
+            src, dst = args
+            out.replace(stmt.start, stmt.end, f'{dst} := {src};')
+        else:
+            value = 'TRUE' if func == 'SET' else 'FALSE'
+            out.replace(stmt.start, stmt.end, f'{args[0]} := {value};')
+        self._count('call')
+    
+    def _rewrite_block(self, block, out):
+        """IF/CASE/FOR/WHILE/REPEAT：关键字大写并规整空白，结束关键字补齐分号"""
+        for start, end in block.keywords:
+            self._rewrite_keyword(start, end, out)
+        for part in block.parts:
+            if type(part) is list:
+                self._rewrite_statements(part, out)
+            else:
+                self._rewrite_expr(part, out)
+        
+        if block.close is None:
+            return
+        text = out.text
+        start, end = block.close
+        keyword = text[start:end].upper()
+        if block.semi is None:
+            out.replace(start, end, keyword + ';')
+        elif not text[end:block.semi[0]].strip(' \t'):
+            if text[start:block.semi[1]] != keyword + ';':
+                out.replace(start, block.semi[1], keyword + ';')
+        elif text[start:end] != keyword:
+            out.replace(start, end, keyword)
+        else:
+            return
+        self._count('keyword')
+    
+    def _rewrite_keyword(self, start, end, out):
+        text = out.text
+        word = text[start:end]
+        keyword = word.upper()
+        if word != keyword:
+            out.replace(start, end, keyword)
+            self._count('keyword')
+        if keyword in _SPACE_AFTER:
+            m = patterns.ST_HSPACE.match(text, end)
+            if m and m.group() != ' ':
+                out.replace(end, m.end(), ' ')
+        if keyword in _SPACE_BEFORE:
+            i = start
+            while i > 0 and text[i - 1] in ' \t':
+                i -= 1
+            if start - i > 1 or text[i:start] == '\t':
+                if i > 0 and text[i - 1] not in '\r\n':
+                    out.replace(i, start, ' ')
+    
+    def _rewrite_other(self, stmt, out):
+        self._rewrite_expr(stmt.expr, out)
+    
+    def _rewrite_expr(self, expr, out):
+        for ref in expr.refs:
+            if type(ref) is st.Name:
+                self._rewrite_name(ref, out)
+            else:
+                self._rewrite_call(ref, out)
+    
+    def _rewrite_call(self, call, out):
+        for arg in call.args:
+            self._rewrite_expr(arg, out)
+    
+    def _rewrite_name(self, name, out):
+        """地址引用按映射配置改写；已声明的同名变量、结构体成员不改写"""
+        for index in name.indices:
+            self._rewrite_expr(index, out)
+        ident = name.ident
+        new = self.addresses.translate(ident, name.bit)
+        if new is None or ident.upper() in self._declared:
+            return
+        out.replace(name.start, name.base_end, new)
+        self._count('address')
+    
+    def _render(self, expr, text):
+        """单独改写并输出一个表达式（用于拼出新的语句）"""
+        out = st.Rewriter(text)
+        self._rewrite_expr(expr, out)
+        return out.render(expr.start, expr.end)
+    
+    # ---------- 增量转换（见 converters.incremental） ----------
+    
+    def split_units(self, content):
+        """拆分为变量声明区和程序体各段，返回 [(单元名, 文本, 种类)]
+        
+        程序体只在顶层（不在块、括号、注释、字符串内）的空行之后或块结束之后切分，
+        各段分别改写后直接拼接，与整体改写结果相同。
+        """
+        # 地址映射配置的内容参与各单元指纹（配置文件修改后不复用旧结果）
+        profile = self.addresses.digest
+        if sniff_symbol_table(content[:4096]):
+            return [('symbols', content, f'csv:{profile}')]  # 符号表整体作为一个单元
+        var_texts, body = self.split_sections(content)
+        units = [(f'VAR#{i}', text, f'var:{profile}') for i, text in enumerate(var_texts, 1)]
+        
+        # 程序体的改写依赖声明过的变量名，作为程序体单元的上下文参与指纹
+        names = sorted({name.upper() for text in var_texts
+                        for decl in st.parse_declarations(text) for name in decl.names})
+        self._unit_declared = frozenset(names)
+        digest = hashlib.blake2b('\n'.join(names).encode('utf-8'), digest_size=8).hexdigest()
+        context = f'body:{digest}:{profile}'
+        
+        depth = 0  # 块嵌套深度 + 括号深度
+        start = line_start = 0
+        line_no = start_line = 1
+        closed = False  # 当前行是否有块结束
+        for m in patterns.ST_BLOCK.finditer(body):
+            kind = m.lastgroup
+            if kind == 'newline':
+                end = m.end()
+                if depth == 0 and (closed or not body[line_start:m.start()].strip()):
+                    if body[start:end].strip():
+                        units.append((f'body@{start_line}', body[start:end], context))
+                        start, start_line = end, line_no + 1
+                line_start, closed = end, False
+                line_no += 1
+            elif kind == 'open':
+                depth += 1
+            elif kind == 'close':
+                depth -= 1
+                closed = True
+            elif kind == 'paren':
+                depth += 1 if m.group() == '(' else -1
+            else:
+                line_no += m.group().count('\n')  # 跨行的注释或字符串
+        if start < len(body):
+            units.append((f'body@{start_line}', body[start:], context))
+        return units
+    
+    def convert_unit(self, text, kind):
+        """转换单个单元：变量区返回变量声明列表，程序体返回改写后的文本"""
+        if kind.startswith(('var:', 'csv:')):
+            declared, self.variable_decls = self.variable_decls, []
+            try:
+                if kind.startswith('csv:'):
+                    self.import_symbols(io.StringIO(text, newline=''), *sniff_symbol_table(text[:4096]))
+                else:
+                    self.parse_variables(text)
+                return self.variable_decls
+            finally:
+                self.variable_decls = declared
+        return self._convert_body(text, self._unit_declared)
+    
+    def assemble(self, results):
+        """按原文顺序拼接各单元结果，生成完整汇川ST程序"""
+        body = []
+        for result in results:
+            if isinstance(result, str):
+                body.append(result)
+            else:
+                self.variable_decls.extend(result)
+        with self.timings.stage('generate'):
+            return self.generate_inovance_code(''.join(body))
+    
+    def convert_address(self, addr):
+        """转换单个地址"""
+        return self.addresses.address(addr)
+    
+    def convert_type(self, var_type):
+        """转换数据类型"""
+        upper_type = var_type.upper().split('(')[0]  # 处理STRING(20)这种情况
+        return _TYPE_MAP.get(upper_type, var_type)
+    
+    def generate_inovance_code(self, body):
+        """生成汇川ST代码"""
+        logger.info("🔧 生成汇川ST程序...")
+        
+        lines = []
+        lines.append("PROGRAM PLC_PRG")
+        lines.append("VAR")
+        
+        if self.variable_decls:
+            for var in self.variable_decls:
+                init = f" := {var['init']}" if var.get('init') else ''
+                if var['address']:
+                    lines.append(f"    {var['name']} AT {var['address']} : {var['type']}{init}; (* {var['comment']} *)")
+                elif var['comment']:
+                    lines.append(f"    {var['name']} : {var['type']}{init}; (* {var['comment']} *)")
+                else:
+                    lines.append(f"    {var['name']} : {var['type']}{init};")
+        else:
+            lines.append("    (* 请在此处声明变量 *)")
+        
+        lines.append("END_VAR")
+        lines.append("")
+        lines.append("(* ========================================== *)")
+        lines.append("(* 由 Robot_Qu 工业程序转换器生成 *)")
+        lines.append("(* 欧姆龙 (Omron) -> 汇川 (Inovance) *)")
+        if not self.deterministic:
+            lines.append("(* 生成时间: " + str(__import__('datetime').datetime.now()) + " *)")
+        lines.append("(* ========================================== *)")
+        lines.append("")
+        lines.append(body.strip())
+        lines.append("")
+        lines.append("END_PROGRAM")
+        
+        return '\n'.join(lines)
+
+
+_STATEMENT_REWRITERS = {
+    st.Assign: OmronToInovance._rewrite_assign,
+    st.Invoke: OmronToInovance._rewrite_invoke,
+    st.Block: OmronToInovance._rewrite_block,
+    st.Other: OmronToInovance._rewrite_other,
+}
@@ -0,0 +1,119 @@
+"""转换器共用的预编译正则
+
+所有模式在模块导入时编译一次，转换过程中直接调用编译好的对象，
+不再经过 re 模块容量有限的内部缓存。新增模式请集中放在这里。
+"""
+import re
+
+# ==================== ABB RAPID ====================
+
+# 语句级词法单元：一次匹配一条以分号结束的语句，或一行不以分号结束的结构关键字
+# （模块/例行程序首尾、IF...THEN、标签等）；语句可以跨行，续行无需特殊处理。
+# 运动指令和数据声明在匹配时直接拆出各部分，其余语句只整体跳过。
+# 语句中的注释连同换行一起匹配，与前后的 [^;"!]* 没有重叠，缺少分号时不会指数级回溯；
+# 开头的空白一次取尽，匹配失败时不再逐个退回空白重试
+RAPID_STATEMENT = re.compile(r"""
+    [ \t\r\n]*(?![ \t\r\n])
+    (?:
+        (?P<comment>![^\n]*)
+      | (?P<move>(?i:MOVE(?P<move_kind>ABSJ|[JLC])(?:DO|SYNC)?)\b
+            (?P<args>[^;"!]*(?:(?:"[^"]*"|![^\n]*\n)[^;"!]*)*);)
+      | (?P<decl>(?:(?P<scope>(?i:LOCAL|TASK))\s+)?(?P<storage>(?i:PERS|CONST|VAR))\s+
+            (?P<datatype>\w+)\s+(?P<name>\w+)\s*(?P<dims>\{[^}]*\})?
+            (?P<value>[^;"!]*(?:(?:"[^"]*"|![^\n]*\n)[^;"!]*)*);)
+      | (?P<header>(?:(?i:LOCAL)[ \t]+)?(?i:MODULE|PROC|FUNC|TRAP)[ \t]+\w[^\n!]*)
+      | (?P<end>(?i:END(?:MODULE|PROC|FUNC|TRAP))\b)
+      | (?P<block>(?i:
+            (?:ELSEIF|IF|WHILE|FOR)\b[^;\n!]*?\b(?:THEN|DO)\b
+          | ELSE\b | END(?:IF|WHILE|FOR|TEST|RECORD)\b
+          | (?:TEST|RECORD)\b[^;\n!]* | CASE\b[^;\n!]*?:(?!=) | DEFAULT[ \t]*:
+          | ERROR\b(?:[ \t]*\([^)\n]*\))? | BACKWARD\b | UNDO\b
+          | %%%(?s:.*?)%%%
+        ) | \w+[ \t]*:(?!=))
+      | (?P<stmt>[^;"!]*(?:(?:"[^"]*"|![^\n]*\n)[^;"!]*)*;)
+    )
+""", re.VERBOSE)
+# 模块/例行程序头：[LOCAL] MODULE|PROC|TRAP 名称 / [LOCAL] FUNC 返回类型 名称
+RAPID_HEADER = re.compile(r'(?:(LOCAL)\s+)?(MODULE|PROC|TRAP|FUNC\s+\w+)\s+(\w+)', re.IGNORECASE)
+# 数据初值中的数值字面量
+RAPID_NUMBER = re.compile(r'[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?')
+# 语句中夹带的行尾注释
+RAPID_COMMENT = re.compile(r'![^\n]*')
+# 无法识别的内容之后是否还有非空白字符（不复制余下的文本）
+NON_SPACE = re.compile(r'\S')
+# 增量转换的单元边界：例行程序首尾行、模块头
+RAPID_UNIT_LINE = re.compile(
+    r'[ \t]*(?:(?P<end>END(?:PROC|FUNC|TRAP))\b'
+    r'|(?:LOCAL\s+)?(?:PROC|TRAP|FUNC\s+\w+)\s+(?P<routine>\w+)'
+    r'|MODULE\s+(?P<module>\w+))',
+    re.IGNORECASE)
+# 区域数据 z10 -> 10
+ZONE = re.compile(r'z(\d+)$', re.IGNORECASE)
+DIGITS = re.compile(r'\d+')
+
+# ==================== FANUC LS ====================
+
+# /MN 中一条指令的行号（多行指令如圆弧只有首行带行号）
+LS_LINE = re.compile(r'[ \t]*\d+:[ \t]*')
+# 一条以分号结束的运动指令（可带行号）：动作类型、目标点（圆弧为经过点 : 终点）、速度、定位类型，
+# 其后为附加指令（ACC、Offset等）；text 为去掉行号和分号的指令原文
+LS_MOVE = re.compile(r"""
+    (?:\d+:\s*)?
+    (?P<text>(?P<motion>[JLC])\s+
+    (?P<reg>P|PR)\[\s*(?P<index>\d+)[^\]]*\]\s*
+    (?::\s*(?P<reg2>P|PR)\[\s*(?P<index2>\d+)[^\]]*\]\s*)?
+    (?P<speed>\S+)\s+
+    (?P<zone>FINE|CNT\s*\S+|CD\S*)
+    \s*(?P<options>[^;]*?))\s*;$
+""", re.VERBOSE | re.IGNORECASE)
+# 速度：数值 + 单位
+LS_SPEED = re.compile(r'(\d+(?:\.\d*)?)\s*(%|mm/sec|cm/min|inch/min|deg/sec|sec|msec)$', re.IGNORECASE)
+LS_CNT = re.compile(r'CNT\s*(\d+)$', re.IGNORECASE)
+# 坐标系切换
+LS_FRAME = re.compile(r'(UFRAME_NUM|UTOOL_NUM)\s*=\s*(\d+)$', re.IGNORECASE)
+# /POS 中的一个点位记录 P[1]{...}; / P[1:"注释"]{...};
+LS_POS_BLOCK = re.compile(r'P\[\s*(\d+)[^\]]*\]\s*\{([^}]*)\};')
+_LS_NUM = r'([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)'
+# 最常见的笛卡尔点格式（UF/UT、可带CONFIG，X..R，可带E1），一次匹配取出全部数值
+LS_POS_CARTESIAN = re.compile(r"""
+    \s*GP1:\s*UF\s*:\s*(\d+)\s*,\s*UT\s*:\s*(\d+)\s*,[^\n]*\n
+    \s*X\s*=\s*{n}\s*mm\s*,\s*Y\s*=\s*{n}\s*mm\s*,\s*Z\s*=\s*{n}\s*mm\s*,
+    \s*W\s*=\s*{n}\s*deg\s*,\s*P\s*=\s*{n}\s*deg\s*,\s*R\s*=\s*{n}\s*deg
+    (?:\s*,\s*E1\s*=\s*{n}\s*(?:mm|deg))?
+    \s*$""".replace('{n}', _LS_NUM), re.VERBOSE)
+# 其余格式逐项提取：UF、UT、X..R、J1..J6、E1..E3
+LS_POS_VALUE = re.compile(r'([UXYZWPRJE][FT\d]?)[ \t]*[:=][ \t]*' + _LS_NUM)
+LS_END = re.compile(r'^[ \t]*/END', re.MULTILINE)
+
+# ==================== 欧姆龙 ST ====================
+
+# 区段关键字：逐个扫描定位变量声明区和程序体，不做跨全文的回溯匹配；
+# 字节版本用于内存映射的文件（关键字均为ASCII）
+_ST_SECTION = r'(?=[EPVepv])\b(?:(?P<end_var>END_VAR)|(?P<end_program>END_PROGRAM)|(?P<var>VAR)|(?P<program>PROGRAM\s+\w+))\b'
+ST_SECTION = re.compile(_ST_SECTION, re.IGNORECASE)
+ST_SECTION_BYTES = re.compile(_ST_SECTION.encode('ascii'), re.IGNORECASE)
+
+# ST词法单元（converters.st 使用）：注释、字符串、字面量（含 T#5s、16#FF 等带类型前缀的）、
+# 标识符和运算符；每个单元前的空白一并跳过，末尾的空白由 \Z 分支吃掉
+ST_LEX = re.compile(r"""
+    \s*
+    (?:
+        (?P<comment>\(\*.*?\*\)|//[^\n]*)
+      | (?P<string>'(?:\$.|[^'$])*'|"(?:\$.|[^"$])*")
+      | (?P<ident>[A-Za-z_]\w*(?![\w\#]))
+      | (?P<literal>\w+\#[\w.:]+|\d[\d_]*(?:\.\d[\d_]*)?(?:[eE][-+]?\d+)?)
+      | (?P<op>:=|=>|<=|>=|<>|\*\*|\.\.|\S)
+      | \Z
+    )
+""", re.VERBOSE | re.DOTALL)
+# 关键字前后的行内空白（后面还有内容时才算）
+ST_HSPACE = re.compile(r'[ \t]+(?=\S)')
+
+# 增量转换时切分程序体：注释和字符串整体跳过，只关心块的开闭、括号和换行
+ST_BLOCK = re.compile(r"""
+      \(\*.*?\*\) | //[^\n]* | '(?:\$.|[^'$])*' | "(?:\$.|[^"$])*"
+    | (?P<open>\b(?i:IF|FOR|WHILE|CASE|REPEAT)\b)
+    | (?P<close>\b(?i:END_IF|END_FOR|END_WHILE|END_CASE|END_REPEAT)\b)
+    | (?P<paren>[()])
+    | (?P<newline>\n)
+""", re.VERBOSE | re.DOTALL)
@@ -0,0 +1,339 @@
+"""ABB RAPID 词法/语法分析
+
+按语句切分：一个预编译正则每次匹配一条完整语句（到分号为止，可跨行）或一行结构关键字，
+再按语句首个标识符分派解析，整个文本只扫描一遍。iter_statements 可以逐块输入文本，
+未结束的语句留到下一块，用于流式转换；parse 构建完整的 Program 语法树。
+
+语法树只保留转换需要的结构：模块、例行程序、数据声明和运动指令。
+节点使用 __slots__，数据声明的数值保存在 array('d') 中。
+"""
+from array import array
+
+from . import patterns
+from .instrument import no_gc
+
+# 运动指令（MoveJ/MoveJDO/MoveJSync...）-> 运动类型
+MOVE_KINDS = {'J': 'J', 'L': 'L', 'C': 'C', 'ABSJ': 'AbsJ'}
+
+# 流式解析时每攒够这么多字符处理一次
+_LEX_CHUNK = 64 * 1024
+
+
+class Program:
+    __slots__ = ('modules',)
+
+    def __init__(self):
+        self.modules = []
+
+    def data(self):
+        """按声明顺序产出全部数据声明（模块级和例行程序内）"""
+        for module in self.modules:
+            yield from module.data
+            for routine in module.routines:
+                yield from routine.data
+
+    def moves(self):
+        """按程序顺序产出全部运动指令"""
+        for module in self.modules:
+            for routine in module.routines:
+                yield from routine.body
+
+
+class Module:
+    __slots__ = ('name', 'data', 'routines', 'line')
+
+    def __init__(self, name, line=0):
+        self.name = name
+        self.data = []
+        self.routines = []
+        self.line = line
+
+
+class Routine:
+    """PROC / FUNC / TRAP；模块中不属于任何例行程序的运动指令放在 kind 为 None 的例行程序中"""
+
+    __slots__ = ('kind', 'name', 'local', 'data', 'body', 'line')
+
+    def __init__(self, kind, name, local=False, line=0):
+        self.kind = kind
+        self.name = name
+        self.local = local
+        self.data = []
+        self.body = []
+        self.line = line
+
+
+class DataDecl:
+    """数据声明；values 为初值中的数值字面量（按出现顺序，布尔值不计），初值不是字面量时为None
+
+    数值在第一次访问 values 时才转换；只用到前几个数值时用 leading(n)，不必转换整个初值。
+    """
+
+    __slots__ = ('storage', 'scope', 'datatype', 'name', 'dims', 'literal', '_values', 'module', 'routine', 'line')
+
+    def __init__(self, storage, scope, datatype, name, dims, literal, module, routine, line):
+        self.storage = storage    # PERS / CONST / VAR
+        self.scope = scope        # LOCAL / TASK / None
+        self.datatype = datatype  # 小写，如 robtarget / jointtarget / tooldata
+        self.name = name
+        self.dims = dims          # 数组维数文本，如 '{10}'，非数组为None
+        self.literal = literal    # 初值字面量文本（已去掉注释），不是字面量时为None
+        self._values = None
+        self.module = module
+        self.routine = routine    # 例行程序内声明的数据只在该例行程序内可见，模块级为None
+        self.line = line
+
+    @property
+    def local(self):
+        return self.scope == 'LOCAL'
+
+    @property
+    def values(self):
+        if self._values is None and self.literal is not None:
+            self._values = _numbers(self.literal)
+        return self._values
+
+    def leading(self, n):
+        """初值中的前 n 个数值（列表，不足 n 个时全部返回），初值不是字面量时为None"""
+        if self._values is not None:
+            return self._values[:n].tolist()
+        if self.literal is None:
+            return None
+        return _floats(self.literal, n)
+
+
+class Move:
+    """运动指令；target / via 为数据名称，或内联数据的数值 array('d')"""
+
+    __slots__ = ('kind', 'target', 'via', 'speed', 'zone', 'tool', 'wobj', 'module', 'routine', 'line')
+
+    def __init__(self, kind, target, via, speed, zone, tool, wobj, module, routine, line):
+        self.kind = kind      # J / L / C / AbsJ
+        self.target = target
+        self.via = via        # MoveC 的圆弧中间点，其他为None
+        self.speed = speed
+        self.zone = zone
+        self.tool = tool
+        self.wobj = wobj
+        self.module = module
+        self.routine = routine  # 所在例行程序，按作用域查找目标点时使用
+        self.line = line
+
+
+def iter_statements(chunks):
+    """逐条产出 (行号, 匹配对象)；chunks 为文本块迭代器（整段文本、或逐行读取的文件）"""
+    carry, pending, size, line = '', [], 0, 1
+    stalled = False  # carry 开头的语句在上一块中无法结束
+    for chunk in chunks:
+        pending.append(chunk)
+        size += len(chunk)
+        if size >= _LEX_CHUNK:
+            added = ''.join(pending)
+            pending, size = [], 0
+            if stalled and ';' not in added and '%%%' not in added:
+                carry += added  # 新内容不能结束该语句，不必重新扫描
+                continue
+            text = carry + added
+            cut = text.rfind('\n') + 1  # 只处理完整的行，结构关键字以换行结束
+            pos, line = yield from _lex(text, 0, cut, line, False)
+            stalled = pos < cut
+            carry = text[pos:]
+    text = carry + ''.join(pending)
+    yield from _lex(text, 0, len(text), line, True)
+
+
+def _lex(text, pos, end, line, final):
+    match = patterns.RAPID_STATEMENT.match
+    non_space = patterns.NON_SPACE.search
+    count = text.count
+    limit = end  # 余下文本中没有分号时只在当前行内匹配，逐行跳过不会每次都扫描到末尾
+    while pos < end:
+        if limit < end:
+            nl = text.find('\n', pos, end)
+            limit = end if nl < 0 else nl + 1
+        m = match(text, pos, limit)
+        if m is None:
+            if not final:
+                break  # 语句尚未结束，留到下一块
+            if non_space(text, pos, end) is None:
+                break
+            # 无法识别的内容：跳过当前行继续
+            nl = text.find('\n', pos, end)
+            pos = end if nl < 0 else nl + 1
+            line += 1
+            if limit == end and text.find(';', pos, end) < 0:
+                limit = pos
+            continue
+        start = m.start(m.lastgroup)
+        line += count('\n', pos, start)
+        yield line, m
+        line += count('\n', start, m.end())
+        pos = m.end()
+    return pos, line
+
+
+def iter_nodes(chunks, module=None):
+    """逐条产出语法事件 (类型, 节点)：
+
+    ('module', Module) / ('routine', Routine) / ('end', 'PROC'|'MODULE'|...) /
+    ('data', DataDecl) / ('move', Move)
+    module 为文本开头所属的模块名（解析模块中的一段时使用）。
+    """
+    routine = None
+    for line, m in iter_statements(chunks):
+        kind = m.lastgroup
+        if kind == 'move':
+            move_kind, args = m.group('move_kind', 'args')
+            yield 'move', _parse_move(MOVE_KINDS[move_kind.upper()], args, module, routine, line)
+        elif kind == 'decl':
+            yield 'data', _parse_decl(m, module, routine, line)
+        elif kind == 'header':
+            h = patterns.RAPID_HEADER.match(m.group('header'))
+            if h is None:
+                continue
+            header_kind = h.group(2).split()[0].upper()
+            if header_kind == 'MODULE':
+                module, routine = h.group(3), None
+                yield 'module', Module(module, line)
+            else:
+                routine = h.group(3)
+                yield 'routine', Routine(header_kind, routine, h.group(1) is not None, line)
+        elif kind == 'end':
+            routine = None
+            yield 'end', m.group('end').upper()[3:]
+
+
+def parse(text, module=None):
+    """解析RAPID文本，返回 Program"""
+    with no_gc():
+        return _build(text, module)
+
+
+def _build(text, module):
+    program = Program()
+    current = routine = None
+    for kind, node in iter_nodes((text,), module):
+        if kind == 'move':
+            if routine is None:
+                if current is None:
+                    current = Module(module)
+                    program.modules.append(current)
+                routine = Routine(None, None)
+                current.routines.append(routine)
+            routine.body.append(node)
+        elif kind == 'data':
+            if routine is not None:
+                routine.data.append(node)
+            else:
+                if current is None:
+                    current = Module(module)
+                    program.modules.append(current)
+                current.data.append(node)
+        elif kind == 'routine':
+            if current is None:
+                current = Module(module)
+                program.modules.append(current)
+            routine = node
+            current.routines.append(routine)
+        elif kind == 'module':
+            current, routine = node, None
+            program.modules.append(current)
+        elif node != 'MODULE':
+            routine = None  # ENDPROC / ENDFUNC / ENDTRAP
+    return program
+
+
+def split_args(text):
+    """按顶层逗号拆分参数（跳过方括号、圆括号和字符串内的逗号）"""
+    if '[' not in text and '(' not in text and '"' not in text:
+        return [a.strip() for a in text.split(',')]
+    args, depth, start, quoted = [], 0, 0, False
+    for i, ch in enumerate(text):
+        if ch == '"':
+            quoted = not quoted
+        elif quoted:
+            continue
+        elif ch in '[(':
+            depth += 1
+        elif ch in '])':
+            depth -= 1
+        elif ch == ',' and depth == 0:
+            args.append(text[start:i].strip())
+            start = i + 1
+    args.append(text[start:].strip())
+    return args
+
+
+def _literal(text):
+    """内联数据字面量 -> array('d')，名称原样返回"""
+    if text and text[0] == '[':
+        return _numbers(text)
+    return text or None
+
+
+def _numbers(value):
+    """聚合数据初值中的全部数值"""
+    return array('d', _floats(value))  # 从列表构造比从迭代器快
+
+
+def _floats(value, limit=None):
+    """初值中的数值列表；limit 为只转换前几个"""
+    try:
+        # 常见情况：只有数值和方括号，直接按逗号切开
+        parts = value.replace('[', ' ').replace(']', ' ').split(',', -1 if limit is None else limit)
+        return list(map(float, parts[:limit]))
+    except ValueError:
+        return list(map(float, patterns.RAPID_NUMBER.findall(value)[:limit]))
+
+
+def _parse_move(kind, args, module, routine, line):
+    if '!' in args:
+        args = patterns.RAPID_COMMENT.sub('', args)
+    # 开关和可选参数以 \ 开头：\Conc 单独占一个逗号位置，\V:= \WObj:= 等跟在所属参数后面
+    if '\\' not in args and '[' not in args and '(' not in args and '"' not in args:
+        # 常见情况：MoveL p10, v1000, z50, tool0
+        positional = args.split(',')
+        if len(positional) == (5 if kind == 'C' else 4):
+            if kind == 'C':
+                via, target, speed, zone, tool = positional
+                via = via.strip()
+            else:
+                target, speed, zone, tool = positional
+                via = None
+            return Move(kind, target.strip(), via, speed.strip(), zone.strip(), tool.strip(), None, module, routine, line)
+
+    positional, wobj = split_args(args), None
+    if '\\' in args:
+        plain = []
+        for arg in positional:
+            if '\\' in arg:
+                arg, *options = arg.split('\\')
+                for option in options:
+                    if option[:4].upper() == 'WOBJ' and ':=' in option:
+                        wobj = option.split(':=', 1)[1].strip()
+                arg = arg.strip()
+                if not arg:
+                    continue
+            plain.append(arg)
+        positional = plain
+
+    via = None
+    if kind == 'C':
+        via = _literal(positional[0]) if positional else None
+        positional = positional[1:]
+    target, speed, zone, tool = (positional[:4] + [None, None, None, None])[:4]
+    return Move(kind, _literal(target), via, speed, zone, tool, wobj, module, routine, line)
+
+
+def _parse_decl(m, module, routine, line):
+    scope, storage, datatype, name, dims, value = m.group('scope', 'storage', 'datatype', 'name', 'dims', 'value')
+    literal = None
+    value = value.strip()
+    if value.startswith(':='):
+        if '!' in value:
+            value = patterns.RAPID_COMMENT.sub('', value)
+        value = value[2:].lstrip()
+        if value and value[0] in '[-+.0123456789':
+            literal = value
+    return DataDecl(storage.upper(), scope.upper() if scope else None, datatype.lower(), name,
+                    dims, literal, module, routine, line)
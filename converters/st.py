@@ -0,0 +1,560 @@
+"""IEC 61131-3 结构化文本（ST）词法/语法分析
+
+一个预编译正则逐个产出词法单元（注释、字符串、字面量、标识符、运算符），
+递归下降解析器边读边建树，整个文本只扫描一遍。
+
+语法树保存每个节点在原文中的位置，不保存空白和注释：改写时通过 Rewriter 记录
+"把原文 [start, end) 替换为新文本"，输出时把未改动的部分原样拷贝，注释、缩进和
+字符串内容因此不会被误改。
+
+表达式不按优先级展开，只记录其中引用的变量（Name）和函数调用（Call），
+地址映射、指令改写只需要这些。
+"""
+from . import patterns
+from .instrument import no_gc
+
+# 语句、表达式都不会包含的保留字：解析表达式时遇到即结束，块缺少结束关键字时也能恢复
+_STOP_WORDS = frozenset((
+    'THEN', 'DO', 'OF', 'TO', 'BY', 'ELSE', 'ELSIF', 'UNTIL',
+    'END_IF', 'END_CASE', 'END_FOR', 'END_WHILE', 'END_REPEAT',
+    'END_PROGRAM', 'END_FUNCTION', 'END_FUNCTION_BLOCK', 'END_VAR',
+))
+# 结束语句序列的保留字
+_BLOCK_END = _STOP_WORDS - {'THEN', 'DO', 'OF', 'TO', 'BY'}
+# 表达式中的运算符关键字和常量，不是变量引用
+_EXPR_WORDS = frozenset(('AND', 'OR', 'XOR', 'NOT', 'MOD', 'TRUE', 'FALSE'))
+
+_VAR_KINDS = frozenset(('VAR', 'VAR_INPUT', 'VAR_OUTPUT', 'VAR_IN_OUT', 'VAR_GLOBAL',
+                        'VAR_TEMP', 'VAR_EXTERNAL', 'VAR_STAT'))
+_VAR_QUALIFIERS = frozenset(('CONSTANT', 'RETAIN', 'PERSISTENT', 'NON_RETAIN'))
+_POU_KINDS = {'PROGRAM': 'END_PROGRAM', 'FUNCTION_BLOCK': 'END_FUNCTION_BLOCK', 'FUNCTION': 'END_FUNCTION'}
+
+_BLOCK_CLOSE = {'IF': 'END_IF', 'CASE': 'END_CASE', 'FOR': 'END_FOR', 'WHILE': 'END_WHILE',
+                'REPEAT': 'END_REPEAT'}
+_SIMPLE_STATEMENTS = frozenset(('EXIT', 'RETURN', 'CONTINUE'))
+
+
+# ==================== 语法树 ====================
+# 所有节点的 start / end 为原文中的字符位置 [start, end)
+
+class Program:
+    """整段ST文本：POU名称（PROGRAM / FUNCTION_BLOCK / FUNCTION，没有为None）、VAR区和语句"""
+
+    __slots__ = ('name', 'var_blocks', 'body')
+
+    def __init__(self):
+        self.name = None
+        self.var_blocks = []
+        self.body = []
+
+
+class VarBlock:
+    __slots__ = ('kind', 'decls', 'start', 'end')
+
+    def __init__(self, kind, start):
+        self.kind = kind  # VAR / VAR_INPUT / VAR_GLOBAL ...
+        self.decls = []
+        self.start = start
+        self.end = start
+
+
+class VarDecl:
+    """变量声明；同时支持 a, b : INT AT D100; 和 IEC 的 a AT %MW0 : INT;"""
+
+    __slots__ = ('names', 'datatype', 'address', 'init', 'start', 'end')
+
+    def __init__(self, names, datatype, address, init, start, end):
+        self.names = names
+        self.datatype = datatype  # 原文，如 'INT'、'STRING(20)'、'ARRAY[0..9] OF INT'
+        self.address = address    # AT 之后的原文，没有为None
+        self.init = init          # 初值 Expr，没有为None
+        self.start = start
+        self.end = end
+
+
+class Block:
+    """IF / CASE / FOR / WHILE / REPEAT
+
+    parts 按原文顺序交替存放表达式（Expr）和语句列表：
+      IF:     条件, 语句, [条件, 语句]..., [ELSE 语句]
+      CASE:   选择表达式, [标签, 语句]..., [ELSE 语句]
+      FOR:    i := 初值, 终值, [步长], 语句
+      WHILE:  条件, 语句
+      REPEAT: 语句, 条件
+    keywords 为各关键字（不含结束关键字）的位置，close / semi 为结束关键字及其后分号的位置，缺失为None。
+    """
+
+    __slots__ = ('kind', 'parts', 'keywords', 'close', 'semi', 'start', 'end')
+
+    def __init__(self, kind, start):
+        self.kind = kind
+        self.parts = []
+        self.keywords = []
+        self.close = None
+        self.semi = None
+        self.start = start
+        self.end = start
+
+
+class Assign:
+    __slots__ = ('target', 'value', 'start', 'end')
+
+    def __init__(self, target, value, start, end):
+        self.target = target  # Name
+        self.value = value    # Expr
+        self.start = start
+        self.end = end        # 含分号
+
+
+class Invoke:
+    """函数/功能块调用语句，如 MOV(D10, W20);"""
+
+    __slots__ = ('call', 'start', 'end')
+
+    def __init__(self, call, start, end):
+        self.call = call
+        self.start = start
+        self.end = end  # 含分号
+
+
+class Other:
+    """其余语句（EXIT、RETURN、无法识别的语句等），只记录其中的引用"""
+
+    __slots__ = ('expr', 'start', 'end')
+
+    def __init__(self, expr, start, end):
+        self.expr = expr
+        self.start = start
+        self.end = end
+
+
+class Expr:
+    __slots__ = ('refs', 'start', 'end')
+
+    def __init__(self, refs, start, end):
+        self.refs = refs  # 按出现顺序的 Name / Call
+        self.start = start
+        self.end = end
+
+
+class Name:
+    """变量引用：标识符及其后的 .成员 / [下标] / .位号
+
+    base_end 为标识符（紧跟位号时含位号，如 W3.02）的结束位置，bit 为位号原文。
+    """
+
+    __slots__ = ('ident', 'bit', 'indices', 'start', 'base_end', 'end')
+
+    def __init__(self, ident, start, end):
+        self.ident = ident
+        self.bit = None
+        self.indices = ()  # 下标表达式；有下标时才创建列表
+        self.start = start
+        self.base_end = end
+        self.end = end
+
+
+class Call:
+    __slots__ = ('name', 'args', 'start', 'end')
+
+    def __init__(self, name, start):
+        self.name = name
+        self.args = []  # 实参表达式（形参名 IN := / Q => 不计入）
+        self.start = start
+        self.end = start
+
+
+# ==================== 解析 ====================
+
+def parse(text):
+    """解析ST文本（完整程序、只有程序体、或夹带VAR区的程序体均可），返回 Program"""
+    with no_gc():
+        return _Parser(text).program()
+
+
+def parse_declarations(text):
+    """解析VAR区内容（不含 VAR / END_VAR），返回 VarDecl 列表"""
+    parser = _Parser(text)
+    block = VarBlock('VAR', 0)
+    parser.declarations(block)
+    return block.decls
+
+
+class _Parser:
+    __slots__ = ('text', '_match', '_pos', '_ahead', 'kind', 'value', 'key', 'start', 'end', 'last')
+
+    def __init__(self, text):
+        self.text = text
+        self._match = patterns.ST_LEX.match
+        self._pos = 0  # 下一个词法单元的扫描起点
+        self._ahead = None
+        self.end = 0
+        self.advance()
+
+    def _token(self):
+        """扫描下一个词法单元 (种类, 原文, key, 开始, 结束)，跳过注释"""
+        match, text = self._match, self.text
+        m = match(text, self._pos)
+        kind = m.lastgroup
+        while kind == 'comment':
+            m = match(text, m.end())
+            kind = m.lastgroup
+        end = self._pos = m.end()
+        if kind is None:  # 文本结束
+            return 'eof', '', '', end, end
+        value = m.group(kind)
+        return kind, value, value.upper() if kind == 'ident' else value, m.start(kind), end
+
+    def advance(self):
+        """移到下一个词法单元；last 为刚越过的单元的结束位置"""
+        self.last = self.end
+        if self._ahead is not None:
+            self.kind, self.value, self.key, self.start, self.end = self._ahead
+            self._ahead = None
+            return
+        # 最常走的路径，直接在这里扫描，不经过 _token 构造元组
+        match, text = self._match, self.text
+        m = match(text, self._pos)
+        kind = m.lastgroup
+        while kind == 'comment':
+            m = match(text, m.end())
+            kind = m.lastgroup
+        end = self._pos = self.end = m.end()
+        if kind is None:  # 文本结束
+            self.kind, self.value, self.key, self.start = 'eof', '', '', end
+            return
+        self.kind = kind
+        self.value = value = m.group(kind)
+        self.key = value.upper() if kind == 'ident' else value
+        self.start = m.start(kind)
+
+    def peek(self):
+        """下一个单元的 key（标识符为大写，其他为原文）"""
+        if self._ahead is None:
+            self._ahead = self._token()
+        return self._ahead[2]
+
+    def accept(self, key):
+        if self.key == key:
+            self.advance()
+            return True
+        return False
+
+    # ---------- 程序结构 ----------
+
+    def program(self):
+        program = Program()
+        while self.kind != 'eof':
+            key = self.key if self.kind == 'ident' else None
+            if key in _POU_KINDS:
+                self.advance()
+                if self.kind == 'ident':
+                    program.name = self.value
+                    self.advance()
+                if self.accept(':'):  # FUNCTION 的返回类型
+                    self.advance()
+            elif key in _VAR_KINDS:
+                program.var_blocks.append(self.var_block())
+            elif key in ('END_PROGRAM', 'END_FUNCTION', 'END_FUNCTION_BLOCK'):
+                self.advance()
+                self.accept(';')
+            else:
+                program.body.extend(self.statements())
+                if self.kind == 'ident' and self.key in _BLOCK_END and self.key not in (
+                        'END_PROGRAM', 'END_FUNCTION', 'END_FUNCTION_BLOCK'):
+                    # 多余的结束关键字（如没有配对的 END_IF）：作为普通语句跳过
+                    start = self.start
+                    self.advance()
+                    program.body.append(Other(Expr([], start, self.last), start, self.last))
+        return program
+
+    def var_block(self):
+        block = VarBlock(self.key, self.start)
+        self.advance()
+        while self.kind == 'ident' and self.key in _VAR_QUALIFIERS:
+            self.advance()
+        self.declarations(block)
+        if self.accept('END_VAR'):
+            self.accept(';')
+        block.end = self.last
+        return block
+
+    def declarations(self, block):
+        while self.kind != 'eof' and not (self.kind == 'ident' and self.key == 'END_VAR'):
+            start = self.start
+            names = []
+            while self.kind == 'ident':
+                names.append(self.value)
+                self.advance()
+                if not self.accept(','):
+                    break
+            address = None
+            if self.accept('AT'):  # IEC: 名称 AT 地址 : 类型
+                address = self._raw_until((':', ';'))
+            if not names or not self.accept(':'):
+                self._skip_statement()
+                continue
+            datatype = self._raw_until(('AT', ':=', ';')) or ''
+            if self.accept('AT'):  # 欧姆龙: 名称 : 类型 AT 地址
+                address = self._raw_until((':=', ';'))
+            init = None
+            if self.accept(':='):
+                init = self.expression((';',))
+            self.accept(';')
+            block.decls.append(VarDecl(names, datatype, address, init, start, self.last))
+
+    def _raw_until(self, keys):
+        """跳到 keys 中的单元之前，返回跳过部分的原文（没有为None）"""
+        start = self.start
+        while self.kind != 'eof' and self.key not in keys and self.key != 'END_VAR':
+            self.advance()
+        return self.text[start:self.last] if self.last > start else None
+
+    def _skip_statement(self):
+        while self.kind != 'eof' and self.key != ';' and self.key != 'END_VAR':
+            self.advance()
+        self.accept(';')
+
+    # ---------- 语句 ----------
+
+    def statements(self, case_labels=False):
+        """解析语句序列，遇到结束类保留字（END_IF、ELSE 等）或文本结束时返回
+
+        case_labels 为真时（CASE 分支内）遇到下一个分支标签也返回。
+        """
+        result = []
+        while self.kind != 'eof':
+            if self.kind == 'ident':
+                key = self.key
+                if key in _BLOCK_END or key in _VAR_KINDS or key in _POU_KINDS:
+                    break
+            elif self.key == ';':
+                self.advance()
+                continue
+            if case_labels and self._at_case_label():
+                break
+            result.append(self.statement())
+        return result
+
+    def statement(self):
+        start = self.start
+        if self.kind == 'ident':
+            key = self.key
+            if key in _BLOCK_CLOSE:
+                return self.block(key)
+            if key in _SIMPLE_STATEMENTS or key in _STOP_WORDS:
+                # EXIT / RETURN；多余的 THEN、DO 等也在这里跳过
+                self.advance()
+                self.accept(';')
+                return Other(Expr([], start, start), start, self.last)
+            if self.key not in _EXPR_WORDS:
+                ref = self.reference()
+                if self.accept(':='):
+                    if isinstance(ref, Call):
+                        # 调用不能作为赋值目标：整条语句按普通表达式保留，只改写其中的引用
+                        expr = self.expression((';',), [ref], start)
+                        self.accept(';')
+                        return Other(expr, start, self.last)
+                    value = self.expression((';',))
+                    self.accept(';')
+                    return Assign(ref, value, start, self.last)
+                if isinstance(ref, Call) and (self.kind != 'op' or self.key == ';'):
+                    # 调用之后不是运算符：调用语句（缺分号时到此结束）
+                    self.accept(';')
+                    return Invoke(ref, start, self.last)
+                expr = self.expression((';',), [ref], start)
+                self.accept(';')
+                return Other(expr, start, self.last)
+        expr = self.expression((';',))
+        if self.last <= start:
+            self.advance()  # 无法识别的单个符号（如多余的右括号），保证前进
+        self.accept(';')
+        return Other(expr, start, self.last)
+
+    def block(self, kind):
+        block = Block(kind, self.start)
+        parts, keywords = block.parts, block.keywords
+        keywords.append((self.start, self.end))
+        self.advance()
+
+        if kind == 'IF':
+            parts.append(self.expression(()))
+            self._keyword('THEN', keywords)
+            parts.append(self.statements())
+            while self.kind == 'ident' and self.key == 'ELSIF':
+                keywords.append((self.start, self.end))
+                self.advance()
+                parts.append(self.expression(()))
+                self._keyword('THEN', keywords)
+                parts.append(self.statements())
+            if self._keyword('ELSE', keywords):
+                parts.append(self.statements())
+        elif kind == 'CASE':
+            parts.append(self.expression(()))
+            self._keyword('OF', keywords)
+            while self.kind != 'eof':
+                if self._keyword('ELSE', keywords):
+                    parts.append(self.statements())
+                    break
+                if self.kind == 'ident' and self.key in _BLOCK_END:
+                    break
+                start = self.start
+                parts.append(self.expression((':',)))  # 分支标签，如 1, 3..5
+                self.accept(':')
+                parts.append(self.statements(case_labels=True))
+                if self.start == start:
+                    # 标签位置是表达式中不会出现的保留字（如误写的 DO: / BY ,）：原样保留并越过，保证前进
+                    self.advance()
+        elif kind == 'FOR':
+            parts.append(self.expression(()))
+            self._keyword('TO', keywords)
+            parts.append(self.expression(()))
+            if self._keyword('BY', keywords):
+                parts.append(self.expression(()))
+            self._keyword('DO', keywords)
+            parts.append(self.statements())
+        elif kind == 'WHILE':
+            parts.append(self.expression(()))
+            self._keyword('DO', keywords)
+            parts.append(self.statements())
+        else:  # REPEAT
+            parts.append(self.statements())
+            self._keyword('UNTIL', keywords)
+            parts.append(self.expression((';',)))
+
+        if self.kind == 'ident' and self.key == _BLOCK_CLOSE[kind]:
+            block.close = (self.start, self.end)
+            self.advance()
+            if self.key == ';':
+                block.semi = (self.start, self.end)
+                self.advance()
+        block.end = self.last
+        return block
+
+    def _keyword(self, key, keywords):
+        if self.kind == 'ident' and self.key == key:
+            keywords.append((self.start, self.end))
+            self.advance()
+            return True
+        return False
+
+    def _at_case_label(self):
+        """CASE 分支内，当前位置是否为下一个分支的标签（1: / 1, 2: / 3..5: / Red:）"""
+        if self.kind == 'literal' or self.key == '-':
+            return True
+        return self.kind == 'ident' and self.peek() in (':', ',', '..')
+
+    # ---------- 表达式 ----------
+
+    def expression(self, stops, refs=None, start=None):
+        """扫描到顶层的 stops 符号、保留字或不配对的右括号为止，返回 Expr"""
+        if refs is None:
+            refs = []
+        if start is None:
+            start = self.start
+        end = self.last if refs else start
+        depth = 0
+        while self.kind != 'eof':
+            kind, key = self.kind, self.key
+            if kind == 'ident':
+                if key in _STOP_WORDS:
+                    break
+                if key in _EXPR_WORDS:
+                    self.advance()
+                else:
+                    refs.append(self.reference())
+            elif kind == 'op':
+                if depth == 0 and key in stops or key == ';':
+                    break
+                if key == '(' or key == '[':
+                    depth += 1
+                elif key == ')' or key == ']':
+                    if depth == 0:
+                        break
+                    depth -= 1
+                self.advance()
+            else:
+                self.advance()
+            end = self.last
+        return Expr(refs, start, end)
+
+    def reference(self):
+        """标识符开头的引用：变量（含 .成员、[下标]、.位号）或函数调用"""
+        name = Name(self.value, self.start, self.end)
+        self.advance()
+        if self.key == '(' and self.kind == 'op':
+            return self.call(name)
+        while self.kind == 'op':
+            key = self.key
+            if key == '.':
+                self.advance()
+                if (self.kind == 'literal' and name.bit is None and name.base_end == self.last - 1
+                        and self.start == self.last and self.value.isdigit()):
+                    # 紧跟在标识符后的 .位号（W3.02）
+                    name.bit = self.value
+                    name.base_end = self.end
+                self.advance()
+            elif key == '[':
+                self.advance()
+                if not name.indices:
+                    name.indices = []
+                while True:
+                    name.indices.append(self.expression((',', ']')))
+                    if not self.accept(','):
+                        break
+                self.accept(']')
+            elif key == '^':
+                self.advance()
+            else:
+                break
+            name.end = self.last
+        return name
+
+    def call(self, name):
+        call = Call(name.ident, name.start)
+        self.advance()  # (
+        while self.kind != 'eof' and self.key != ')':
+            if self.kind == 'ident' and self.peek() in (':=', '=>'):
+                self.advance()  # 形参名
+                self.advance()  # := / =>
+            call.args.append(self.expression((',',)))
+            if not self.accept(','):
+                break
+        self.accept(')')
+        call.end = self.last
+        return call
+
+
+# ==================== 改写 ====================
+
+class Rewriter:
+    """记录对原文的替换，render 时按位置拼接；替换区间互相重叠时保留先出现的"""
+
+    __slots__ = ('text', 'edits')
+
+    def __init__(self, text):
+        self.text = text
+        self.edits = []
+
+    def replace(self, start, end, new_text):
+        self.edits.append((start, end, new_text))
+
+    def render(self, start=0, end=None):
+        text = self.text
+        if end is None:
+            end = len(text)
+        self.edits.sort(key=_edit_start)
+        parts = []
+        pos = start
+        for edit_start, edit_end, new_text in self.edits:
+            if edit_start < pos or edit_end > end:
+                continue
+            parts.append(text[pos:edit_start])
+            parts.append(new_text)
+            pos = edit_end
+        parts.append(text[pos:end])
+        return ''.join(parts)
+
+
+def _edit_start(edit):
+    return edit[0]
@@ -0,0 +1,83 @@
+"""robtarget 符号表
+
+点位数据按槽位顺序存放在 array('d') 中（每个点 x, y, z, w, p, r 六个值），
+名称只通过一个不区分大小写的索引查找，不再为每个点保存两份dict。
+
+RAPID作用域：
+- 默认（PERS / CONST / VAR）和 TASK PERS 的数据在整个任务内可见
+- LOCAL 声明只在所属模块内可见，并优先于同名的全局数据
+- 例行程序内声明的数据只在该例行程序内可见，优先于同名的模块数据和全局数据
+同一个表可以依次装入多个模块，跨模块解析目标点。
+"""
+from array import array
+
+FIELDS = 6  # x, y, z, w, p, r
+
+
+class PointTable:
+    """紧凑的robtarget存储，单一的 (作用域, 小写名称) 索引"""
+
+    __slots__ = ('_index', '_names', '_values')
+
+    def __init__(self):
+        self._index = {}           # (作用域, 小写名称) -> 槽位；作用域为None、LOCAL所属模块或 (模块, 例行程序)
+        self._names = []           # 槽位 -> 声明时的名称
+        self._values = array('d')  # 槽位 i 的数据位于 [i*6, i*6+6)
+
+    def add(self, name, values, module=None, local=False, routine=None):
+        """登记一个点位，同一作用域内重复声明时覆盖旧值，返回槽位；routine 为声明所在的例行程序"""
+        if routine:
+            scope = _routine_scope(module, routine)
+        else:
+            scope = module.lower() if local and module else None
+        return self._put((scope, name.lower()), name, values)
+
+    def update(self, other):
+        """按声明顺序并入另一个表的全部点位（如增量转换时各单元的点位）"""
+        for key, slot in other._index.items():
+            self._put(key, other._names[slot], other._values[slot * FIELDS:(slot + 1) * FIELDS])
+
+    def _put(self, key, name, values):
+        slot = self._index.get(key)
+        if slot is None:
+            slot = len(self._names)
+            self._index[key] = slot
+            self._names.append(name)
+            self._values.extend(values)
+        else:
+            self._names[slot] = name
+            self._values[slot * FIELDS:(slot + 1) * FIELDS] = array('d', values)
+        return slot
+
+    def find(self, name, module=None, routine=None):
+        """按RAPID作用域规则查找槽位（例行程序、模块、全局依次查找），未定义返回-1"""
+        folded = name.lower()
+        if routine:
+            slot = self._index.get((_routine_scope(module, routine), folded))
+            if slot is not None:
+                return slot
+        if module:
+            slot = self._index.get((module.lower(), folded))
+            if slot is not None:
+                return slot
+        return self._index.get((None, folded), -1)
+
+    def get(self, name, module=None, routine=None):
+        """返回 (x, y, z, w, p, r)，未定义返回None"""
+        slot = self.find(name, module, routine)
+        if slot < 0:
+            return None
+        return tuple(self._values[slot * FIELDS:(slot + 1) * FIELDS])
+
+    def name(self, slot):
+        return self._names[slot]
+
+    def __contains__(self, name):
+        return self.find(name) >= 0
+
+    def __len__(self):
+        return len(self._names)
+
+
+def _routine_scope(module, routine):
+    return module.lower() if module else None, routine.lower()
@@ -0,0 +1,346 @@
+"""后台转换任务队列
+
+转换在有界的进程池中执行，CPU密集的正则处理可以用满所有核心；
+HTTP请求只负责提交任务并立即返回任务ID。本模块不依赖Flask。
+
+每个任务在工作进程中有CPU时间和墙钟时间预算：工作进程用间隔定时器（SIGALRM）定期检查，
+超出预算或收到取消请求时在当前位置（包括正则回溯中）中断转换，任务以
+"在阶段 X 超时 / 取消" 结束，工作进程继续处理后续任务。取消请求通过控制目录中的标记文件传递。
+定时器依赖 signal.setitimer（Linux/macOS）；Windows 上不强制预算，只能取消尚未开始的任务。
+"""
+import contextlib
+import os
+import shutil
+import signal
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from cache import CACHE_OPTIONS, ResultCache, cache_key, convert_cached
+from converters import get_converter, run_conversion, warm
+from converters.instrument import METRICS, StageInterrupt
+
+_TICK = 0.1  # 工作进程检查预算和取消请求的间隔秒数
+
+_FINISHED = ('done', 'error', 'timeout', 'cancelled')
+
+
+class QueueFull(RuntimeError):
+    """排队任务数已达上限"""
+
+
+class JobTimeout(StageInterrupt):
+    """任务超出CPU或墙钟时间预算"""
+
+    def __init__(self, budget, seconds):
+        super().__init__(budget, seconds)
+        self.budget = budget  # 'cpu' 或 'wall'
+        self.seconds = seconds
+
+    def __str__(self):
+        kind = 'CPU' if self.budget == 'cpu' else '墙钟'
+        return f'在阶段 {self.stage} 超出{kind}时间预算（{self.seconds:g} 秒）'
+
+
+class JobCancelled(StageInterrupt):
+    """任务在执行中被取消"""
+
+    def __str__(self):
+        return f'任务在阶段 {self.stage} 被取消'
+
+
+@contextlib.contextmanager
+def _budget(cpu_seconds, wall_seconds, cancel_path):
+    """在块内定期检查时间预算和取消标记，触发时从当前执行位置抛出 JobTimeout / JobCancelled"""
+    if not hasattr(signal, 'setitimer'):
+        yield
+        return
+    cpu_start, wall_start = time.process_time(), time.monotonic()
+
+    def check(signum, frame):
+        if cancel_path and os.path.exists(cancel_path):
+            exc = JobCancelled()
+        elif wall_seconds and time.monotonic() - wall_start > wall_seconds:
+            exc = JobTimeout('wall', wall_seconds)
+        elif cpu_seconds and time.process_time() - cpu_start > cpu_seconds:
+            exc = JobTimeout('cpu', cpu_seconds)
+        else:
+            return
+        signal.setitimer(signal.ITIMER_REAL, 0)  # 只中断一次，展开调用栈时不再触发
+        raise exc
+
+    previous = signal.signal(signal.SIGALRM, check)
+    signal.setitimer(signal.ITIMER_REAL, _TICK, _TICK)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def _run_job(conv_type, source, target, data, output_path, cache_dir=None,
+             cpu_seconds=0, wall_seconds=0, cancel_path=None):
+    """在工作进程中执行：解码、转换并直接写出结果文件，只把字符数和阶段计时传回主进程
+
+    cache_dir 不为空时结果同时写入磁盘缓存层，主进程下次可直接命中。
+    超出预算或被取消时抛出 JobTimeout / JobCancelled（stage 为中断时所在阶段），不留下不完整的结果文件。
+    """
+    stats = {}
+    step = 'decode'  # 转换器各阶段之外的步骤，用于标注中断位置
+    try:
+        with _budget(cpu_seconds, wall_seconds, cancel_path):
+            if cache_dir:
+                step = 'convert'
+                result, _, _ = convert_cached(ResultCache(max_entries=0, disk_dir=cache_dir),
+                                              conv_type, source, target, data, stats=stats)
+            else:
+                content = data.decode('utf-8', errors='ignore')
+                step = 'convert'
+                result, _ = run_conversion(conv_type, source, target, content, stats=stats)
+            step = 'write'
+            with open(output_path, 'w', encoding='utf-8') as f:
+                f.write(result)
+    except StageInterrupt as e:
+        if e.stage is None:
+            e.stage = step
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(output_path)
+        raise
+    return len(result), stats
+
+
+def _run_budgeted(cpu_seconds, wall_seconds, fn, *args):
+    """在工作进程中按时间预算执行 fn(*args)"""
+    with _budget(cpu_seconds, wall_seconds, None):
+        return fn(*args)
+
+
+def _warm_worker():
+    """工作进程启动时预热转换引擎，每个进程各保留一份，之后的任务不再有导入和编译开销"""
+    warm()
+    warm(**CACHE_OPTIONS)
+
+
+class JobQueue:
+    """进程池任务队列
+
+    max_workers: 工作进程数，None表示使用CPU核心数
+    max_queue:   未完成（排队+执行中）任务数上限，超出时 submit 抛出 QueueFull
+    max_history: 保留的已结束任务记录数，超出时丢弃最早的记录
+    cache:       ResultCache，命中时不进入进程池，任务直接完成
+    store:       OutputStore，任务结束（含失败、取消）时释放结果键的预留
+    cpu_budget:  每个任务的CPU时间预算（秒），0表示不限制
+    wall_budget: 每个任务开始执行后的墙钟时间预算（秒），0表示不限制
+    """
+
+    def __init__(self, max_workers=None, max_queue=64, max_history=1000, cache=None, store=None,
+                 cpu_budget=0, wall_budget=0):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.max_history = max_history
+        self.cache = cache
+        self.store = store
+        self.cpu_budget = cpu_budget
+        self.wall_budget = wall_budget
+        self._executor = None
+        self._control_dir = None  # 取消标记文件目录
+        self._jobs = OrderedDict()
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        # 首次提交时才启动进程池，导入本模块不会派生进程
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers, initializer=_warm_worker)
+            self._control_dir = tempfile.mkdtemp(prefix='robotqu-jobs-')
+        return self._executor
+
+    def _cancel_path(self, job_id):
+        return os.path.join(self._control_dir, f'{job_id}.cancel')
+
+    def submit(self, conv_type, source, target, data, output_path, filename, key=None,
+               cpu_budget=None, wall_budget=None):
+        """提交任务，返回任务ID；key 为结果在输出存储中的键，原样记录在任务中
+
+        cpu_budget / wall_budget 为本任务的时间预算（秒），None 时使用队列的默认值。
+        """
+        if self.cache is not None:
+            digest = cache_key(data, get_converter(conv_type, source, target), CACHE_OPTIONS)
+            cached = self.cache.get(digest)
+            if cached is not None:
+                with open(output_path, 'w', encoding='utf-8') as f:
+                    f.write(cached[0])
+                self._release(key)
+                return self._add_finished(filename, key, len(cached[0]))
+
+        converter_name = get_converter(conv_type, source, target).__name__
+        with self._lock:
+            if self._pending >= self.max_queue:
+                self._release(key)
+                raise QueueFull(f'任务队列已满（{self.max_queue}），请稍后重试')
+            job_id = uuid.uuid4().hex
+            job = {
+                'status': 'queued',
+                'filename': filename,
+                'key': key,
+                'converter': converter_name,
+                'stats': None,
+                'chars': None,
+                'error': None,
+                'stage': None,
+                'cancel_requested': False,
+                'future': None,
+            }
+            self._jobs[job_id] = job
+            self._pending += 1
+            cache_dir = self.cache.disk_dir if self.cache is not None else None
+            executor = self._get_executor()
+            future = executor.submit(
+                _run_job, conv_type, source, target, data, output_path, cache_dir,
+                self.cpu_budget if cpu_budget is None else cpu_budget,
+                self.wall_budget if wall_budget is None else wall_budget,
+                self._cancel_path(job_id))
+            job['future'] = future
+        future.add_done_callback(lambda f: self._finish(job_id, f))
+        return job_id
+
+    def run(self, fn, *args):
+        """在共用进程池中按默认时间预算执行 fn(*args)，返回future（批量转换的成员使用）
+
+        与任务共用排队上限，未完成数已达上限时抛出 QueueFull；fn 需可在工作进程中导入。
+        """
+        with self._lock:
+            if self._pending >= self.max_queue:
+                raise QueueFull(f'任务队列已满（{self.max_queue}），请稍后重试')
+            self._pending += 1
+            future = self._get_executor().submit(_run_budgeted, self.cpu_budget, self.wall_budget, fn, *args)
+        future.add_done_callback(self._run_done)
+        return future
+
+    def _run_done(self, future):
+        with self._lock:
+            self._pending -= 1
+
+    def _release(self, key):
+        if self.store is not None and key is not None:
+            self.store.release(key)
+
+    def _add_finished(self, filename, key, chars):
+        with self._lock:
+            job_id = uuid.uuid4().hex
+            self._jobs[job_id] = {
+                'status': 'done',
+                'filename': filename,
+                'key': key,
+                'stats': None,
+                'chars': chars,
+                'error': None,
+                'stage': None,
+                'future': None,
+            }
+            self._prune()
+        return job_id
+
+    def _finish(self, job_id, future):
+        with self._lock:
+            key = self._jobs[job_id]['key'] if job_id in self._jobs else None
+        self._release(key)  # 结果文件已写完（或任务失败），之后按普通结果清理
+        with self._lock:
+            self._pending -= 1
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(self._cancel_path(job_id))
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            exc = None if future.cancelled() else future.exception()
+            if future.cancelled():
+                job['status'] = 'cancelled'
+                job['error'] = '任务在开始前被取消'
+            elif isinstance(exc, StageInterrupt):
+                job['status'] = 'timeout' if isinstance(exc, JobTimeout) else 'cancelled'
+                job['error'] = str(exc)
+                job['stage'] = exc.stage
+                if job['status'] == 'timeout':
+                    METRICS.record(job['converter'], {}, ok=False)
+            elif exc is not None:
+                job['status'] = 'error'
+                job['error'] = str(exc)
+                METRICS.record(job['converter'], {}, ok=False)
+            else:
+                job['status'] = 'done'
+                job['chars'], job['stats'] = future.result()
+                # 工作进程中的计时汇总到本进程，/metrics 才能看到
+                METRICS.record(job['converter'], job['stats'])
+            job['future'] = None
+            self._prune()
+
+    def _prune(self):
+        # 批量转换成员的 future 也计入 _pending 但不在 _jobs 中，按状态计数
+        finished = sum(1 for job in self._jobs.values() if job['status'] in _FINISHED)
+        if finished <= self.max_history:
+            return
+        for job_id in list(self._jobs):
+            if finished <= self.max_history:
+                break
+            if self._jobs[job_id]['status'] in _FINISHED:
+                del self._jobs[job_id]
+                finished -= 1
+
+    def get(self, job_id):
+        """返回任务状态快照，任务不存在时返回None"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            status = job['status']
+            if status == 'queued' and job['future'] is not None and job['future'].running():
+                status = 'cancelling' if job['cancel_requested'] else 'running'
+            return {
+                'status': status,
+                'filename': job['filename'],
+                'key': job['key'],
+                'chars': job['chars'],
+                'stats': job.get('stats'),
+                'error': job['error'],
+                'stage': job['stage'],
+            }
+
+    def cancel(self, job_id):
+        """取消任务：未开始的直接取消，执行中的通知工作进程尽快中断
+
+        返回取消后的状态（'cancelled' / 'cancelling'，已结束的任务返回原状态），任务不存在时返回None。
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            if job['status'] != 'queued':
+                return job['status']
+            future = job['future']
+            job['cancel_requested'] = True
+        # 回调 _finish 需要获取锁，在锁外取消
+        if future.cancel():
+            return 'cancelled'
+        if not future.done():
+            open(self._cancel_path(job_id), 'w').close()
+            return 'cancelling'
+        job = self.get(job_id)
+        return job['status'] if job is not None else None
+
+    def stats(self):
+        with self._lock:
+            return {
+                'pending': self._pending,
+                'max_queue': self.max_queue,
+                'max_workers': self.max_workers or os.cpu_count(),
+            }
+
+    def shutdown(self, wait=True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+            shutil.rmtree(self._control_dir, ignore_errors=True)
+            self._control_dir = None
@@ -0,0 +1,110 @@
+"""预渲染、预压缩的页面
+
+页面内容在启动时生成一次，同时准备好压缩版本和 ETag，之后的请求只需按
+Accept-Encoding 选出现成的字节串，或按 If-None-Match 直接返回 304。
+静态资源（图标等）同样按内容生成 ETag，页面中以带内容摘要的地址（?v=...）引用，
+可长期缓存；内容变化时地址随之变化。本模块不依赖Flask。
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+
+try:
+    import brotli
+except ImportError:  # brotli为可选依赖，未安装时只提供gzip版本
+    brotli = None
+
+# 页面本身每次都向服务器确认（命中时为 304），带摘要地址的静态资源可缓存一年
+REVALIDATE = 'no-cache'
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+# 值得压缩的内容类型（图片等已压缩格式原样返回）
+_COMPRESSIBLE = ('text/', 'image/svg+xml', 'application/json', 'application/javascript')
+
+
+class CachedPage:
+    """一个不变的页面及其各编码版本"""
+
+    def __init__(self, body, content_type='text/html; charset=utf-8'):
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        self.content_type = content_type
+        self.digest = digest = hashlib.blake2b(body, digest_size=16).hexdigest()
+        # 编码 -> (内容, ETag)，按优先顺序；同一内容的不同编码使用不同的 ETag
+        self.version = digest[:12]  # 静态资源地址中的 ?v=
+        self.variants = {}
+        if content_type.startswith(_COMPRESSIBLE):
+            if brotli is not None:
+                self.variants['br'] = (brotli.compress(body, quality=11), f'"{digest}-br"')
+            self.variants['gzip'] = (gzip.compress(body, compresslevel=9, mtime=0), f'"{digest}-gzip"')
+        self.variants['identity'] = (body, f'"{digest}"')
+        self._etags = frozenset(etag for _, etag in self.variants.values())
+
+    def select(self, accept_encoding):
+        """按 Accept-Encoding 选择版本，返回 (编码, 内容, ETag)"""
+        accepted = accepted_encodings(accept_encoding)
+        for encoding in self.variants:
+            if encoding != 'identity' and encoding in accepted:
+                body, etag = self.variants[encoding]
+                return encoding, body, etag
+        body, etag = self.variants['identity']
+        return 'identity', body, etag
+
+    def not_modified(self, if_none_match):
+        """If-None-Match 中有本页面任一版本的 ETag 时返回True"""
+        if not if_none_match:
+            return False
+        tags = {tag.strip().removeprefix('W/') for tag in if_none_match.split(',')}
+        return '*' in tags or not tags.isdisjoint(self._etags)
+
+    @classmethod
+    def from_file(cls, path):
+        """读取静态文件，内容类型按扩展名判断"""
+        with open(path, 'rb') as f:
+            body = f.read()
+        content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        if content_type.startswith('text/') or content_type == 'image/svg+xml':
+            content_type += '; charset=utf-8'
+        return cls(body, content_type)
+
+
+def load_assets(directory):
+    """读取目录下的全部静态文件，返回 文件名 -> CachedPage"""
+    assets = {}
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        if os.path.isfile(path):
+            assets[name] = CachedPage.from_file(path)
+    return assets
+
+
+def asset_url(assets, name, prefix='/static/'):
+    """带内容摘要的静态资源地址，内容变化时地址随之变化"""
+    return f'{prefix}{name}?v={assets[name].version}'
+
+
+def cache_control(page, version):
+    """静态资源的 Cache-Control：请求的摘要与当前内容一致时可长期缓存"""
+    return IMMUTABLE if version == page.version else REVALIDATE
+
+
+def accepted_encodings(header):
+    """Accept-Encoding 中可接受（q>0）的编码集合"""
+    accepted = set()
+    for item in (header or '').split(','):
+        coding, _, params = item.partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(';'):
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if q > 0:
+            accepted.add(coding)
+    return accepted
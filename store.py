@@ -0,0 +1,199 @@
+"""转换结果存储
+
+每个结果使用唯一键保存为 <root>/<key>/<文件名>，不同用户的同名文件互不覆盖。
+后台清理线程按TTL删除过期结果，并在总大小超限时从最旧的开始淘汰；
+为后台任务预留、尚未写入结果的目录带有 .pending 标记，清理时跳过。
+目录结构本身就是索引，多个Web进程共享同一目录也能互相找到结果。
+可选：小于 memory_threshold 的结果只保存在本进程内存中，不落盘
+（仅适用于单进程部署，多进程时下载请求可能落到其他进程）。
+本模块不依赖Flask。
+"""
+import contextlib
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+_KEY_RE = re.compile(r'^[0-9a-f]{32}$')
+_PENDING = '.pending'  # 预留目录的标记文件，结果写完（或任务结束）后删除
+
+
+class OutputStore:
+    """有界、自动清理的结果存储
+
+    root:             存储目录
+    ttl:              结果保留秒数
+    max_bytes:        磁盘+内存结果总字节数上限
+    memory_threshold: 不超过该字节数的结果直接放在内存中，0表示全部落盘
+    sweep_interval:   后台清理间隔秒数
+    reserve_ttl:      预留目录的最长保留秒数，超过后视为遗弃（如进程崩溃），按普通结果清理
+    """
+
+    def __init__(self, root='temp/outputs', ttl=3600, max_bytes=512 * 1024 * 1024,
+                 memory_threshold=0, sweep_interval=60, reserve_ttl=24 * 3600):
+        self.root = os.path.abspath(root)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.memory_threshold = memory_threshold
+        self.sweep_interval = sweep_interval
+        self.reserve_ttl = reserve_ttl
+        self._memory = OrderedDict()  # key -> (文件名, 字节内容, 创建时间)
+        self._memory_bytes = 0
+        self._reserved = set()  # 本进程预留、尚未 release 的键
+        self._lock = threading.Lock()
+        self._sweeper = None
+        self._stop = threading.Event()
+
+    def reserve(self, filename):
+        """为稍后写入的结果（如后台任务）分配唯一键，返回 (key, 文件路径)
+
+        写入完成或任务结束后须调用 release(key)；在此之前清理不会删除该目录，get 也不返回结果。
+        """
+        key, directory = self._new_directory()
+        open(os.path.join(directory, _PENDING), 'w').close()
+        with self._lock:
+            self._reserved.add(key)
+        return key, os.path.join(directory, filename)
+
+    def release(self, key):
+        """结束预留，此后该结果按TTL和总大小正常清理"""
+        with self._lock:
+            self._reserved.discard(key)
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(os.path.join(self.root, key, _PENDING))
+
+    def _new_directory(self):
+        key = uuid.uuid4().hex
+        directory = os.path.join(self.root, key)
+        os.makedirs(directory)
+        return key, directory
+
+    def put(self, filename, text):
+        """保存结果文本，返回键"""
+        data = text.encode('utf-8')
+        if len(data) <= self.memory_threshold:
+            key = uuid.uuid4().hex
+            with self._lock:
+                self._memory[key] = (filename, data, time.time())
+                self._memory_bytes += len(data)
+            return key
+
+        key, directory = self._new_directory()
+        with open(os.path.join(directory, filename), 'wb') as f:
+            f.write(data)
+        return key
+
+    def get(self, key):
+        """返回 {'filename', 'path', 'data'}，不存在或已过期时返回None；path/data 二选一"""
+        if not _KEY_RE.match(key):
+            return None
+
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+        if entry is not None:
+            filename, data, created = entry
+            if now - created > self.ttl:
+                return None
+            return {'filename': filename, 'path': None, 'data': data}
+
+        directory = os.path.join(self.root, key)
+        try:
+            names = os.listdir(directory)
+        except FileNotFoundError:
+            return None
+        if not names or _PENDING in names:  # 结果尚未写完
+            return None
+        path = os.path.join(directory, names[0])
+        try:
+            if now - os.path.getmtime(path) > self.ttl:
+                return None
+        except FileNotFoundError:
+            return None
+        return {'filename': names[0], 'path': path, 'data': None}
+
+    def sweep(self):
+        """删除过期结果，并在总大小超限时从最旧的开始淘汰，返回删除数量"""
+        now = time.time()
+        removed = 0
+
+        with self._lock:
+            for key in list(self._memory):
+                if now - self._memory[key][2] > self.ttl:
+                    self._memory_bytes -= len(self._memory.pop(key)[1])
+                    removed += 1
+            memory_bytes = self._memory_bytes
+            reserved = set(self._reserved)
+
+        entries = []  # (修改时间, 字节数, 目录)
+        try:
+            with os.scandir(self.root) as it:
+                dirs = [d for d in it
+                        if d.is_dir() and _KEY_RE.match(d.name) and d.name not in reserved]
+        except FileNotFoundError:
+            dirs = []
+        for d in dirs:
+            # 目录由多个进程共用，扫描期间条目可能被其他进程删除，只跳过该条目
+            try:
+                size, mtime, pending = 0, d.stat().st_mtime, False
+                with os.scandir(d.path) as files:
+                    for f in files:
+                        try:
+                            st = f.stat()
+                        except FileNotFoundError:
+                            continue
+                        size += st.st_size
+                        mtime = max(mtime, st.st_mtime)
+                        pending = pending or f.name == _PENDING
+            except FileNotFoundError:
+                continue
+            if pending and now - mtime <= self.reserve_ttl:
+                continue  # 其他进程预留、任务尚未结束
+            if now - mtime > self.ttl:
+                shutil.rmtree(d.path, ignore_errors=True)
+                removed += 1
+            else:
+                entries.append((mtime, size, d.path))
+
+        total = memory_bytes + sum(e[1] for e in entries)
+        if total > self.max_bytes:
+            entries.sort()
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                shutil.rmtree(path, ignore_errors=True)
+                total -= size
+                removed += 1
+            with self._lock:
+                while total > self.max_bytes and self._memory:
+                    _, (_, data, _) = self._memory.popitem(last=False)
+                    self._memory_bytes -= len(data)
+                    total -= len(data)
+                    removed += 1
+        return removed
+
+    def _sweep_loop(self):
+        while not self._stop.wait(self.sweep_interval):
+            try:
+                self.sweep()
+            except Exception:  # 清理失败不能让线程退出
+                logger.exception("⚠️ 清理转换结果失败")
+
+    def start_sweeper(self):
+        """启动后台清理线程（守护线程，重复调用无副作用）"""
+        if self._sweeper is None:
+            self._sweeper = threading.Thread(target=self._sweep_loop, name='output-sweeper', daemon=True)
+            self._sweeper.start()
+
+    def stop_sweeper(self):
+        if self._sweeper is not None:
+            self._stop.set()
+            self._sweeper.join()
+            self._sweeper = None
+            self._stop.clear()
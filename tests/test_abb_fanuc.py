@@ -0,0 +1,206 @@
+"""ABB RAPID -> FANUC LS：整体转换、流式转换、增量转换的输出一致，表达式目标点不换算，/POS 批量格式化，缺少分号的语句不会导致回溯爆炸，数据初值按需转换，例行程序内的数据只在该例行程序内可见"""
+import io
+import logging
+import random
+import re
+import time
+
+import pytest
+
+from benchmarks.corpus import generate_rapid
+from converters import abb_fanuc, rapid, run_conversion, stream_conversion
+from converters.incremental import UnitCache, convert_incremental
+
+MULTI_MODULE = """MODULE Cell
+    TASK PERS robtarget pHome:=[[500,0,800],[0,0,1,0],[0,0,0,0],[9E9,9E9,9E9,9E9,9E9,9E9]];
+    LOCAL CONST robtarget pPick:=[[300,-200,150],[0.5,0.5,0.5,0.5],[0,0,0,0],[9E9,9E9,9E9,9E9,9E9,9E9]];
+    CONST jointtarget jSafe:=[[0,-20,30,0,45,0],[9E9,9E9,9E9,9E9,9E9,9E9]];
+    PERS wobjdata wTable:=[FALSE,TRUE,"",[[0,0,0],[1,0,0,0]],[[0,0,0],[1,0,0,0]]];
+
+    PROC main()
+        MoveAbsJ jSafe\\NoEOffs, v1000, fine, tool0;
+        MoveJ pHome, v1000, z50, tool0;
+        MoveL pPick, v200, z10, tGripper\\WObj:=wTable;  ! 取件
+        MoveL [[310,-200,150],[1,0,0,0],[0,0,0,0],[9E9,9E9,9E9,9E9,9E9,9E9]],
+              v100, fine, tGripper\\WObj:=wTable;
+        MoveC pPick, pHome, v300, z20, tool0;
+        Place;
+    ENDPROC
+
+    PROC Place()
+        MoveL pDrop, v500, fine, tool0;
+    ENDPROC
+ENDMODULE
+
+MODULE Station
+    LOCAL CONST robtarget pPick:=[[0,400,200],[0.7071068,0,0.7071068,0],[0,0,0,0],[9E9,9E9,9E9,9E9,9E9,9E9]];
+    PROC Stn()
+        MoveJ pPick, v800, z100, tool0;
+        MoveJ pHome, v800, z100, tool0;
+    ENDPROC
+ENDMODULE
+"""
+
+OFFS = """MODULE M
+    CONST robtarget p10:=[[100,0,500],[1,0,0,0],[0,0,0,0],[9E9,9E9,9E9,9E9,9E9,9E9]];
+    PROC main()
+        MoveJ p10, v1000, z50, tool0;
+        MoveL Offs(p10,
+         0, 0, 100), v100, fine, tool0;
+        MoveL RelTool(p10, 0, 0, 50)\\WObj:=wobj0, v100, fine, tool0;
+        MoveC p10, Offs(p10,	10, 0, 0), v100, z10, tool0;
+        MoveL p10, v100, fine, tool0;
+    ENDPROC
+ENDMODULE
+"""
+
+# 例行程序内的同名数据只遮蔽本例行程序中的引用
+SHADOWED = """MODULE M
+    CONST robtarget pA:=[[100,0,500],[1,0,0,0],[0,0,0,0],[9E9,9E9,9E9,9E9,9E9,9E9]];
+    PROC first()
+        VAR robtarget pa:=[[200,0,500],[1,0,0,0],[0,0,0,0],[9E9,9E9,9E9,9E9,9E9,9E9]];
+        MoveL pA, v100, fine, tool0;
+    ENDPROC
+    PROC second()
+        MoveL pA, v100, fine, tool0;
+    ENDPROC
+ENDMODULE
+
+MODULE N
+    PROC first()
+        MoveL pA, v100, fine, tool0;
+    ENDPROC
+ENDMODULE
+"""
+
+SAMPLES = {
+    'multi_module': MULTI_MODULE,
+    'offs': OFFS,
+    'shadowed': SHADOWED,
+    'generated': generate_rapid(robtargets=500, moves=1500, procs=12),
+}
+
+
+def _convert(text):
+    return run_conversion('robot', 'ABB', 'FANUC', text, deterministic=True)[0]
+
+
+def _stream(text, chunk_size=64 * 1024):
+    chunks, _ = stream_conversion('robot', 'ABB', 'FANUC', io.StringIO(text), chunk_size, deterministic=True)
+    return ''.join(chunks)
+
+
+@pytest.mark.parametrize('name', sorted(SAMPLES))
+def test_stream_equals_full_conversion(name):
+    text = SAMPLES[name]
+    assert _stream(text) == _convert(text)
+    assert _stream(text, chunk_size=100) == _convert(text)
+
+
+@pytest.mark.parametrize('name', sorted(SAMPLES))
+def test_incremental_equals_full_conversion(name):
+    text = SAMPLES[name]
+    cache = UnitCache()
+    result, _, report = convert_incremental('robot', 'ABB', 'FANUC', text, cache, deterministic=True)
+    assert result == _convert(text)
+
+    # 只改一个例行程序后再转换：复用其余单元，结果仍与整体转换相同
+    edited = text.replace('v100, fine', 'v150, fine', 1)
+    result, _, report = convert_incremental('robot', 'ABB', 'FANUC', edited, cache, deterministic=True)
+    assert result == _convert(edited)
+    assert report['reused'] > 0
+
+
+def test_routine_data_does_not_replace_module_data():
+    result = _convert(SHADOWED)
+    assert re.findall(r'X = ([-\d.]+) mm', result) == ['200.000', '100.000', '100.000']
+    converter = abb_fanuc.ABBtoFanuc()
+    converter.parse_mod(SHADOWED)
+    assert converter.points.get('pA')[:3] == (100, 0, 500)
+    assert converter.points.get('pA', 'M', 'first')[:3] == (200, 0, 500)
+    assert converter.points.get('pA', 'M', 'second')[:3] == (100, 0, 500)
+    assert converter.points.get('pA', 'N', 'first')[:3] == (100, 0, 500)  # 其他模块的同名例行程序看不到
+
+
+def test_expression_targets_are_commented_out(caplog):
+    stats = {}
+    with caplog.at_level(logging.WARNING, logger='converters.abb_fanuc'):
+        result, _ = run_conversion('robot', 'ABB', 'FANUC', OFFS, stats=stats, deterministic=True)
+    mn = result.split('/MN\n', 1)[1].split('\n/POS', 1)[0].splitlines()
+    assert mn == [
+        '  1:J  P[1] 100% CNT50 ;',
+        '  2:  !MoveL Offs(p10, 0, 0, 100) ;',
+        '  3:  !MoveL RelTool(p10, 0, 0, 50) ;',
+        '  4:  !MoveC p10, Offs(p10, 10, 0, 0) ;',
+        '  5:L  P[2] 100mm/sec FINE ;',
+    ]
+    assert result.count('P[') == 4  # /MN 和 /POS 中各两个点，表达式不生成点位
+    assert stats['counts']['skipped_moves'] == 3
+    assert len([r for r in caplog.records if r.levelno == logging.WARNING]) == 3
+
+
+@pytest.mark.parametrize('lines', [8, 30, 20000])
+def test_unterminated_statement_before_comments_is_skipped_quickly(lines):
+    text = ("MODULE M\n    PROC main()\n        MoveL p1, v100, fine, tool0\n"
+            + "        ! comment\n" * lines + "    ENDPROC\nENDMODULE\n")
+    start = time.perf_counter()
+    result = _convert(text)
+    assert time.perf_counter() - start < 2
+    assert result.split('/MN\n', 1)[1].split('/POS', 1)[0].strip() == ''  # 缺少分号的语句逐行跳过
+    assert _stream(text) == result
+
+
+def test_lines_without_any_semicolon_are_skipped_in_linear_time():
+    text = "MODULE M\n    PROC main()\n" + "        MoveL p1, v100, fine, tool0\n" * 20000 + "    ENDPROC\nENDMODULE\n"
+    start = time.perf_counter()
+    _convert(text)
+    assert time.perf_counter() - start < 5
+
+
+def test_data_values_are_converted_on_demand():
+    program = rapid.parse(
+        "MODULE M\n"
+        "    PERS tooldata t1:=[TRUE,[[1,2,3],[1,0,0,0]],[5,[0,0,1],[1,0,0,0],0,0,0]];\n"
+        "    CONST robtarget p1:=[[10,20,30],[1,0,0,0], ! 姿态\n        [0,0,0,0],[9E9,9E9,9E9,9E9,9E9,9E9]];\n"
+        "    VAR num n1:=n2;\n"
+        "ENDMODULE\n")
+    tool, target, num = program.data()
+    assert tool.leading(3) == [1, 2, 3]  # 布尔值不计
+    assert list(tool.values) == [1, 2, 3, 1, 0, 0, 0, 5, 0, 0, 1, 1, 0, 0, 0, 0, 0, 0]
+    assert target.leading(7) == [10, 20, 30, 1, 0, 0, 0]
+    assert target.leading(7) == list(target.values[:7])
+    assert len(target.values) == 17
+    assert num.values is None and num.leading(7) is None
+
+
+def _format_position(k, uf, ut, joint, p):
+    """逐点生成 /POS 文本（批量格式化之前的写法），作为对照"""
+    if joint:
+        axes = (f"    J1 = {p[0]:.3f} deg, J2 = {p[1]:.3f} deg, J3 = {p[2]:.3f} deg,\n"
+                f"    J4 = {p[3]:.3f} deg, J5 = {p[4]:.3f} deg, J6 = {p[5]:.3f} deg\n")
+    else:
+        axes = (f"    X = {p[0]:.3f} mm, Y = {p[1]:.3f} mm, Z = {p[2]:.3f} mm,\n"
+                f"    W = {p[3]:.3f} deg, P = {p[4]:.3f} deg, R = {p[5]:.3f} deg\n")
+    return f"P[{k}]{{\n   GP1:\n    UF : {uf}, UT : {ut},\n{axes}}};"
+
+
+def test_batched_positions_match_per_point_formatting():
+    rng = random.Random(0)
+    entries = [(k, rng.randint(0, 3), rng.randint(1, 4), rng.random() < 0.2,
+                tuple(rng.uniform(-2000, 2000) for _ in range(6)))
+               for k in range(1, 2 * abb_fanuc._POS_BATCH + 10)]
+    chunks = list(abb_fanuc._format_positions(entries))
+    assert len(chunks) == 3
+    assert '\n'.join(chunks) == '\n'.join(_format_position(*entry) for entry in entries)
+
+
+def test_quaternion_batch_matches_scalar_conversion(monkeypatch):
+    rng = random.Random(1)
+    quats = [rng.uniform(-1, 1) for _ in range(4 * 300)]
+    converter = abb_fanuc.ABBtoFanuc()
+    it = iter(quats)
+    expected = [converter.quaternion_to_euler(*q) for q in zip(it, it, it, it)]
+    batch = converter.quaternions_to_euler(quats)
+    assert [v for wpr in batch for v in wpr] == pytest.approx([v for wpr in expected for v in wpr], abs=1e-9)
+    monkeypatch.setattr(abb_fanuc, 'np', None)
+    assert converter.quaternions_to_euler(quats) == expected
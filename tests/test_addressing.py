@@ -0,0 +1,69 @@
+"""欧姆龙 -> 汇川 地址映射：内置配置的 DM / E / A 区，JSON / YAML 配置文件，配置错误"""
+import json
+
+import pytest
+
+from converters.addressing import ProfileError, load_profile
+from converters.omron_inovance import OmronToInovance
+
+PROFILE = {'name': 'line3', 'areas': {'W': {'word': '%MW', 'bit': '%MX', 'offset': 100}}}
+
+
+@pytest.mark.parametrize('address, expected', [
+    ('DM100', '%MD100'),
+    ('E0_100', '%MD32868'),
+    ('E2_5', '%MD98309'),
+    ('EM1_0', '%MD65536'),
+    ('A3', '%MW3003'),
+    ('A200.01', '%MX3200.01'),
+    ('H0.00', '%MX900.00'),
+    ('%W3', '%MW3'),
+])
+def test_default_profile(address, expected):
+    assert load_profile().address(address) == expected
+
+
+def test_unmapped_identifiers_are_left_alone():
+    addresses = load_profile()
+    assert addresses.translate('DATA') is None
+    assert addresses.translate('E_100') is None
+    assert addresses.address('TIMER1') == '%TIMER1'
+
+
+def test_json_profile(tmp_path):
+    path = tmp_path / 'line3.json'
+    path.write_text(json.dumps(PROFILE), encoding='utf-8')
+    converter = OmronToInovance(deterministic=True, profile=str(path))
+    assert converter.addresses.name == 'line3'
+    assert converter.convert_body('W3.01 := TRUE;\nD5 := W4;\n') == '%MX103.01 := TRUE;\nD5 := %MW104;\n'
+    assert load_profile(str(path)) is converter.addresses  # 同一文件只编译一次
+
+
+def test_yaml_profile(tmp_path):
+    yaml = pytest.importorskip('yaml')
+    path = tmp_path / 'line3.yaml'
+    path.write_text(yaml.safe_dump(PROFILE), encoding='utf-8')
+    addresses = load_profile(str(path))
+    assert addresses.address('W3') == '%MW103'
+    assert addresses.digest == load_profile(PROFILE).digest
+
+
+@pytest.mark.parametrize('profile', [
+    {'areas': {}},
+    {'areas': {'W1': {'word': '%MW'}}},
+    {'areas': {'W': {'prefix': '%MW'}}},
+    {'areas': {'W': {'offset': 10}}},
+    {'areas': {'W': {'word': '%MW', 'offset': -1}}},
+])
+def test_invalid_profiles_are_rejected(profile):
+    with pytest.raises(ProfileError):
+        load_profile(profile)
+
+
+def test_unreadable_profile_file(tmp_path):
+    with pytest.raises(ProfileError):
+        load_profile(str(tmp_path / 'missing.json'))
+    path = tmp_path / 'broken.json'
+    path.write_text('{"areas": ', encoding='utf-8')
+    with pytest.raises(ProfileError):
+        load_profile(str(path))
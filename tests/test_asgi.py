@@ -0,0 +1,85 @@
+"""ASGI入口：转换线程已满时返回 429 和 Retry-After，不接收上传"""
+import asyncio
+import json
+
+from asgi import Application
+
+MODULE = b"""MODULE M
+    CONST robtarget p1:=[[100,0,500],[1,0,0,0],[0,0,0,0],[9E9,9E9,9E9,9E9,9E9,9E9]];
+    PROC main()
+        MoveL p1, v100, fine, tool0;
+    ENDPROC
+ENDMODULE
+"""
+
+BOUNDARY = b'robotqu'
+
+
+def _multipart(filename, data):
+    parts = [b'--' + BOUNDARY + b'\r\nContent-Disposition: form-data; name="' + name + b'"\r\n\r\n' + value + b'\r\n'
+             for name, value in ((b'type', b'robot'), (b'source', b'ABB'), (b'target', b'FANUC'))]
+    parts.append(b'--' + BOUNDARY + b'\r\n'
+                 b'Content-Disposition: form-data; name="file"; filename="' + filename.encode() + b'"\r\n'
+                 b'Content-Type: application/octet-stream\r\n\r\n' + data + b'\r\n')
+    return b''.join(parts) + b'--' + BOUNDARY + b'--\r\n'
+
+
+async def _post(application, body, on_receive=None):
+    """发送 POST /convert，返回 (状态码, 响应头, 响应体, 读取请求体的次数)"""
+    received = []
+    messages = []
+
+    async def receive():
+        received.append(True)
+        if on_receive is not None:
+            await on_receive()
+        return {'type': 'http.request', 'body': body, 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {'type': 'http', 'method': 'POST', 'path': '/convert', 'query_string': b'',
+             'headers': [(b'content-type', b'multipart/form-data; boundary=' + BOUNDARY),
+                         (b'content-length', str(len(body)).encode())]}
+    await application(scope, receive, send)
+    start, end = messages
+    headers = {name.decode(): value.decode() for name, value in start['headers']}
+    return start['status'], headers, json.loads(end['body']), len(received)
+
+
+def test_busy_server_rejects_before_reading_the_upload():
+    async def scenario():
+        application = Application(max_concurrency=1, retry_after=7)
+        await application._slots.acquire()  # 唯一的转换线程被占用
+        return await _post(application, _multipart('a.mod', MODULE))
+
+    status, headers, response, reads = asyncio.run(scenario())
+    assert status == 429
+    assert headers['retry-after'] == '7'
+    assert response['success'] is False
+    assert reads == 0
+
+
+def test_slots_taken_during_upload_are_rechecked():
+    async def scenario():
+        application = Application(max_concurrency=1, retry_after=3)
+        # 上传期间另一个请求先拿到了转换线程
+        return await _post(application, _multipart('a.mod', MODULE), on_receive=application._slots.acquire)
+
+    status, headers, _, reads = asyncio.run(scenario())
+    assert status == 429
+    assert headers['retry-after'] == '3'
+    assert reads == 1
+
+
+def test_conversion_releases_its_slot():
+    async def scenario():
+        application = Application(max_concurrency=1)
+        result = await _post(application, _multipart('a.mod', MODULE))
+        return result, application._slots.locked()
+
+    (status, headers, response, _), locked = asyncio.run(scenario())
+    assert status == 200
+    assert 'retry-after' not in headers
+    assert response['success'] is True, response
+    assert not locked
@@ -0,0 +1,101 @@
+"""压缩包批量转换：成员大小/压缩比限制、损坏的压缩包、输出重名、共用任务队列及其历史记录"""
+import io
+import json
+import tarfile
+import time
+import zipfile
+
+import pytest
+
+from batch import iter_archive_members, iter_convert_archive
+from jobs import JobQueue
+
+MODULE = """MODULE M
+    CONST robtarget p1:=[[100,0,500],[1,0,0,0],[0,0,0,0],[9E9,9E9,9E9,9E9,9E9,9E9]];
+    PROC main()
+        MoveL p1, v100, fine, tool0;
+    ENDPROC
+ENDMODULE
+"""
+
+
+def _zip(members):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for name, data in members:
+            zf.writestr(name, data)
+    buf.seek(0)
+    return buf
+
+
+def _manifest(chunks):
+    with zipfile.ZipFile(io.BytesIO(b''.join(chunks))) as zf:
+        return json.loads(zf.read('manifest.json')), zf.namelist()
+
+
+def test_oversized_member_is_not_extracted():
+    archive = _zip([('big.mod', b'!' * 4096), ('small.mod', b'MODULE M\nENDMODULE\n')])
+    members = list(iter_archive_members(archive, max_member_bytes=1024))
+    assert members[0][0] == 'big.mod' and members[0][1] is None and members[0][2]
+    assert members[1] == ('small.mod', b'MODULE M\nENDMODULE\n', None)
+
+
+def test_oversized_tar_member_is_skipped():
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode='w:gz') as tf:
+        for name, data in (('big.mod', b'!' * 4096), ('small.mod', b'MODULE M\nENDMODULE\n')):
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tf.addfile(info, io.BytesIO(data))
+    buf.seek(0)
+    members = list(iter_archive_members(buf, max_member_bytes=1024))
+    assert [(name, data is None) for name, data, _ in members] == [('big.mod', True), ('small.mod', False)]
+
+
+def test_high_compression_ratio_is_rejected():
+    archive = _zip([('bomb.mod', b'\0' * (4 * 1024 * 1024))])
+    (name, data, error), = iter_archive_members(archive)
+    assert data is None and '压缩比' in error
+
+
+def test_unreadable_archive_raises_value_error():
+    with pytest.raises(ValueError):
+        list(iter_archive_members(io.BytesIO(b'not an archive' * 100)))
+    with pytest.raises(ValueError):
+        next(iter_convert_archive(io.BytesIO(b'not an archive' * 100), max_workers=1))
+
+
+def test_duplicate_output_names_are_made_unique():
+    archive = _zip([('cell/a.mod', MODULE), ('CELL/A.mod', MODULE), ('cell/../cell/a.mod', MODULE)])
+    manifest, names = _manifest(iter_convert_archive(archive, max_workers=1))
+    outputs = [entry['output'] for entry in manifest['files']]
+    assert manifest['summary']['ok'] == 3
+    assert len({name.lower() for name in outputs}) == 3
+    assert sorted(outputs) == sorted(n for n in names if n != 'manifest.json')
+
+
+def test_members_run_on_shared_job_queue():
+    queue = JobQueue(max_workers=1, max_queue=4)
+    try:
+        archive = _zip([(f'p{i}.mod', MODULE) for i in range(6)])
+        manifest, _ = _manifest(iter_convert_archive(archive, queue=queue))
+        assert manifest['summary']['ok'] == 6
+        deadline = time.monotonic() + 5  # 完成回调在结果返回之后才执行
+        while queue.stats()['pending'] and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert queue.stats()['pending'] == 0
+    finally:
+        queue.shutdown()
+
+
+def test_batch_members_do_not_block_history_pruning():
+    queue = JobQueue(max_workers=1, max_queue=8, max_history=2)
+    try:
+        futures = [queue.run(time.sleep, 0.5) for _ in range(3)]
+        for i in range(5):
+            queue._add_finished(f'p{i}.ls', None, 0)
+        assert len(queue._jobs) == 2
+        for future in futures:
+            future.result()
+    finally:
+        queue.shutdown()
@@ -0,0 +1,34 @@
+"""结果缓存磁盘层的清理"""
+import os
+import time
+
+from cache import ResultCache
+
+
+def _age(cache, key, seconds):
+    path = cache._disk_path(key)
+    t = time.time() - seconds
+    os.utime(path, (t, t))
+
+
+def test_sweep_removes_expired_entries(tmp_path):
+    cache = ResultCache(max_entries=0, disk_dir=str(tmp_path), disk_ttl=60)
+    cache.put('aa' + '0' * 62, ('old', 'ls'))
+    cache.put('bb' + '0' * 62, ('new', 'ls'))
+    _age(cache, 'aa' + '0' * 62, 120)
+    assert cache.sweep() == 1
+    assert cache.get('aa' + '0' * 62) is None
+    assert cache.get('bb' + '0' * 62) == ('new', 'ls')
+
+
+def test_sweep_evicts_least_recently_used_over_limit(tmp_path):
+    cache = ResultCache(max_entries=0, disk_dir=str(tmp_path), disk_max_bytes=2500, disk_ttl=0)
+    keys = [f'{i:02d}' + '0' * 62 for i in range(3)]
+    for age, key in zip((30, 20, 10), keys):
+        cache.put(key, ('x' * 1000, 'ls'))
+        _age(cache, key, age)
+    assert cache.get(keys[0]) is not None  # 命中后成为最近使用
+    assert cache.sweep() == 1
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) is not None and cache.get(keys[2]) is not None
+    assert cache.stats()['disk_evictions'] == 1
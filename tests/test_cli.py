@@ -0,0 +1,84 @@
+"""命令行转换：不支持的方向返回退出码2，输出已是最新时跳过，不导入Flask"""
+import os
+import subprocess
+import sys
+
+import pytest
+
+import cli
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MOD = """MODULE M
+    CONST robtarget p10:=[[100,0,500],[1,0,0,0],[0,0,0,0],[9E9,9E9,9E9,9E9,9E9,9E9]];
+    PROC main()
+        MoveJ p10, v1000, z50, tool0;
+    ENDPROC
+ENDMODULE
+"""
+
+
+def _age(path, seconds):
+    t = os.path.getmtime(path) - seconds
+    os.utime(path, (t, t))
+
+
+@pytest.mark.parametrize('args', [
+    ['--type', 'plc', '--source', 'Siemens', '--target', 'Mitsubishi'],  # 预留、尚未实现的方向
+    ['--type', 'robot', '--source', 'ABB', '--target', 'KUKA'],
+    [],  # 无法按扩展名判断方向
+])
+def test_unsupported_conversion_exits_with_2(tmp_path, capsys, args):
+    path = tmp_path / 'program.src'
+    path.write_text(MOD, encoding='utf-8')
+    assert cli.main([str(path), *args]) == 2
+    assert '❌' in capsys.readouterr().err
+    assert list(tmp_path.iterdir()) == [path]
+
+
+def test_up_to_date_output_is_skipped(tmp_path, capsys):
+    src = tmp_path / 'program.mod'
+    src.write_text(MOD, encoding='utf-8')
+    out = tmp_path / 'program_ABBtoFANUC.ls'
+
+    assert cli.main([str(src), '-j', '1']) == 0
+    assert out.read_text(encoding='utf-8').startswith('/PROG')
+    assert '1 个成功, 0 个跳过' in capsys.readouterr().out
+
+    # 输出比输入新：跳过，不重写
+    _age(src, 60)
+    out.write_text('stale', encoding='utf-8')
+    assert cli.main([str(src), '-j', '1']) == 0
+    assert '0 个成功, 1 个跳过' in capsys.readouterr().out
+    assert out.read_text(encoding='utf-8') == 'stale'
+
+    # --force 强制重新转换
+    assert cli.main([str(src), '-j', '1', '--force']) == 0
+    assert '1 个成功, 0 个跳过' in capsys.readouterr().out
+    assert out.read_text(encoding='utf-8').startswith('/PROG')
+
+    # 输入比输出新：重新转换
+    out.write_text('stale', encoding='utf-8')
+    _age(out, 120)
+    assert cli.main([str(src), '-j', '1', '-q']) == 0
+    assert out.read_text(encoding='utf-8').startswith('/PROG')
+
+
+def test_directory_skips_generated_outputs(tmp_path):
+    plant = tmp_path / 'plant'
+    (plant / 'cell').mkdir(parents=True)
+    (plant / 'cell' / 'a.mod').write_text(MOD, encoding='utf-8')
+    (plant / 'cell' / 'a_ABBtoFANUC.ls').write_text('/PROG OLD\n', encoding='utf-8')  # 上次生成的输出，不作为输入
+    tasks = list(cli.iter_inputs([str(plant)], output_dir=str(tmp_path / 'out')))
+    assert tasks == [(str(plant / 'cell' / 'a.mod'), str(tmp_path / 'out' / 'cell' / 'a_ABBtoFANUC.ls'),
+                      ('robot', 'ABB', 'FANUC'))]
+
+
+def test_cli_does_not_import_flask(tmp_path):
+    src = tmp_path / 'program.mod'
+    src.write_text(MOD, encoding='utf-8')
+    code = ('import sys, cli\n'
+            f'status = cli.main([{str(src)!r}, "-j", "1", "-q"])\n'
+            'print(status, "flask" in sys.modules)\n')
+    proc = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, timeout=60)
+    assert proc.stdout.split() == ['0', 'False'], proc.stderr
@@ -0,0 +1,75 @@
+"""转换器注册表：按 "模块:类名" 按需导入，进程内复用 Engine，不支持的方向报错"""
+import os
+import subprocess
+import sys
+
+import pytest
+
+import converters
+from converters import UnsupportedConversion, get_engine, load_converter, run_conversion
+from converters.symbols import PointTable
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _run(code):
+    proc = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, timeout=60)
+    assert proc.returncode == 0, proc.stderr
+    return proc.stdout.split()
+
+
+def test_converter_modules_are_imported_on_first_use():
+    loaded = _run(
+        'import sys, converters\n'
+        'def loaded(): return ["converters.abb_fanuc" in sys.modules, "converters.omron_inovance" in sys.modules]\n'
+        'print(*loaded())\n'
+        'converters.get_engine("robot", "ABB", "FANUC")\n'
+        'print(*loaded())\n'
+        'converters.OmronToInovance\n'
+        'print(*loaded())\n')
+    assert loaded == ['False', 'False', 'True', 'False', 'True', 'True']
+
+
+def test_load_converter_resolves_module_class_specs():
+    converter_class = load_converter('fanuc_abb:FanucToABB')
+    assert converter_class.__name__ == 'FanucToABB'
+    assert converter_class.__module__ == 'converters.fanuc_abb'
+    assert load_converter('fanuc_abb:FanucToABB') is converter_class
+    assert load_converter(converter_class) is converter_class
+    assert converters.FanucToABB is converter_class
+
+
+def test_engine_is_reused_per_direction_and_options():
+    engine = get_engine('plc', 'Omron', 'Inovance', deterministic=True)
+    assert get_engine('plc', 'Omron', 'Inovance', deterministic=True) is engine
+    assert get_engine('plc', 'Omron', 'Inovance', deterministic=False) is not engine
+    assert get_engine('robot', 'ABB', 'FANUC', deterministic=True) is not engine
+
+    # 每次转换一个新的上下文，共用预热好的地址映射
+    first, second = engine.context(), engine.context()
+    assert first is not second
+    assert first.addresses is second.addresses
+
+
+def test_engine_with_object_options_is_not_cached():
+    points = PointTable()
+    engine = get_engine('robot', 'ABB', 'FANUC', points=points)
+    assert get_engine('robot', 'ABB', 'FANUC', points=points) is not engine
+    assert engine.context().points is points
+
+
+@pytest.mark.parametrize('route, message', [
+    (('robot', 'ABB', 'KUKA'), '暂不支持 ABB -> KUKA'),
+    (('plc', 'Siemens', 'Mitsubishi'), '暂不支持 Siemens -> Mitsubishi'),  # 预留、尚未实现
+    (('cnc', 'ABB', 'FANUC'), '未知的转换类型'),
+])
+def test_unknown_direction_raises_unsupported_conversion(route, message):
+    with pytest.raises(UnsupportedConversion, match=message):
+        get_engine(*route)
+    with pytest.raises(UnsupportedConversion):
+        run_conversion(*route, '')
+
+
+def test_unknown_attribute_raises_attribute_error():
+    with pytest.raises(AttributeError):
+        converters.KukaToABB
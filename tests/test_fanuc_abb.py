@@ -0,0 +1,114 @@
+"""FANUC LS -> ABB RAPID：指令与点位转换、流式转换与整体转换一致、欧拉角批量换算，/POS 分段读取时跨段的点位记录不丢失"""
+import io
+import random
+
+import pytest
+
+from benchmarks.corpus import generate_fanuc_ls
+from converters import abb_fanuc, fanuc_abb, run_conversion, stream_conversion
+
+SAMPLE = generate_fanuc_ls(positions=200)
+
+PICK_PLACE = """/PROG  PICK_PLACE
+/ATTR
+OWNER		= MNEDITOR;
+/MN
+   1:  UFRAME_NUM=1 ;
+   2:  UTOOL_NUM=2 ;
+   3:J P[1] 100% FINE    ;
+   4:L P[2:"APPR"] 123mm/sec CNT25    ;
+   5:C P[3]
+    :  P[4] 500mm/sec CNT10    ;
+   6:  ! place part ;
+   7:  WAIT   0.50(sec) ;
+/POS
+P[1]{
+   GP1:
+    UF : 1, UT : 2,
+    J1 =    10.000 deg,    J2 =   -20.000 deg,    J3 =    30.000 deg,
+    J4 =     0.000 deg,    J5 =    45.000 deg,    J6 =     0.000 deg
+};
+P[2:"APPR"]{
+   GP1:
+    UF : 1, UT : 2,     CONFIG : 'N U T, 0, 0, 0',
+    X =   500.000  mm,    Y =     0.000  mm,    Z =   800.000  mm,
+    W =   180.000 deg,    P =     0.000 deg,    R =     0.000 deg
+};
+P[3]{
+   GP1:
+    UF : 1, UT : 2,     CONFIG : 'N U T, 0, 0, 0',
+    X =   400.000  mm,    Y =   100.000  mm,    Z =   700.000  mm,
+    W =     0.000 deg,    P =     0.000 deg,    R =    90.000 deg
+};
+P[4]{
+   GP1:
+    UF : 1, UT : 2,     CONFIG : 'N U T, 0, 0, 0',
+    X =   300.000  mm,    Y =   200.000  mm,    Z =   600.000  mm,
+    W =     0.000 deg,    P =     0.000 deg,    R =     0.000 deg
+};
+/END
+"""
+
+
+def _convert(text):
+    return fanuc_abb.FanucToABB(deterministic=True).convert(text)
+
+
+def _stream(text, chunk_size=64 * 1024):
+    chunks, ext = stream_conversion('robot', 'FANUC', 'ABB', io.StringIO(text), chunk_size, deterministic=True)
+    return ''.join(chunks), ext
+
+
+def test_program_is_converted():
+    lines = [line.strip() for line in _convert(PICK_PLACE).splitlines()]
+    assert lines[0] == 'MODULE PICK_PLACE'
+    assert 'CONST speeddata v123:=[123,500,5000,1000];' in lines  # 非预定义的速度、区域数据需要声明
+    assert 'CONST zonedata z25:=[FALSE,25,37.5,37.5,3.75,37.5,3.75];' in lines
+    assert ('CONST jointtarget jp1:=[[10.000,-20.000,30.000,0.000,45.000,0.000],'
+            '[9E+09,9E+09,9E+09,9E+09,9E+09,9E+09]];') in lines
+    assert lines.index('PROC main()') > lines.index('PERS wobjdata wobj1:=[FALSE,TRUE,"",[[0,0,0],[1,0,0,0]],'
+                                                    '[[0,0,0],[1,0,0,0]]];')
+    body = lines[lines.index('PROC main()') + 3:lines.index('ENDPROC')]
+    assert body == [
+        'MoveAbsJ jp1\\NoEOffs, v1000, fine, tool2\\WObj:=wobj1;',
+        'MoveL p2, v123, z25, tool2\\WObj:=wobj1;',
+        'MoveC p3, p4, v500, z10, tool2\\WObj:=wobj1;',
+        '! place part',
+        '! FANUC: WAIT   0.50(sec)',
+    ]
+
+
+@pytest.mark.parametrize('text', [PICK_PLACE, SAMPLE], ids=['pick_place', 'generated'])
+def test_stream_equals_full_conversion(text):
+    expected, ext = run_conversion('robot', 'FANUC', 'ABB', text, deterministic=True)
+    assert ext == 'mod'
+    assert _stream(text) == (expected, ext)
+    assert _stream(text, chunk_size=100)[0] == expected
+
+
+def test_records_longer_than_a_chunk_are_kept(monkeypatch):
+    expected = _convert(SAMPLE)
+    # 每段只读3行，一条点位记录（7行）会跨越整段都没有 "};" 的分段
+    monkeypatch.setattr(fanuc_abb, '_POS_LINES', 3)
+    assert _convert(SAMPLE) == expected
+    assert expected.count('CONST robtarget') + expected.count('CONST jointtarget') == 200
+
+
+def test_quaternion_batch_matches_scalar_conversion(monkeypatch):
+    rng = random.Random(2)
+    wprs = [rng.uniform(-180, 180) for _ in range(3 * 300)]
+    converter = fanuc_abb.FanucToABB()
+    it = iter(wprs)
+    expected = [converter.euler_to_quaternion(*wpr) for wpr in zip(it, it, it)]
+    batch = converter.eulers_to_quaternions(wprs)
+    assert [v for q in batch for v in q] == pytest.approx([v for q in expected for v in q], abs=1e-12)
+    monkeypatch.setattr(fanuc_abb, 'np', None)
+    assert converter.eulers_to_quaternions(wprs) == expected
+
+
+def test_quaternions_round_trip_through_abb_to_fanuc():
+    rng = random.Random(3)
+    forward, back = abb_fanuc.ABBtoFanuc(), fanuc_abb.FanucToABB()
+    for _ in range(200):
+        wpr = (rng.uniform(-180, 180), rng.uniform(-89, 89), rng.uniform(-180, 180))
+        assert forward.quaternion_to_euler(*back.euler_to_quaternion(*wpr)) == pytest.approx(wpr, abs=1e-9)
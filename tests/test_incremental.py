@@ -0,0 +1,114 @@
+"""增量转换：只改一个单元时只重新转换该单元，结果与整体转换相同；单元缓存按LRU淘汰"""
+import pytest
+
+from benchmarks.corpus import generate_omron_st, generate_rapid
+from converters import ABBtoFanuc, OmronToInovance, run_conversion
+from converters.incremental import UnitCache, convert_incremental
+
+ABB = ('robot', 'ABB', 'FANUC')
+OMRON = ('plc', 'Omron', 'Inovance')
+
+
+def _full(pair, text):
+    return run_conversion(*pair, text, deterministic=True)[0]
+
+
+def _incremental(pair, text, cache):
+    result, _, report = convert_incremental(*pair, text, cache, deterministic=True)
+    return result, report
+
+
+def _edit_unit(units, index, edit):
+    """修改第 index 个单元的文本，返回修改后的原文（RAPID各单元首尾相接即为原文）"""
+    texts = [text for _, text, _ in units]
+    texts[index] = edit(texts[index])
+    return ''.join(texts)
+
+
+def test_abb_editing_one_routine_recomputes_only_that_routine():
+    text = generate_rapid(robtargets=40, moves=200, procs=5)
+    units = ABBtoFanuc().split_units(text)
+    assert ''.join(unit_text for _, unit_text, _ in units) == text
+
+    cache = UnitCache()
+    result, report = _incremental(ABB, text, cache)
+    assert result == _full(ABB, text)
+    assert report['reused'] < report['units']
+
+    index = [name for name, _, _ in units].index('BenchModule.Path2')
+    edited = _edit_unit(units, index, lambda t: t.replace('ENDPROC', '    MoveL p0, v100, fine, tool0;\n    ENDPROC'))
+    result, report = _incremental(ABB, edited, cache)
+    assert report['recomputed'] == ['BenchModule.Path2']
+    assert result == _full(ABB, edited)
+
+
+def test_abb_editing_module_data_updates_positions_used_by_other_routines():
+    text = generate_rapid(robtargets=40, moves=200, procs=5)
+    cache = UnitCache()
+    _incremental(ABB, text, cache)
+
+    start = text.index('robtarget p0:=[[') + len('robtarget p0:=[[')
+    edited = text[:start] + '1234.5,' + text[text.index(',', start) + 1:]
+    result, report = _incremental(ABB, edited, cache)
+    assert report['recomputed'] == ['BenchModule:data']
+    assert result == _full(ABB, edited)
+    assert 'X = 1234.500 mm' in result
+
+
+def test_omron_editing_one_segment_recomputes_only_that_segment():
+    text = generate_omron_st(lines=300, variables=30, depth=3)
+    units = OmronToInovance().split_units(text)
+    assert [name for name, _, _ in units][0] == 'VAR#1'
+
+    cache = UnitCache()
+    result, report = _incremental(OMRON, text, cache)
+    assert result == _full(OMRON, text)
+
+    # 变量区和程序体单元不含 PROGRAM / VAR 关键字本身，按单元文本在原文中的位置修改
+    name, segment, _ = units[len(units) // 2]
+    i = text.index(segment)
+    edited = text[:i] + 'SET(W10.01);\n' + text[i:]
+    result, report = _incremental(OMRON, edited, cache)
+    assert report['recomputed'] == [name]  # 后面的段行号变化，但内容不变，仍然复用
+    assert result == _full(OMRON, edited)
+    assert '%MX10.01 := TRUE;' in result
+
+
+def test_omron_editing_declarations_recomputes_every_segment():
+    text = generate_omron_st(lines=300, variables=30, depth=3)
+    cache = UnitCache()
+    _incremental(OMRON, text, cache)
+
+    # 新声明的变量改变程序体的改写结果，程序体各段都不能复用
+    edited = text.replace('END_VAR', '    W3 : INT;\nEND_VAR', 1)
+    result, report = _incremental(OMRON, edited, cache)
+    assert report['reused'] == 0
+    assert result == _full(OMRON, edited)
+
+
+@pytest.mark.parametrize('pair, text', [
+    (ABB, generate_rapid(robtargets=20, moves=60, procs=3)),
+    (OMRON, generate_omron_st(lines=100, variables=10, depth=2)),
+])
+def test_unchanged_source_reuses_every_unit(pair, text):
+    cache = UnitCache()
+    first, _ = _incremental(pair, text, cache)
+    second, report = _incremental(pair, text, cache)
+    assert second == first
+    assert report['recomputed'] == []
+    assert report['reused'] == report['units']
+
+
+def test_unit_cache_evicts_least_recently_used():
+    cache = UnitCache(max_entries=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1  # 命中后成为最近使用
+    cache.put('c', 3)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1 and cache.get('c') == 3
+    assert cache.stats() == {'hits': 3, 'misses': 1, 'entries': 2, 'max_entries': 2}
+
+    disabled = UnitCache(max_entries=0)
+    disabled.put('a', 1)
+    assert disabled.get('a') is None
@@ -0,0 +1,99 @@
+"""后台任务：CPU/墙钟时间预算、超时阶段、通过 DELETE /jobs/<id> 取消任务"""
+import io
+import time
+
+import pytest
+
+import app as flask_app
+from benchmarks.corpus import generate_rapid
+from jobs import JobQueue
+
+# 约1秒的转换，足以超出下面的预算
+SLOW = generate_rapid(robtargets=20000, moves=40000, procs=200).encode('utf-8')
+STAGES = ('decode', 'convert', 'write', 'parse', 'robtargets', 'generate')
+
+
+def _wait(get, statuses, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = get()
+        if job['status'] in statuses:
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f'任务未在 {timeout} 秒内进入 {statuses}: {job}')
+
+
+@pytest.fixture
+def queue():
+    queue = JobQueue(max_workers=1)
+    yield queue
+    queue.shutdown()
+
+
+@pytest.mark.parametrize('budget', ['cpu', 'wall'])
+def test_job_over_budget_times_out_in_a_stage(queue, tmp_path, budget):
+    output = tmp_path / 'out.ls'
+    budgets = {'cpu_budget': 0.2} if budget == 'cpu' else {'wall_budget': 0.2}
+    job_id = queue.submit('robot', 'ABB', 'FANUC', SLOW, str(output), 'out.ls', **budgets)
+    job = _wait(lambda: queue.get(job_id), ('done', 'error', 'timeout', 'cancelled'))
+    assert job['status'] == 'timeout'
+    assert job['stage'] in STAGES
+    assert job['error'].startswith(f'在阶段 {job["stage"]} 超出')
+    assert not output.exists()  # 不留下不完整的结果文件
+
+    # 工作进程不受影响，继续处理后续任务
+    small = generate_rapid(robtargets=10, moves=20, procs=1).encode('utf-8')
+    job_id = queue.submit('robot', 'ABB', 'FANUC', small, str(output), 'out.ls', **budgets)
+    assert _wait(lambda: queue.get(job_id), ('done', 'error', 'timeout'))['status'] == 'done'
+    assert output.exists()
+
+
+@pytest.fixture
+def client(monkeypatch, queue):
+    monkeypatch.setattr(flask_app, 'job_queue', queue)
+    return flask_app.app.test_client()
+
+
+def _submit(client, data):
+    response = client.post('/jobs', data={'type': 'robot', 'source': 'ABB', 'target': 'FANUC',
+                                          'file': (io.BytesIO(data), 'slow.mod')})
+    assert response.status_code == 202
+    return response.get_json()['job_id']
+
+
+def test_delete_interrupts_a_running_job(client):
+    job_id = _submit(client, SLOW)
+    _wait(lambda: client.get(f'/jobs/{job_id}').get_json(), ('running',))
+
+    response = client.delete(f'/jobs/{job_id}')
+    assert response.status_code == 202
+    assert response.get_json()['status'] == 'cancelling'
+
+    job = _wait(lambda: client.get(f'/jobs/{job_id}').get_json(), ('cancelled',))
+    assert job['success'] is False
+    assert job['stage'] in STAGES
+    assert job['message'] == f'任务在阶段 {job["stage"]} 被取消'
+    assert client.delete(f'/jobs/{job_id}').get_json()['status'] == 'cancelled'  # 重复取消返回原状态
+
+
+def test_delete_finished_job_is_rejected(client):
+    job_id = _submit(client, generate_rapid(robtargets=10, moves=20, procs=1).encode('utf-8'))
+    _wait(lambda: client.get(f'/jobs/{job_id}').get_json(), ('done',))
+    response = client.delete(f'/jobs/{job_id}')
+    assert response.status_code == 409
+    assert response.get_json()['status'] == 'done'
+
+
+def test_delete_cancels_a_queued_job(client):
+    # 进程池的调用队列最多预先取走 max_workers + 1 个任务，第四个任务才确定仍在排队；内容各不相同，不命中结果缓存
+    started = [_submit(client, SLOW + f'\n! {i}\n'.encode()) for i in range(3)]
+    queued = _submit(client, SLOW)
+    response = client.delete(f'/jobs/{queued}')
+    assert response.status_code == 200
+    assert response.get_json()['status'] == 'cancelled'
+    job = client.get(f'/jobs/{queued}').get_json()
+    assert job['status'] == 'cancelled'
+    assert job['stage'] is None
+    for job_id in started:
+        client.delete(f'/jobs/{job_id}')
+    assert client.delete('/jobs/missing').status_code == 404
@@ -0,0 +1,66 @@
+"""/metrics：一次转换后转换次数和各阶段累计耗时的样本随之增加"""
+import io
+import re
+import uuid
+
+import pytest
+
+import app as flask_app
+from converters.instrument import MetricsRegistry
+
+MODULE = """MODULE M
+    ! {marker}
+    CONST robtarget p1:=[[100,0,500],[1,0,0,0],[0,0,0,0],[9E9,9E9,9E9,9E9,9E9,9E9]];
+    PROC main()
+        MoveL p1, v100, fine, tool0;
+    ENDPROC
+ENDMODULE
+"""
+
+
+@pytest.fixture
+def client():
+    return flask_app.app.test_client()
+
+
+def _samples(client):
+    """解析 /metrics，返回 {(指标名, 标签文本): 值}"""
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    samples = {}
+    for line in response.get_data(as_text=True).splitlines():
+        m = re.fullmatch(r'(\w+)(?:\{(.*)\})? (\S+)', line)
+        if m:
+            samples[m.group(1), m.group(2) or ''] = float(m.group(3))
+    return samples
+
+
+def test_conversion_updates_counters_and_stage_seconds(client):
+    before = _samples(client)
+    # 内容唯一，不会命中结果缓存
+    data = {'type': 'robot', 'source': 'ABB', 'target': 'FANUC',
+            'file': (io.BytesIO(MODULE.format(marker=uuid.uuid4()).encode('utf-8')), 'a.mod')}
+    assert client.post('/convert', data=data).get_json()['success']
+    after = _samples(client)
+
+    key = ('robotqu_conversions_total', 'converter="ABBtoFanuc",result="ok"')
+    assert after[key] == before.get(key, 0) + 1
+    for stage in ('parse', 'robtargets', 'generate'):
+        key = ('robotqu_stage_seconds_total', f'converter="ABBtoFanuc",stage="{stage}"')
+        assert after[key] > before.get(key, 0)
+        key = ('robotqu_stage_calls_total', f'converter="ABBtoFanuc",stage="{stage}"')
+        assert after[key] == before.get(key, 0) + 1
+    key = ('robotqu_items_total', 'converter="ABBtoFanuc",item="instructions"')
+    assert after[key] == before.get(key, 0) + 1
+
+
+def test_render_prometheus_text_format():
+    registry = MetricsRegistry()
+    registry.record('ABBtoFanuc', {'stages_ms': {'parse': 1500.0}, 'counts': {'robtargets': 3}})
+    registry.record('Odd"Name', {}, ok=False)
+    lines = registry.render_prometheus().splitlines()
+    assert '# TYPE robotqu_conversions_total counter' in lines
+    assert 'robotqu_conversions_total{converter="ABBtoFanuc",result="ok"} 1' in lines
+    assert 'robotqu_conversions_total{converter="Odd\\"Name",result="error"} 1' in lines
+    assert 'robotqu_stage_seconds_total{converter="ABBtoFanuc",stage="parse"} 1.5' in lines
+    assert 'robotqu_items_total{converter="ABBtoFanuc",item="robtargets"} 3' in lines
@@ -0,0 +1,47 @@
+"""欧姆龙符号表导入；按文件转换（内存映射）与整体转换的结果一致"""
+import pytest
+
+from benchmarks.corpus import generate_omron_st
+from converters import run_conversion, run_file_conversion
+
+SYMBOLS = (
+    "Name,Data Type,Address,Comment\n"
+    "Start,BOOL,W0.00,启动按钮\n"
+    "Count,INT,,计数值\n"
+    "Speed,REAL,D100,\n"
+    "Tmp,DINT,,\n"
+)
+
+
+def _declarations(text):
+    result, _ = run_conversion('plc', 'Omron', 'Inovance', text, deterministic=True)
+    return result.split('VAR\n', 1)[1].split('END_VAR', 1)[0].splitlines()
+
+
+def test_symbol_comments_are_kept_with_and_without_address():
+    lines = _declarations(SYMBOLS)
+    assert lines[0].endswith('(* 原欧姆龙: W0.00 启动按钮 *)')
+    assert lines[1] == '    Count : INT; (* 计数值 *)'
+    assert lines[2].endswith('(* 原欧姆龙: D100 *)')
+    assert lines[3] == '    Tmp : DINT;'
+
+
+FILES = {
+    'generated': generate_omron_st(lines=300, variables=30).encode('utf-8'),
+    'crlf': generate_omron_st(lines=100, variables=10, seed=3).replace('\n', '\r\n').encode('utf-8'),
+    'bom': b'\xef\xbb\xbf' + generate_omron_st(lines=50, variables=5).encode('utf-8'),
+    'invalid_utf8': generate_omron_st(lines=50, variables=5).encode('utf-8').replace(b'(*', b'(* \xff', 1),
+    'lowercase': b'program p\nvar\n    a AT W3 : INT;\nend_var\na := D1;\nend_program\n',
+    'body_only': b'MOV(D100, W3);\nSET(W10.01);\n',
+    'symbols': SYMBOLS.encode('utf-8'),
+    'empty': b'',  # 长度为0的文件不能做内存映射
+}
+
+
+@pytest.mark.parametrize('name', sorted(FILES))
+def test_file_conversion_equals_text_conversion(tmp_path, name):
+    path = tmp_path / f'{name}.st'
+    path.write_bytes(FILES[name])
+    expected, ext = run_conversion('plc', 'Omron', 'Inovance', FILES[name].decode('utf-8', errors='ignore'),
+                                   deterministic=True)
+    assert run_file_conversion('plc', 'Omron', 'Inovance', str(path), deterministic=True) == (expected, ext)
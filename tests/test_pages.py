@@ -0,0 +1,104 @@
+"""预压缩页面：按 Accept-Encoding 选择版本，If-None-Match 命中返回 304，带摘要地址的静态资源长期缓存"""
+import gzip
+
+import pytest
+
+import app as flask_app
+import pages
+from pages import IMMUTABLE, REVALIDATE, CachedPage, accepted_encodings, cache_control
+
+
+@pytest.fixture
+def client():
+    return flask_app.app.test_client()
+
+
+def test_select_prefers_compressed_variant_when_accepted():
+    page = CachedPage('<html>' + 'x' * 1000 + '</html>')
+    encoding, body, etag = page.select('gzip, deflate')
+    assert encoding == 'gzip'
+    assert gzip.decompress(body) == page.variants['identity'][0]
+    assert etag == f'"{page.digest}-gzip"'
+
+    assert page.select('gzip;q=0, deflate')[0] == 'identity'
+    assert page.select(None) == ('identity', page.variants['identity'][0], f'"{page.digest}"')
+
+
+@pytest.mark.skipif(pages.brotli is None, reason='需要 brotli')
+def test_select_prefers_brotli_over_gzip():
+    page = CachedPage('<html></html>')
+    assert page.select('gzip, br')[0] == 'br'
+
+
+def test_binary_assets_are_not_compressed():
+    page = CachedPage(b'\x89PNG\r\n', 'image/png')
+    assert list(page.variants) == ['identity']
+    assert page.select('gzip')[0] == 'identity'
+
+
+def test_not_modified_matches_any_variant_etag():
+    page = CachedPage('<html></html>')
+    etags = [etag for _, etag in page.variants.values()]
+    for etag in etags:
+        assert page.not_modified(etag)
+        assert page.not_modified(f'"other", W/{etag}')
+    assert page.not_modified('*')
+    assert not page.not_modified('"other"')
+    assert not page.not_modified(None)
+
+
+def test_accepted_encodings_ignores_zero_quality():
+    assert accepted_encodings('gzip;q=0.5, br;q=0, identity') == {'gzip', 'identity'}
+    assert accepted_encodings('gzip;q=abc') == set()
+    assert accepted_encodings('') == set()
+
+
+def test_cache_control_is_immutable_only_for_current_version():
+    page = CachedPage(b'<svg/>', 'image/svg+xml; charset=utf-8')
+    assert cache_control(page, page.version) == IMMUTABLE
+    assert cache_control(page, 'stale') == REVALIDATE
+    assert cache_control(page, None) == REVALIDATE
+
+
+def test_index_gzip_and_identity_responses(client):
+    plain = client.get('/', headers={'Accept-Encoding': 'identity'})
+    assert plain.status_code == 200
+    assert 'Content-Encoding' not in plain.headers
+    assert plain.headers['Cache-Control'] == REVALIDATE
+    assert plain.headers['Vary'] == 'Accept-Encoding'
+
+    compressed = client.get('/', headers={'Accept-Encoding': 'gzip'})
+    assert compressed.status_code == 200
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(compressed.data) == plain.data
+    assert compressed.headers['ETag'] != plain.headers['ETag']
+
+
+def test_index_if_none_match_returns_304(client):
+    etag = client.get('/', headers={'Accept-Encoding': 'gzip'}).headers['ETag']
+    response = client.get('/', headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.data == b''
+    assert response.headers['ETag'] == etag
+    assert response.headers['Cache-Control'] == REVALIDATE
+
+    assert client.get('/', headers={'If-None-Match': '"other"'}).status_code == 200
+
+
+def test_fingerprinted_static_assets_are_immutable(client):
+    index = client.get('/', headers={'Accept-Encoding': 'identity'}).get_data(as_text=True)
+    url = pages.asset_url(flask_app.static_assets, 'logo.svg')
+    assert url in index
+
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'] == IMMUTABLE
+    assert response.data == flask_app.static_assets['logo.svg'].variants['identity'][0]
+
+    # 没有摘要或摘要已过期的地址每次确认
+    assert client.get('/static/logo.svg').headers['Cache-Control'] == REVALIDATE
+    assert client.get('/static/logo.svg?v=stale').headers['Cache-Control'] == REVALIDATE
+
+    etag = response.headers['ETag']
+    assert client.get(url, headers={'If-None-Match': etag}).status_code == 304
+    assert client.get('/static/missing.svg').status_code == 404
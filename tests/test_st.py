@@ -0,0 +1,93 @@
+"""ST解析器：畸形输入上必须结束，对调用赋值原样保留；欧姆龙 -> 汇川 增量转换与整体转换一致"""
+import contextlib
+import random
+import signal
+
+import pytest
+
+from benchmarks.corpus import generate_omron_st
+from converters import run_conversion, st
+from converters.incremental import UnitCache, convert_incremental
+
+
+@contextlib.contextmanager
+def _deadline(seconds):
+    """超时时从解析中抛出异常，死循环表现为测试失败而不是挂起"""
+    if not hasattr(signal, 'setitimer'):
+        pytest.skip('需要 signal.setitimer')
+
+    def expire(signum, frame):
+        raise TimeoutError('解析未结束')
+
+    previous = signal.signal(signal.SIGALRM, expire)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+@pytest.mark.parametrize('text', [
+    'CASE x OF 1: a := 1; DO: b := 2; END_CASE;',
+    'CASE BY ,',
+    'CASE x OF THEN: ; OF, TO.. END_CASE',
+    'CASE x OF 1: a := 1; UNTIL .. 2: b := 3; END_CASE;',
+])
+def test_malformed_case_labels_terminate(text):
+    with _deadline(2):
+        program = st.parse(text)
+        result, _ = run_conversion('plc', 'Omron', 'Inovance', text, deterministic=True)
+    assert program.body
+    assert text.split(';')[0] in result  # 无法识别的部分原样保留
+
+
+def test_case_label_after_stray_keyword_is_still_parsed():
+    with _deadline(2):
+        program = st.parse('CASE x OF 1: a := 1; DO: b := 2; END_CASE;')
+    block, = program.body
+    assignments = [stmt for part in block.parts if type(part) is list for stmt in part
+                   if isinstance(stmt, st.Assign)]
+    assert [a.target.ident for a in assignments] == ['a', 'b']
+    assert block.close is not None
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('D(i) := 0;\n', 'D(i) := 0;\n'),
+    ('Foo() := W3;\n', 'Foo() := %MW3;\n'),
+])
+def test_assignment_to_call_is_kept_as_written(text, expected):
+    statement, = st.parse(text).body
+    assert isinstance(statement, st.Other)
+    result, _ = run_conversion('plc', 'Omron', 'Inovance', text, deterministic=True)
+    assert expected in result
+
+
+def test_random_token_sequences_terminate():
+    words = ['CASE', 'OF', 'IF', 'THEN', 'ELSIF', 'ELSE', 'END_IF', 'END_CASE', 'FOR', 'TO', 'BY', 'DO',
+             'END_FOR', 'WHILE', 'END_WHILE', 'REPEAT', 'UNTIL', 'END_REPEAT', 'VAR', 'END_VAR', 'AT',
+             'PROGRAM', 'END_PROGRAM', 'EXIT', 'NOT', 'x', 'f', '1', 'T#5s', "'s'", 'D100', '%MW0',
+             '..', ':', ',', ';', ':=', '=>', '(', ')', '[', ']', '.', '-', '^']
+    rng = random.Random(0)
+    with _deadline(30):
+        for _ in range(5000):
+            text = ' '.join(rng.choice(words) for _ in range(rng.randint(1, 14)))
+            st.parse(text)
+            st.parse_declarations(text)
+
+
+@pytest.mark.parametrize('seed', [0, 1])
+def test_incremental_equals_full_conversion(seed):
+    text = generate_omron_st(lines=400, variables=40, depth=4, seed=seed)
+    full, _ = run_conversion('plc', 'Omron', 'Inovance', text, deterministic=True)
+    cache = UnitCache()
+    result, _, _ = convert_incremental('plc', 'Omron', 'Inovance', text, cache, deterministic=True)
+    assert result == full
+
+    # 在最后一段程序体中插入一条指令后再转换：复用其余单元，结果仍与整体转换相同
+    i = text.rfind('MOV(')
+    edited = text[:i] + 'SET(W10.01); ' + text[i:]
+    full, _ = run_conversion('plc', 'Omron', 'Inovance', edited, deterministic=True)
+    result, _, report = convert_incremental('plc', 'Omron', 'Inovance', edited, cache, deterministic=True)
+    assert result == full
+    assert report['reused'] > 0
@@ -0,0 +1,65 @@
+"""结果存储：预留目录在任务结束前不被清理"""
+import os
+import time
+
+from store import OutputStore
+
+
+def _age(path, seconds):
+    t = time.time() - seconds
+    for root, dirs, files in os.walk(path):
+        for name in files:
+            os.utime(os.path.join(root, name), (t, t))
+    os.utime(path, (t, t))
+
+
+def test_sweep_keeps_reserved_directories(tmp_path):
+    store = OutputStore(root=str(tmp_path), ttl=60, max_bytes=0)
+    key, path = store.reserve('a.ls')
+    _age(os.path.dirname(path), 120)
+    assert store.sweep() == 0
+    assert os.path.isdir(os.path.dirname(path))
+    assert store.get(key) is None  # 结果尚未写完
+
+    with open(path, 'w') as f:
+        f.write('/PROG A\n')
+    store.release(key)
+    assert store.get(key)['filename'] == 'a.ls'
+    _age(os.path.dirname(path), 120)
+    assert store.sweep() == 1
+    assert store.get(key) is None
+
+
+def test_sweep_skips_reservations_of_other_processes(tmp_path):
+    owner = OutputStore(root=str(tmp_path), ttl=60, reserve_ttl=3600)
+    other = OutputStore(root=str(tmp_path), ttl=60, reserve_ttl=3600)
+    _, path = owner.reserve('a.ls')
+    _age(os.path.dirname(path), 120)
+    assert other.sweep() == 0
+    _age(os.path.dirname(path), 7200)  # 超过 reserve_ttl 视为遗弃
+    assert other.sweep() == 1
+
+
+def test_sweep_continues_when_a_directory_disappears(tmp_path, monkeypatch):
+    store = OutputStore(root=str(tmp_path), ttl=60, max_bytes=0)
+    keys = [store.reserve(f'{name}.ls')[0] for name in 'ab']
+    for key in keys:
+        store.release(key)
+        _age(os.path.join(str(tmp_path), key), 120)
+
+    # 模拟其他进程在扫描期间删除最先扫描到的结果目录
+    scandir = os.scandir
+    vanished = []
+
+    def racing_scandir(path):
+        if path != str(tmp_path) and not vanished:
+            vanished.append(path)
+            raise FileNotFoundError(path)
+        return scandir(path)
+
+    monkeypatch.setattr(os, 'scandir', racing_scandir)
+    store.sweep()
+    monkeypatch.undo()
+    remaining = [os.path.join(str(tmp_path), key) for key in keys]
+    remaining.remove(vanished[0])
+    assert not os.path.exists(remaining[0])